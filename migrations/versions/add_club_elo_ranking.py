@@ -0,0 +1,44 @@
+"""Add materialized per-club ELO ranking tables
+
+Revision ID: add_club_elo_ranking
+Revises: 4d3ab7f09542
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_club_elo_ranking'
+down_revision = '4d3ab7f09542'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'tb_club_ELO_ranking',
+        sa.Column('ce_club_id', sa.Integer, sa.ForeignKey('tb_club.cl_id'), primary_key=True),
+        sa.Column('ce_pl_id', sa.Integer, sa.ForeignKey('tb_users.us_id'), primary_key=True),
+        sa.Column('ce_rankingNow', sa.Float, nullable=False),
+        sa.Column('ce_wins', sa.Integer, nullable=False),
+        sa.Column('ce_losses', sa.Integer, nullable=False),
+        sa.Column('ce_totalGames', sa.Integer, nullable=False),
+        sa.Column('ce_last_gm_id', sa.Integer, sa.ForeignKey('tb_game.gm_id'), nullable=True),
+    )
+    # Rankings are rebuilt lazily per club on first read
+    op.create_table(
+        'tb_club_ELO_state',
+        sa.Column('cs_club_id', sa.Integer, sa.ForeignKey('tb_club.cl_id'), primary_key=True),
+        sa.Column('cs_last_gm_id', sa.Integer, nullable=True),
+        sa.Column('cs_last_date', sa.Date, nullable=True),
+        sa.Column('cs_last_time', sa.Time, nullable=True),
+        sa.Column('cs_games_applied', sa.Integer, nullable=False),
+        sa.Column('cs_needs_rebuild', sa.Boolean, nullable=False, server_default='0'),
+        sa.Column('cs_updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('tb_club_ELO_state')
+    op.drop_table('tb_club_ELO_ranking')
@@ -0,0 +1,24 @@
+"""Add ev_data_version to tb_event
+
+Revision ID: add_event_data_version
+Revises: add_player_pair_stats
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_event_data_version'
+down_revision = 'add_player_pair_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tb_event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ev_data_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('tb_event', schema=None) as batch_op:
+        batch_op.drop_column('ev_data_version')
@@ -0,0 +1,65 @@
+"""Add the player/game participation index table
+
+Revision ID: add_game_participation
+Revises: add_club_elo_ranking
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_game_participation'
+down_revision = 'add_club_elo_ranking'
+branch_labels = None
+depends_on = None
+
+# (player, side, partner, opponent 1, opponent 2, games for, games against)
+SLOTS = (
+    ('gm_idPlayer_A1', 'A', 'gm_idPlayer_A2', 'gm_idPlayer_B1', 'gm_idPlayer_B2', 'gm_result_A', 'gm_result_B'),
+    ('gm_idPlayer_A2', 'A', 'gm_idPlayer_A1', 'gm_idPlayer_B1', 'gm_idPlayer_B2', 'gm_result_A', 'gm_result_B'),
+    ('gm_idPlayer_B1', 'B', 'gm_idPlayer_B2', 'gm_idPlayer_A1', 'gm_idPlayer_A2', 'gm_result_B', 'gm_result_A'),
+    ('gm_idPlayer_B2', 'B', 'gm_idPlayer_B1', 'gm_idPlayer_A1', 'gm_idPlayer_A2', 'gm_result_B', 'gm_result_A'),
+)
+
+
+def upgrade():
+    op.create_table(
+        'tb_game_participation',
+        sa.Column('gpt_gm_id', sa.Integer, sa.ForeignKey('tb_game.gm_id'), primary_key=True),
+        sa.Column('gpt_pl_id', sa.Integer, sa.ForeignKey('tb_users.us_id'), primary_key=True),
+        sa.Column('gpt_side', sa.String(1), nullable=False),
+        sa.Column('gpt_partner_id', sa.Integer, nullable=True),
+        sa.Column('gpt_op1_id', sa.Integer, nullable=True),
+        sa.Column('gpt_op2_id', sa.Integer, nullable=True),
+        sa.Column('gpt_date', sa.Date, nullable=True),
+        sa.Column('gpt_timeStart', sa.Time, nullable=True),
+        sa.Column('gpt_idEvent', sa.Integer, nullable=True),
+        sa.Column('gpt_idLeague', sa.Integer, nullable=True),
+        sa.Column('gpt_idGameDay', sa.Integer, nullable=True),
+        sa.Column('gpt_games_for', sa.Integer, nullable=True),
+        sa.Column('gpt_games_against', sa.Integer, nullable=True),
+        sa.Column('gpt_result', sa.Integer, nullable=True),
+    )
+    op.create_index('ix_game_participation_player_date', 'tb_game_participation', ['gpt_pl_id', 'gpt_date', 'gpt_timeStart'])
+
+    # Backfill from the existing games; utility_scripts/setup_game_participation.py does the same from the app
+    conn = op.get_bind()
+    for player, side, partner, op1, op2, games_for, games_against in SLOTS:
+        conn.execute(sa.text(f"""
+            INSERT OR IGNORE INTO tb_game_participation
+                (gpt_gm_id, gpt_pl_id, gpt_side, gpt_partner_id, gpt_op1_id, gpt_op2_id, gpt_date, gpt_timeStart,
+                 gpt_idEvent, gpt_idLeague, gpt_idGameDay, gpt_games_for, gpt_games_against, gpt_result)
+            SELECT gm_id, {player}, '{side}', NULLIF({partner}, 0), NULLIF({op1}, 0), NULLIF({op2}, 0), gm_date, gm_timeStart,
+                   gm_idEvent, gm_idLeague, gm_idGameDay, {games_for}, {games_against},
+                   CASE WHEN {games_for} > {games_against} THEN 1
+                        WHEN {games_for} < {games_against} THEN -1
+                        WHEN {games_for} = {games_against} THEN 0 END
+            FROM tb_game
+            WHERE {player} IS NOT NULL AND {player} != 0
+        """))
+
+
+def downgrade():
+    op.drop_index('ix_game_participation_player_date', table_name='tb_game_participation')
+    op.drop_table('tb_game_participation')
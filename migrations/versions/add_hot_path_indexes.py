@@ -0,0 +1,42 @@
+"""Add indexes for the hot game, ELO history, event and classification lookups
+
+Revision ID: add_hot_path_indexes
+Revises: add_event_data_version
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+revision = 'add_hot_path_indexes'
+down_revision = 'add_event_data_version'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns). Lookups already served by a unique constraint
+# (event classifications by event, club authorizations by user and club) are left alone.
+INDEXES = [
+    ('ix_game_event_start', 'tb_game', ['gm_idEvent', 'gm_timeStart', 'gm_id']),
+    ('ix_game_gameday_start', 'tb_game', ['gm_idGameDay', 'gm_timeStart']),
+    ('ix_game_league_date', 'tb_game', ['gm_idLeague', 'gm_date', 'gm_timeStart']),
+    ('ix_game_date_start', 'tb_game', ['gm_date', 'gm_timeStart']),
+    ('ix_elo_hist_player_date', 'tb_ELO_ranking_hist', ['el_pl_id', 'el_date', 'el_startTime']),
+    ('ix_event_club_date', 'tb_event', ['ev_club_id', 'ev_date']),
+    ('ix_event_registration_event_substitute', 'tb_event_registration', ['er_event_id', 'er_is_substitute']),
+    ('ix_event_registration_player', 'tb_event_registration', ['er_player_id']),
+    ('ix_player_nickname_club', 'tb_player_nickname', ['pcn_club_id', 'pcn_user_id', 'pcn_nickname']),
+    ('ix_gameday_player_gameday', 'tb_gameDayPlayer', ['gp_idGameDay', 'gp_idPlayer']),
+    ('ix_gameday_classification_gameday', 'tb_gameDayClassification', ['gc_idGameDay']),
+    ('ix_league_classification_league', 'tb_leagueClassification', ['lc_idLeague']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    # Give the query planner statistics for the new indexes
+    op.execute('ANALYZE')
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,30 @@
+"""Add the game id to the player participation index, the keyset of the player_profile history pages
+
+Dates and start times are nullable, so the index is on their coalesce(..., '') as the pages order by.
+
+Revision ID: add_participation_history_key
+Revises: add_hot_path_indexes
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_participation_history_key'
+down_revision = 'add_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+INDEX = 'ix_game_participation_player_date'
+TABLE = 'tb_game_participation'
+
+
+def upgrade():
+    op.drop_index(INDEX, table_name=TABLE)
+    op.create_index(INDEX, TABLE, ['gpt_pl_id', sa.text("coalesce(gpt_date, '')"),
+                                   sa.text("coalesce(\"gpt_timeStart\", '')"), 'gpt_gm_id'])
+
+
+def downgrade():
+    op.drop_index(INDEX, table_name=TABLE)
+    op.create_index(INDEX, TABLE, ['gpt_pl_id', 'gpt_date', 'gpt_timeStart'])
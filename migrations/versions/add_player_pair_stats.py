@@ -0,0 +1,50 @@
+"""Add the partnership and head-to-head matrix table
+
+Revision ID: add_player_pair_stats
+Revises: add_player_stats
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_player_pair_stats'
+down_revision = 'add_player_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'tb_player_pair_stats',
+        sa.Column('pp_pl_id', sa.Integer, sa.ForeignKey('tb_users.us_id'), primary_key=True),
+        sa.Column('pp_other_id', sa.Integer, sa.ForeignKey('tb_users.us_id'), primary_key=True),
+        sa.Column('pp_relation', sa.String(8), primary_key=True),
+        sa.Column('pp_games', sa.Integer, nullable=False),
+        sa.Column('pp_wins', sa.Integer, nullable=False),
+        sa.Column('pp_losses', sa.Integer, nullable=False),
+        sa.Column('pp_games_diff', sa.Integer, nullable=False),
+    )
+
+    # Backfill from tb_game_participation, same query as func_rebuild_player_pair_stats
+    op.execute("""
+        INSERT INTO tb_player_pair_stats (pp_pl_id, pp_other_id, pp_relation, pp_games, pp_wins, pp_losses, pp_games_diff)
+        SELECT gpt_pl_id, other_id, relation, COUNT(*),
+               SUM(CASE WHEN gpt_result = 1 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN gpt_result = -1 THEN 1 ELSE 0 END),
+               SUM(COALESCE(gpt_games_for, 0) - COALESCE(gpt_games_against, 0))
+        FROM (
+            SELECT gpt_pl_id, gpt_partner_id AS other_id, 'partner' AS relation, gpt_result, gpt_games_for, gpt_games_against FROM tb_game_participation
+            UNION ALL
+            SELECT gpt_pl_id, gpt_op1_id, 'opponent', gpt_result, gpt_games_for, gpt_games_against FROM tb_game_participation
+            UNION ALL
+            SELECT gpt_pl_id, gpt_op2_id, 'opponent', gpt_result, gpt_games_for, gpt_games_against FROM tb_game_participation
+        )
+        WHERE other_id IS NOT NULL AND (COALESCE(gpt_games_for, 0) > 0 OR COALESCE(gpt_games_against, 0) > 0)
+        GROUP BY gpt_pl_id, other_id, relation
+    """)
+
+
+def downgrade():
+    op.drop_table('tb_player_pair_stats')
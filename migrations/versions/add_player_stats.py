@@ -0,0 +1,48 @@
+"""Add the precomputed player statistics table
+
+Revision ID: add_player_stats
+Revises: add_game_participation
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_player_stats'
+down_revision = 'add_game_participation'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows are created on the first player_info view of each player
+    op.create_table(
+        'tb_player_stats',
+        sa.Column('ps_pl_id', sa.Integer, sa.ForeignKey('tb_users.us_id'), primary_key=True),
+        sa.Column('ps_total_games', sa.Integer, nullable=False),
+        sa.Column('ps_games_won', sa.Integer, nullable=False),
+        sa.Column('ps_last_game_date', sa.Date, nullable=True),
+        sa.Column('ps_gamedays_won', sa.Integer, nullable=False),
+        sa.Column('ps_best_teammate_id', sa.Integer, sa.ForeignKey('tb_users.us_id'), nullable=True),
+        sa.Column('ps_best_teammate_wins', sa.Integer, nullable=False),
+        sa.Column('ps_best_teammate_games', sa.Integer, nullable=False),
+        sa.Column('ps_worst_teammate_id', sa.Integer, sa.ForeignKey('tb_users.us_id'), nullable=True),
+        sa.Column('ps_worst_teammate_losses', sa.Integer, nullable=False),
+        sa.Column('ps_worst_teammate_games', sa.Integer, nullable=False),
+        sa.Column('ps_nemesis_id', sa.Integer, sa.ForeignKey('tb_users.us_id'), nullable=True),
+        sa.Column('ps_nemesis_losses', sa.Integer, nullable=False),
+        sa.Column('ps_nemesis_games', sa.Integer, nullable=False),
+        sa.Column('ps_fav_opponent_id', sa.Integer, sa.ForeignKey('tb_users.us_id'), nullable=True),
+        sa.Column('ps_fav_opponent_wins', sa.Integer, nullable=False),
+        sa.Column('ps_fav_opponent_games', sa.Integer, nullable=False),
+        sa.Column('ps_elo_best', sa.Float, nullable=True),
+        sa.Column('ps_elo_worst', sa.Float, nullable=True),
+        sa.Column('ps_elo_now', sa.Float, nullable=True),
+        sa.Column('ps_needs_refresh', sa.Boolean, nullable=False, server_default='0'),
+        sa.Column('ps_updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('tb_player_stats')
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite of the hot routes, run with the Flask test client on a copy of a synthetic database
+(see generate_synthetic_data.py), so every run starts from the same data.
+For each case prints latency percentiles and SQL statements per request, and saves everything as JSON
+under instance/benchmarks/ to compare runs between commits.
+
+Run from the project root:
+    python utility_scripts/generate_synthetic_data.py
+    python utility_scripts/benchmark_hot_routes.py [--requests 30] [--compare instance/benchmarks/<older>.json]
+"""
+import sys
+import os
+import argparse
+import json
+import logging
+import platform
+import sqlite3
+import subprocess
+import tempfile
+import shutil
+from datetime import datetime
+from time import perf_counter
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, func
+from website.config import Config
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the hot routes on a synthetic database")
+    parser.add_argument('--db', default='synthetic.db', help='synthetic database in the instance folder')
+    parser.add_argument('--requests', type=int, default=30, help='timed requests per case')
+    parser.add_argument('--warmup', type=int, default=2, help='untimed requests per case')
+    parser.add_argument('--elo-runs', type=int, default=3, help='timed runs of func_calculate_ELO_full')
+    parser.add_argument('--only', help='comma separated case names to run')
+    parser.add_argument('--output', help='JSON results file (default instance/benchmarks/<time>-<commit>.json)')
+    parser.add_argument('--compare', help='earlier JSON results to compare with')
+    return parser.parse_args(argv)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class StatementCounter:
+    """Counts the SQL statements sent by the engine while active."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def measure(fn, counter, nbr_runs, nbr_warmup):
+    """Run fn nbr_warmup + nbr_runs times; returns the timings (s), statements and status codes of the timed runs."""
+    timings, statements, statuses = [], [], {}
+    for n in range(nbr_warmup + nbr_runs):
+        before = counter.count
+        started = perf_counter()
+        status = fn()
+        elapsed = perf_counter() - started
+        if status is None:
+            break  # nothing left to do (e.g. no more games to score)
+        if n >= nbr_warmup:
+            timings.append(elapsed)
+            statements.append(counter.count - before)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return timings, statements, statuses
+
+
+def summary(timings, statements, statuses):
+    return {
+        'runs': len(timings),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 2) if timings else 0,
+        'p50_ms': round(percentile(timings, 50) * 1000, 2),
+        'p95_ms': round(percentile(timings, 95) * 1000, 2),
+        'p99_ms': round(percentile(timings, 99) * 1000, 2),
+        'max_ms': round(max(timings) * 1000, 2) if timings else 0,
+        'queries_p50': percentile(statements, 50),
+        'queries_max': max(statements) if statements else 0,
+        'statuses': statuses,
+    }
+
+
+def pick_targets(db):
+    """The busiest objects of the dataset: what production traffic hits hardest."""
+    from website.models import Event, EventType, Club, Users, League, Game, GameParticipation
+    live = (Event.query.join(EventType, Event.ev_type_id == EventType.et_id)
+            .filter(Event.ev_status == 'event_started')
+            .order_by((EventType.et_name == 'NonStop').asc(), Event.ev_max_players.desc(), Event.ev_id).first())
+    ended = Event.query.filter_by(ev_status='event_ended').order_by(Event.ev_max_players.desc(), Event.ev_date.desc()).first()
+    busiest_player = (db.session.query(GameParticipation.gpt_pl_id, func.count())
+                      .group_by(GameParticipation.gpt_pl_id).order_by(func.count().desc()).first())
+    league = (db.session.query(League).join(Game, Game.gm_idLeague == League.lg_id)
+              .filter(League.lg_name != 'Event System').group_by(League.lg_id)
+              .order_by(func.count(Game.gm_id).desc()).first())
+    club = (db.session.query(Club).join(Event, Event.ev_club_id == Club.cl_id).group_by(Club.cl_id)
+            .order_by(func.count(Event.ev_id).desc()).first())
+    superuser = Users.query.filter_by(us_is_superuser=True).first()
+    player = db.session.get(Users, busiest_player[0]) if busiest_player else None
+    return {
+        'live_event': (live.ev_id, live.ev_slug) if live else None,
+        'ended_event': (ended.ev_id, ended.ev_slug) if ended else None,
+        'player_id': player.us_id if player else None,
+        'search': player.us_name.split(' ')[-1] if player else 'Silva',
+        'league_id': league.lg_id if league else None,
+        'club_slug': club.cl_slug if club else None,
+        'superuser_id': superuser.us_id if superuser else None,
+    }
+
+
+def score_next_round(app, client, event_id):
+    """Submit scores for the pending games of the event, like the organizer does after a round."""
+    from website import db
+    from website.models import Game
+    with app.app_context():
+        pending = (Game.query.filter(Game.gm_idEvent == event_id, Game.gm_result_A.is_(None))
+                   .order_by(Game.gm_timeStart, Game.gm_id).all())
+        if not pending:
+            return None
+        round_start = pending[0].gm_timeStart
+        form = {}
+        for n, game in enumerate(g for g in pending if g.gm_timeStart == round_start):
+            form[f"scores[{game.gm_id}][A]"] = str(9 + n % 4)
+            form[f"scores[{game.gm_id}][B]"] = str(7 - n % 4)
+        db.session.remove()
+    return client.post(f"/update_all_game_scores/{event_id}", data=form).status_code
+
+
+def run_elo_full(app):
+    from website.tools import func_calculate_ELO_full
+    with app.app_context():
+        func_calculate_ELO_full()
+    return 'ok'
+
+
+def build_cases(app, anonymous, organizer, targets):
+    from website.render_cache import fragment_cache
+
+    def get(client, url):
+        return lambda: client.get(url).status_code
+
+    def tv_render(url):
+        def run():
+            fragment_cache.clear()
+            return anonymous.get(url).status_code
+        return run
+
+    cases = [('events', get(anonymous, '/events'))]
+    if targets['ended_event']:
+        cases.append(('event_public', get(anonymous, f"/event/{targets['ended_event'][1]}")))
+    if targets['live_event']:
+        event_id, slug = targets['live_event']
+        cases += [
+            ('detail_event', get(organizer, f"/detail_event/{slug}")),
+            ('event_tv_data_render', tv_render(f"/event_tv_data/{event_id}?version=-1")),
+            ('event_tv_data_cached', get(anonymous, f"/event_tv_data/{event_id}?version=-1")),
+        ]
+    if targets['club_slug']:
+        cases.append(('elo_ranking_club', get(anonymous, f"/elo_ranking/{targets['club_slug']}")))
+    if targets['player_id']:
+        cases += [
+            ('player_info', get(anonymous, f"/player_info/{targets['player_id']}")),
+            ('player_profile', get(anonymous, f"/player_profile/{targets['player_id']}")),
+        ]
+    if targets['league_id']:
+        cases.append(('league', get(anonymous, f"/league/{targets['league_id']}")))
+    cases.append(('search', get(anonymous, f"/search?query={targets['search']}")))
+    cases.append(('elo_full', lambda: run_elo_full(app)))
+    # Last: it changes the data the other cases read
+    if targets['live_event']:
+        cases.append(('score_submission', lambda: score_next_round(app, organizer, targets['live_event'][0])))
+    return cases
+
+
+def dataset_counts(db):
+    tables = ['tb_users', 'tb_club', 'tb_league', 'tb_gameday', 'tb_event', 'tb_game', 'tb_event_registration', 'tb_ELO_ranking_hist']
+    with db.engine.connect() as connection:
+        return {table: connection.exec_driver_sql(f'SELECT COUNT(*) FROM "{table}"').scalar() for table in tables}
+
+
+def print_comparison(results, previous):
+    print(f"\n=== COMPARED WITH {previous.get('commit')} ({previous.get('created_at')}) ===\n")
+    print(f"{'case':<24}{'p50 ms':>24}{'p95 ms':>24}{'queries':>12}")
+    for name, current in results.items():
+        before = previous.get('results', {}).get(name)
+        if not before:
+            print(f"{name:<24}{'(new)':>24}")
+            continue
+
+        def delta(key):
+            old, new = before[key], current[key]
+            change = f"{(new - old) / old * 100:+.0f}%" if old else ''
+            return f"{old:g}->{new:g} {change}"
+        print(f"{name:<24}{delta('p50_ms'):>24}{delta('p95_ms'):>24}{before['queries_p50']:>7}->{current['queries_p50']:<4}")
+
+
+def benchmark_hot_routes(argv=None):
+    args = parse_args(argv)
+    from website import create_app, db
+    from website.tasks import stop_background_tasks
+
+    source = os.path.join(ROOT, 'instance', args.db)
+    if not os.path.isfile(source):
+        print(f"❌ {source} not found, run utility_scripts/generate_synthetic_data.py first")
+        return False
+
+    workdir = tempfile.mkdtemp()
+    try:
+        # A consistent copy (WAL included) so the score submissions never touch the generated database
+        copy_path = os.path.join(workdir, 'benchmark.db')
+        with sqlite3.connect(source) as src, sqlite3.connect(copy_path) as dst:
+            src.backup(dst)
+        Config.DB_NAME = copy_path
+        app = create_app()
+        stop_background_tasks()
+        # Requests over the SQL thresholds would log a line each
+        logging.getLogger('website.sql').setLevel(logging.ERROR)
+
+        anonymous = app.test_client()
+        organizer = app.test_client()
+        with app.app_context():
+            targets = pick_targets(db)
+            dataset = dataset_counts(db)
+            counter = StatementCounter(db.engine)
+        with organizer.session_transaction() as sess:
+            sess['_user_id'] = str(targets['superuser_id'])
+
+        only = set(args.only.split(',')) if args.only else None
+        print(f"=== HOT ROUTES BENCHMARK: {args.requests} requests per case, commit {git_commit()} ===\n")
+        print('dataset: ' + ', '.join(f"{table} {count}" for table, count in dataset.items()) + '\n')
+        print(f"{'case':<24}{'runs':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}  statuses")
+        results = {}
+        for name, fn in build_cases(app, anonymous, organizer, targets):
+            if only and name not in only:
+                continue
+            nbr_runs = args.elo_runs if name == 'elo_full' else args.requests
+            nbr_warmup = 0 if name in ('elo_full', 'score_submission') else args.warmup
+            result = summary(*measure(fn, counter, nbr_runs, nbr_warmup))
+            results[name] = result
+            print(f"{name:<24}{result['runs']:>5}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}"
+                  f"{result['queries_p50']:>9}  {result['statuses']}")
+
+        report = {
+            'commit': git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'args': {'db': args.db, 'requests': args.requests, 'warmup': args.warmup, 'elo_runs': args.elo_runs},
+            'dataset': dataset,
+            'targets': targets,
+            'results': results,
+        }
+        output = args.output or os.path.join(ROOT, 'instance', 'benchmarks',
+                                              f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json")
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ results saved to {output}")
+
+        if args.compare:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                print_comparison(results, json.load(f))
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        return True
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if benchmark_hot_routes() else 1)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the /search trigram index on a synthetic database with 100k users
+(generated with generate_synthetic_data.py the first time).
+Measures the index build (time and memory), search and autocomplete latency, and compares the best
+match and its latency with the full scan /search used to do (difflib against every name).
+
+Run from the project root:
+    python utility_scripts/benchmark_search_index.py [--players 100000] [--queries 300] [--scan-queries 5]
+"""
+import sys
+import os
+import argparse
+import difflib
+import logging
+import random
+import tracemalloc
+from time import perf_counter
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from website.config import Config
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the /search trigram index")
+    parser.add_argument('--db', default='search100k.db', help='synthetic database in the instance folder (generated if missing)')
+    parser.add_argument('--players', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=300, help='timed index searches')
+    parser.add_argument('--scan-queries', type=int, default=5, help='queries also answered with the old full scan (slow)')
+    parser.add_argument('--seed', type=int, default=11)
+    return parser.parse_args(argv)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def make_queries(names, count, rng):
+    """What people type: a first or last name, a prefix, a full name with a typo."""
+    queries = []
+    while len(queries) < count:
+        name = rng.choice(names)
+        kind = len(queries) % 3
+        if kind == 0:
+            queries.append(rng.choice(name.split()))
+        elif kind == 1:
+            queries.append(name[:rng.randint(3, len(name))])
+        else:
+            chars = list(name.lower())
+            chars[rng.randrange(len(chars))] = rng.choice('abcdefghijklmnopqrstuvwxyz')
+            queries.append(''.join(chars))
+    return queries
+
+
+def full_scan(query, rows):
+    """Best match the way /search found it before the index: difflib against every name."""
+    query = query.lower()
+    best = (0.0, None, None)
+    for kind, obj_id, name in rows:
+        name = name.lower()
+        if query in name:
+            score = 1.0 - (len(name) - len(query)) * 0.001
+        else:
+            score = difflib.SequenceMatcher(None, query, name).ratio()
+        if score > best[0]:
+            best = (score, kind, obj_id)
+    return best
+
+
+def benchmark_search_index(argv=None):
+    args = parse_args(argv)
+    if not os.path.isfile(os.path.join(ROOT, 'instance', args.db)):
+        from generate_synthetic_data import generate_synthetic_data
+        if not generate_synthetic_data(['--db', args.db, '--clubs', '2', '--players', str(args.players), '--years', '1',
+                                        '--events-per-week', '1', '--seed', str(args.seed)]):
+            return False
+
+    Config.DB_NAME = args.db
+    from website import create_app, db
+    from website.models import Users, Event, Club
+    from website.search_index import search_index
+    from website.tasks import stop_background_tasks
+    app = create_app()
+    stop_background_tasks()
+    logging.getLogger('website.sql').setLevel(logging.ERROR)
+    rng = random.Random(args.seed)
+
+    with app.app_context():
+        rows = ([('event', i, n) for i, n in db.session.query(Event.ev_id, Event.ev_title).filter(Event.ev_status != 'canceled')]
+                + [('user', i, n) for i, n in db.session.query(Users.us_id, Users.us_name).filter(Users.us_is_active == True)]
+                + [('club', i, n) for i, n in db.session.query(Club.cl_id, Club.cl_name).filter(Club.cl_active == True)])
+        print(f"=== SEARCH INDEX BENCHMARK: {len(rows)} searchable names ===\n")
+
+        search_index.rebuild()
+        print(f"build:           {search_index.build_seconds * 1000:.0f} ms")
+        tracemalloc.start()
+        search_index.rebuild()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        search_index.rebuild()  # the timed searches run on an index built without tracing
+        stats = search_index.stats()
+        print(f"memory:          {memory / 1024 / 1024:.1f} MB for {stats['documents']} documents, {stats['trigrams']} trigrams\n")
+
+        queries = make_queries([n for _, _, n in rows], args.queries, rng)
+        for query in queries[:20]:
+            search_index.search(query, limit=1)  # warm up
+        timings = {'top-1': [], 'top-8': []}
+        for query in queries:
+            for label, limit in (('top-1', 1), ('top-8', 8)):
+                started = perf_counter()
+                search_index.search(query, limit=limit)
+                timings[label].append(perf_counter() - started)
+        print(f"{'index search':<16}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for label, values in timings.items():
+            print(f"{label:<16}{percentile(values, 50) * 1000:>9.2f}{percentile(values, 95) * 1000:>9.2f}"
+                  f"{percentile(values, 99) * 1000:>9.2f}{max(values) * 1000:>9.2f}")
+
+    client = app.test_client()
+    endpoint = []
+    for query in queries[:100]:
+        started = perf_counter()
+        response = client.get('/search_suggestions', query_string={'query': query})
+        endpoint.append(perf_counter() - started)
+    print(f"{'/search_suggestions':<16}{percentile(endpoint, 50) * 1000:>9.2f}{percentile(endpoint, 95) * 1000:>9.2f}"
+          f"{percentile(endpoint, 99) * 1000:>9.2f}{max(endpoint) * 1000:>9.2f}  (status {response.status_code})")
+
+    print(f"\n=== INDEX VS FULL SCAN ({args.scan_queries} queries) ===\n")
+    worse = 0
+    scan_seconds = []
+    with app.app_context():
+        for query in queries[:args.scan_queries]:
+            started = perf_counter()
+            scan = full_scan(query, rows)
+            scan_seconds.append(perf_counter() - started)
+            found = search_index.search(query, limit=1)
+            index_score = found[0][0] if found else 0.0
+            # The index folds accents and also matches club nicknames, so it may score higher, never lower
+            ok = index_score >= scan[0] - 1e-9 or scan[0] < 0.35
+            worse += not ok
+            print(f"{'✅' if ok else '❌'} {query!r:<32} scan {scan[0]:.3f} {scan[1]} {scan[2]}  index "
+                  + (f"{found[0][0]:.3f} {found[0][1]} {found[0][2]}" if found else '-'))
+        db.session.remove()
+        db.engine.dispose()
+    if scan_seconds:
+        print(f"\nfull scan: {sum(scan_seconds) / len(scan_seconds) * 1000:.0f} ms per query")
+    print(f"\n=== SEARCH INDEX BENCHMARK COMPLETE: {worse} worse than the full scan ===")
+    return worse == 0
+
+
+if __name__ == '__main__':
+    sys.exit(0 if benchmark_search_index() else 1)
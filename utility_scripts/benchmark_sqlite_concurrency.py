@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark of the SQLite engine settings.
+Runs score-entry writers, a periodic long recalculation and TV-polling readers in parallel threads
+against two copies of the database: one opened with the driver defaults (rollback journal, no pragmas)
+and one with the settings from Config (WAL, busy timeout, cache, mmap...).
+Prints lock errors and p50/p95 latency.
+
+Run from the project root:
+    python utility_scripts/benchmark_sqlite_concurrency.py [writers] [readers] [seconds]
+"""
+import sys
+import os
+import shutil
+import tempfile
+import threading
+from time import perf_counter, sleep
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from website import create_app, db
+from website.config import Config
+from website.db_engine import engine_options, configure_sqlite
+
+READ_SQL = [
+    "SELECT * FROM tb_game WHERE gm_idEvent = :event_id ORDER BY gm_timeStart, gm_id",
+    "SELECT * FROM tb_event_classification WHERE ec_event_id = :event_id",
+    "SELECT ev_data_version FROM tb_event WHERE ev_id = :event_id",
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_workload(engine, games, nbr_writers, nbr_readers, seconds):
+    stop = threading.Event()
+    lock = threading.Lock()
+    results = {'read': [], 'write': [], 'lock_errors': 0, 'other_errors': 0}
+
+    def record(kind, started, error=None):
+        with lock:
+            if error is None:
+                results[kind].append(perf_counter() - started)
+            elif 'locked' in str(error) or 'busy' in str(error):
+                results['lock_errors'] += 1
+            else:
+                results['other_errors'] += 1
+
+    def writer(offset):
+        i = offset
+        while not stop.is_set():
+            gm_id, event_id = games[i % len(games)]
+            i += 1
+            started = perf_counter()
+            try:
+                # Same shape as a score entry: read the game, write it, bump the event version
+                with engine.begin() as connection:
+                    connection.execute(text("SELECT * FROM tb_game WHERE gm_id = :gm_id"), {'gm_id': gm_id})
+                    connection.execute(text("UPDATE tb_game SET gm_result_A = gm_result_A WHERE gm_id = :gm_id"), {'gm_id': gm_id})
+                    connection.execute(text("UPDATE tb_event SET ev_data_version = ev_data_version + 1 WHERE ev_id = :event_id"), {'event_id': event_id})
+                record('write', started)
+            except OperationalError as e:
+                record('write', started, e)
+            sleep(0.005)
+
+    def reader(offset):
+        i = offset
+        while not stop.is_set():
+            event_id = games[i % len(games)][1]
+            i += 1
+            started = perf_counter()
+            try:
+                with engine.connect() as connection:
+                    for sql in READ_SQL:
+                        connection.execute(text(sql), {'event_id': event_id}).fetchall()
+                record('read', started)
+            except OperationalError as e:
+                record('read', started, e)
+
+    def recalculation():
+        # A long write every second, like an ELO recalculation rewriting many rows in one transaction
+        while not stop.wait(1):
+            started = perf_counter()
+            try:
+                with engine.begin() as connection:
+                    connection.execute(text("UPDATE tb_game SET gm_result_B = gm_result_B"))
+                    sleep(0.2)
+                record('write', started)
+            except OperationalError as e:
+                record('write', started, e)
+
+    threads = [threading.Thread(target=recalculation)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(nbr_writers)]
+    threads += [threading.Thread(target=reader, args=(n,)) for n in range(nbr_readers)]
+    for t in threads:
+        t.start()
+    sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return results
+
+
+def report(label, results, seconds):
+    print(f"{label:<10} "
+          f"writes {len(results['write']) / seconds:7.1f}/s  p50 {percentile(results['write'], 50) * 1000:7.1f} ms  p95 {percentile(results['write'], 95) * 1000:7.1f} ms | "
+          f"reads {len(results['read']) / seconds:7.1f}/s  p50 {percentile(results['read'], 50) * 1000:6.1f} ms  p95 {percentile(results['read'], 95) * 1000:6.1f} ms | "
+          f"lock errors {results['lock_errors']}  other errors {results['other_errors']}")
+
+
+def benchmark_sqlite_concurrency():
+    nbr_writers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    nbr_readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    app = create_app()
+    with app.app_context():
+        source = db.engine.url.database
+        games = db.session.execute(text("SELECT gm_id, gm_idEvent FROM tb_game WHERE gm_idEvent IS NOT NULL")).all()
+        db.session.remove()
+        db.engine.dispose()
+    if not games:
+        print("No event games in the database to benchmark.")
+        return
+
+    print(f"=== SQLITE CONCURRENCY: {nbr_writers} writers, {nbr_readers} readers, {seconds:g}s ===\n")
+    workdir = tempfile.mkdtemp()
+    try:
+        legacy_path = os.path.join(workdir, 'legacy.db')
+        tuned_path = os.path.join(workdir, 'tuned.db')
+        shutil.copy(source, legacy_path)
+        shutil.copy(source, tuned_path)
+
+        legacy = create_engine(f"sqlite:///{legacy_path}", connect_args={'check_same_thread': False})
+        with legacy.begin() as connection:
+            connection.execute(text("PRAGMA journal_mode = DELETE"))
+        tuned = configure_sqlite(create_engine(f"sqlite:///{tuned_path}", **engine_options(Config)), Config)
+
+        legacy_results = run_workload(legacy, games, nbr_writers, nbr_readers, seconds)
+        report('defaults', legacy_results, seconds)
+        tuned_results = run_workload(tuned, games, nbr_writers, nbr_readers, seconds)
+        report('tuned', tuned_results, seconds)
+        legacy.dispose()
+        tuned.dispose()
+
+        if tuned_results['lock_errors'] <= legacy_results['lock_errors']:
+            print(f"\n✅ lock errors {legacy_results['lock_errors']} -> {tuned_results['lock_errors']}, "
+                  f"write p95 {percentile(legacy_results['write'], 95) * 1000:.1f} -> {percentile(tuned_results['write'], 95) * 1000:.1f} ms, "
+                  f"read p95 {percentile(legacy_results['read'], 95) * 1000:.1f} -> {percentile(tuned_results['read'], 95) * 1000:.1f} ms")
+        else:
+            print("\n❌ the tuned settings produced more lock errors")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchmark_sqlite_concurrency()
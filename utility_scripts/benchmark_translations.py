@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the translation catalog on the event detail page.
+Renders /detail_event/<slug> with the shared catalog and again with the old behaviour
+(translations.json parsed on every translate() call) and prints the per-request times.
+
+Run from the project root:
+    python utility_scripts/benchmark_translations.py [event_id] [requests]
+"""
+import sys
+import os
+import json
+from time import perf_counter
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from website import create_app
+from website.models import Event, Users
+from website.translations import catalog, TRANSLATIONS_PATH, request_language
+
+
+def legacy_translate(text):
+    # What every translate() call used to do
+    with open(TRANSLATIONS_PATH, 'r', encoding='utf-8') as f:
+        translations = json.load(f)
+    lang = request_language()
+    if text in translations and lang in translations[text]:
+        return translations[text][lang]
+    return text
+
+
+def time_requests(client, url, nbr_requests):
+    client.get(url)  # warm up templates and caches
+    timings = []
+    for _ in range(nbr_requests):
+        started = perf_counter()
+        response = client.get(url)
+        timings.append(perf_counter() - started)
+        assert response.status_code == 200, f"{url} returned {response.status_code}"
+    timings.sort()
+    return sum(timings) / len(timings), timings[len(timings) // 2]
+
+
+def benchmark_translations():
+    event_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    nbr_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    app = create_app()
+    with app.app_context():
+        event = Event.query.get(event_id) if event_id else Event.query.order_by(Event.ev_id.desc()).first()
+        superuser = Users.query.filter_by(us_is_superuser=True).first()
+        if not event or not superuser:
+            print("Need an event and a superuser in the database to benchmark.")
+            return
+        url = f"/detail_event/{event.ev_slug}"
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(superuser.us_id)
+        sess['_fresh'] = True
+
+    print(f"=== TRANSLATION BENCHMARK: {url}, {nbr_requests} requests ===\n")
+
+    loads_before = catalog.loads
+    avg_new, median_new = time_requests(client, url, nbr_requests)
+    print(f"shared catalog : avg {avg_new * 1000:8.2f} ms   median {median_new * 1000:8.2f} ms   file loads {catalog.loads - loads_before}")
+
+    # Swap every translate() entry point for the old per-call parse
+    import website.views as views_module
+    import website.gameday as gameday_module
+    saved = views_module.translate, gameday_module.translate, app.jinja_env.globals['translate']
+    views_module.translate = gameday_module.translate = legacy_translate
+    app.jinja_env.globals['translate'] = legacy_translate
+    try:
+        avg_old, median_old = time_requests(client, url, nbr_requests)
+    finally:
+        views_module.translate, gameday_module.translate, app.jinja_env.globals['translate'] = saved
+    print(f"per-call parse : avg {avg_old * 1000:8.2f} ms   median {median_old * 1000:8.2f} ms")
+
+    print(f"\n✅ {avg_old / avg_new:.1f}x faster per request with the shared catalog")
+
+
+if __name__ == '__main__':
+    benchmark_translations()
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator.
+Fills a fresh SQLite database in the instance folder with clubs, courts, players, leagues with weekly
+gamedays and years of Mexicano / Americano / NonStop events, all with scored games, then builds every
+derived table the app keeps (participation, pair stats, classifications, ELO) with the app's own functions.
+
+Distributions:
+- player strength ~ normal(1000, 200); game scores follow the ELO win expectancy of the two teams
+- player activity is heavy-tailed (Pareto), so a few regulars play most events, like at a real club
+- each player has a home club where they play most of their events
+- event sizes 8/12/16 players, types weighted towards Mexicano
+- the last event of every club is live (last round unscored) and a few future events take registrations
+
+The same --seed gives the same database, so benchmark runs on it can be compared.
+
+Run from the project root:
+    python utility_scripts/generate_synthetic_data.py [--db synthetic.db] [--clubs 3] [--players 600] [--years 3]
+"""
+import sys
+import os
+import argparse
+import logging
+import random
+from datetime import date, datetime, time, timedelta, timezone
+from time import perf_counter
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from website.config import Config
+
+DEFAULT_DB_NAME = 'synthetic.db'
+# The application database, never overwritten (checks set Config.DB_NAME to their own database)
+APP_DB_NAME = Config.DB_NAME
+# Small dataset of the checks in utility_scripts: enough of everything, generated in a few seconds
+TEST_DATASET_ARGS = ['--clubs', '2', '--players', '200', '--years', '1', '--events-per-week', '1',
+                     '--end-date', '2025-06-30', '--seed', '7']
+
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Diogo', 'Eva', 'Filipe', 'Gonçalo', 'Helena', 'Inês', 'João', 'Katia', 'Luís',
+               'Marta', 'Nuno', 'Olga', 'Pedro', 'Quim', 'Rita', 'Sofia', 'Tiago', 'Ulisses', 'Vera', 'Xavier', 'Zé',
+               'Miguel', 'Beatriz', 'Rui', 'Joana', 'André', 'Catarina', 'Ricardo', 'Mariana', 'Paulo', 'Teresa']
+LAST_NAMES = ['Silva', 'Santos', 'Ferreira', 'Pereira', 'Oliveira', 'Costa', 'Rodrigues', 'Martins', 'Jesus', 'Sousa',
+              'Fernandes', 'Gonçalves', 'Gomes', 'Lopes', 'Marques', 'Alves', 'Almeida', 'Ribeiro', 'Pinto', 'Carvalho',
+              'Teixeira', 'Moreira', 'Correia', 'Mendes', 'Nunes', 'Soares', 'Vieira', 'Monteiro', 'Cardoso', 'Rocha']
+CLUB_NAMES = ['Padel Lisboa', 'Public Events', 'Cascais Padel Club', 'Porto Indoor Padel', 'Algarve Padel Center',
+              'Braga Padel', 'Coimbra Padel Club', 'Setúbal Padel']
+
+# (type name, weight, possible rounds) - NonStop rounds come from the round-robin of fixed teams
+EVENT_TYPES = [('Mexicano', 0.6, (5, 6, 7, 8)), ('Americano', 0.25, (5, 6, 7)), ('NonStop', 0.15, None)]
+EVENT_SIZES = [(8, 0.5), (12, 0.3), (16, 0.2)]
+MEXICANO_POINTS = 16
+HOME_CLUB_SHARE = 0.85
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--db', default=DEFAULT_DB_NAME, help='database file name, created in the instance folder')
+    parser.add_argument('--clubs', type=int, default=3, help='clubs running events (the Public Events club comes on top)')
+    parser.add_argument('--players', type=int, default=600)
+    parser.add_argument('--years', type=float, default=3, help='years of history up to --end-date')
+    parser.add_argument('--events-per-week', type=float, default=1.5, help='average events per club and week')
+    parser.add_argument('--leagues-per-year', type=int, default=2, help='leagues per club and year')
+    parser.add_argument('--end-date', type=date.fromisoformat, default=date.today())
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def win_expectancy(team_a, team_b, strength):
+    rating_a = (strength[team_a[0]] + strength[team_a[1]]) / 2
+    rating_b = (strength[team_b[0]] + strength[team_b[1]]) / 2
+    return 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
+
+
+def points_score(rng, expectancy):
+    """Mexicano/Americano score: MEXICANO_POINTS points shared between the two teams."""
+    result_a = sum(1 for _ in range(MEXICANO_POINTS) if rng.random() < expectancy)
+    return result_a, MEXICANO_POINTS - result_a
+
+
+def set_score(rng, expectancy):
+    """League score: one set, 6-x or 7-5 / 7-6."""
+    loser = rng.choices([0, 1, 2, 3, 4, 5, 6], weights=[2, 5, 10, 14, 16, 6, 4])[0]
+    winner = 6 if loser <= 4 else 7
+    return (winner, loser) if rng.random() < expectancy else (loser, winner)
+
+
+class SyntheticData:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.start_date = args.end_date - timedelta(days=int(args.years * 365))
+        self.next_id = {}
+        self.rows = {}
+        self.strength = {}
+        self.activity = {}
+        self.home_club = {}
+        self.names = {}
+
+    def new_id(self, table):
+        self.next_id[table] = self.next_id.get(table, 0) + 1
+        return self.next_id[table]
+
+    def add(self, model, **values):
+        self.rows.setdefault(model, []).append(values)
+        return values
+
+    # --- people and places -------------------------------------------------------------
+
+    def build_clubs(self):
+        from website.models import Club, Court
+        self.clubs = []
+        self.courts = {}
+        for i in range(self.args.clubs + 1):
+            name = CLUB_NAMES[i] if i < len(CLUB_NAMES) else f"Padel Club {i}"
+            cl_id = self.new_id('club')
+            self.add(Club, cl_id=cl_id, cl_name=name, cl_slug=name.replace(' ', '_'), cl_active=True,
+                     cl_email=f"info{cl_id}@example.com", cl_phone=f"21{cl_id:07d}")
+            self.courts[cl_id] = []
+            for n in range(self.rng.randint(4, 8)):
+                ct_id = self.new_id('court')
+                self.add(Court, ct_id=ct_id, ct_name=f"Court {n + 1}", ct_sport='padel', ct_club_id=cl_id)
+                self.courts[cl_id].append(ct_id)
+            self.clubs.append(cl_id)
+        # Club 2 is the Public Events club the views special-case; the others run leagues and events
+        self.event_clubs = [cl_id for cl_id in self.clubs if cl_id != 2]
+
+    def build_users(self):
+        from website.models import Users, PlayerClubNickname
+        from werkzeug.security import generate_password_hash
+        self.superuser_id = self.new_id('user')
+        self.add(Users, us_id=self.superuser_id, us_name='Admin', us_email='admin@example.com', us_telephone='900000000',
+                 us_pwd=generate_password_hash('admin'), us_birthday=date(1980, 1, 1), us_is_player=False,
+                 us_is_manager=True, us_is_admin=True, us_is_superuser=True, us_is_active=True, us_hide_from_elo=False)
+        used_names = set()
+        self.players = []
+        for n in range(self.args.players):
+            name = f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+            while name in used_names:
+                name = f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+                if name in used_names:
+                    name = f"{name} {n}"
+            used_names.add(name)
+            us_id = self.new_id('user')
+            self.add(Users, us_id=us_id, us_name=name, us_email=f"player{us_id}@example.com", us_telephone=f"91{us_id:07d}",
+                     us_birthday=date(self.rng.randint(1960, 2006), self.rng.randint(1, 12), self.rng.randint(1, 28)),
+                     us_is_player=True, us_is_manager=False, us_is_admin=False, us_is_superuser=False,
+                     us_is_active=self.rng.random() > 0.03, us_hide_from_elo=self.rng.random() < 0.02)
+            self.players.append(us_id)
+            self.names[us_id] = name
+            self.strength[us_id] = self.rng.gauss(1000, 200)
+            self.activity[us_id] = self.rng.paretovariate(1.2)
+            self.home_club[us_id] = self.rng.choice(self.event_clubs)
+            if self.rng.random() < 0.2:
+                self.add(PlayerClubNickname, pcn_user_id=us_id, pcn_club_id=self.home_club[us_id],
+                         pcn_nickname=name.split(' ')[0] + name.split(' ')[1][:1])
+
+    def pick_players(self, club_id, count):
+        """count distinct players, mostly from the club, weighted by activity."""
+        local = [p for p in self.players if self.home_club[p] == club_id] or self.players
+        count = min(count, len(self.players))
+        chosen = set()
+        while len(chosen) < count:
+            pool = local if self.rng.random() < HOME_CLUB_SHARE else self.players
+            chosen.add(self.rng.choices(pool, weights=[self.activity[p] for p in pool])[0])
+        chosen = list(chosen)
+        self.rng.shuffle(chosen)
+        return chosen
+
+    # --- games -------------------------------------------------------------------------
+
+    def add_game(self, league_id, gameday_id, event_id, day, start, minutes, court, team_a, team_b, score, teams=(None, None)):
+        from website.models import Game
+        end = (datetime.combine(day, start) + timedelta(minutes=minutes)).time()
+        self.add(Game, gm_id=self.new_id('game'), gm_idLeague=league_id, gm_idGameDay=gameday_id, gm_idEvent=event_id,
+                 gm_date=day, gm_timeStart=start, gm_timeEnd=end, gm_court=court,
+                 gm_idPlayer_A1=team_a[0], gm_idPlayer_A2=team_a[1], gm_idPlayer_B1=team_b[0], gm_idPlayer_B2=team_b[1],
+                 gm_result_A=score[0] if score else None, gm_result_B=score[1] if score else None,
+                 gm_teamA=teams[0], gm_teamB=teams[1])
+
+    def build_leagues(self):
+        from website.models import League, LeagueCourts, LeaguePlayers, GameDay, GameDayPlayer
+        from website.views import generate_round_robin_schedule
+        self.gamedays = []
+        self.leagues = []
+        year_start = self.start_date
+        while year_start <= self.args.end_date + timedelta(days=60):
+            for club_id in self.event_clubs:
+                for n in range(self.args.leagues_per_year):
+                    nbr_teams = self.rng.choice([4, 4, 6, 8])
+                    nbr_days = self.rng.randint(10, 14)
+                    start = year_start + timedelta(days=n * 150 + self.rng.randint(0, 20))
+                    start += timedelta(days=(1 - start.weekday()) % 7)  # leagues play on Tuesdays
+                    end = start + timedelta(weeks=nbr_days - 1)
+                    if end < self.args.end_date:
+                        status = 'finished'
+                    elif start <= self.args.end_date:
+                        status = 'being played'
+                    else:
+                        status = 'accepting registrations'
+                    lg_id = self.new_id('league')
+                    self.add(League, lg_id=lg_id, lg_club_id=club_id, lg_name=f"Liga {start.year} {'ABCDEFG'[n]}",
+                             lg_level=self.rng.choice(['M3', 'M4', 'F3', 'MX']), lg_status=status, lg_nbrDays=nbr_days,
+                             lg_nbrTeams=nbr_teams, lg_nbr_substitutes=2, lg_nbr_auto_substitutes=0, lg_presence_points=1,
+                             lg_startDate=start, lg_endDate=end,
+                             lg_registration_start=datetime.combine(start - timedelta(days=40), time(9, 0), tzinfo=timezone.utc),
+                             lg_registration_end=datetime.combine(start - timedelta(days=7), time(23, 0), tzinfo=timezone.utc),
+                             lg_startTime=time(20, 0), lg_minWarmUp=10, lg_minPerGame=25, lg_minBetweenGames=5,
+                             lg_typeOfLeague='Non-fixed teams', lg_eloK=self.rng.choice([16, 24, 32]),
+                             lg_max_players=nbr_teams * 2 + 2)
+                    self.leagues.append(lg_id)
+                    courts = self.courts[club_id][:nbr_teams // 2]
+                    for ct_id in courts:
+                        self.add(LeagueCourts, lc_league_id=lg_id, lc_court_id=ct_id)
+                    roster = self.pick_players(club_id, nbr_teams * 2 + 2)
+                    for us_id in roster:
+                        self.add(LeaguePlayers, lp_league_id=lg_id, lp_player_id=us_id, lp_registered_by_id=self.superuser_id)
+                    if status == 'accepting registrations':
+                        continue
+                    schedule = generate_round_robin_schedule(nbr_teams)
+                    for day_nbr in range(nbr_days):
+                        day = start + timedelta(weeks=day_nbr)
+                        played = day < self.args.end_date
+                        gd_id = self.new_id('gameday')
+                        self.add(GameDay, gd_id=gd_id, gd_idLeague=lg_id, gd_date=day, gd_gameDayName=f"Jornada {day_nbr + 1}",
+                                 gd_status='finished' if played else 'announced')
+                        if not played:
+                            continue
+                        self.gamedays.append(gd_id)
+                        present = self.rng.sample(roster, nbr_teams * 2)
+                        teams = [present[i:i + 2] for i in range(0, len(present), 2)]
+                        for i, us_id in enumerate(present):
+                            self.add(GameDayPlayer, gp_idLeague=lg_id, gp_idGameDay=gd_id, gp_idPlayer=us_id, gp_team='ABCDEFGH'[i // 2])
+                        start_time = datetime.combine(day, time(20, 10))
+                        for round_matchups in schedule:
+                            for court, (a, b) in zip(courts, round_matchups):
+                                score = set_score(self.rng, win_expectancy(teams[a], teams[b], self.strength))
+                                self.add_game(lg_id, gd_id, None, day, start_time.time(), 25, court, teams[a], teams[b], score,
+                                              ('ABCDEFGH'[a], 'ABCDEFGH'[b]))
+                            start_time += timedelta(minutes=30)
+            year_start += timedelta(days=365)
+
+    def build_events(self):
+        from website.models import (League, GameDay, GameDayPlayer, EventType, MexicanConfig, Event, EventRegistration,
+                                    EventCourts)
+        from website.views import generate_round_robin_schedule
+        self.event_types = {}
+        for order, (name, _, _) in enumerate(EVENT_TYPES, start=1):
+            et_id = self.new_id('event_type')
+            self.add(EventType, et_id=et_id, et_name=name, et_order=order, et_has_config=name == 'Mexicano', et_is_active=True)
+            self.event_types[name] = et_id
+        self.add(MexicanConfig, mc_event_type_id=self.event_types['Mexicano'], mc_name='Standard Mexicano',
+                 mc_max_points=MEXICANO_POINTS, mc_is_default=True, mc_is_active=True)
+        # The league every event game hangs from, as create_games_for_event makes it
+        self.event_league_id = self.new_id('league')
+        self.add(League, lg_id=self.event_league_id, lg_name='Event System', lg_club_id=1, lg_startDate=self.start_date,
+                 lg_endDate=self.args.end_date + timedelta(days=365), lg_status='active', lg_nbrDays=1, lg_max_players=100,
+                 lg_nbr_substitutes=0, lg_nbr_auto_substitutes=0, lg_presence_points=0)
+
+        self.events = []
+        self.live_events = []
+        for club_id in self.clubs:
+            per_week = self.args.events_per_week if club_id != 2 else self.args.events_per_week / 4
+            week = self.start_date
+            last_event = None
+            while week <= self.args.end_date:
+                for _ in range(self.poisson(per_week)):
+                    day = week + timedelta(days=self.rng.randint(0, 6))
+                    if day <= self.args.end_date:
+                        last_event = self.build_event(club_id, day, generate_round_robin_schedule)
+                week += timedelta(weeks=1)
+            if last_event:
+                self.live_events.append(last_event)
+            # Upcoming events taking registrations
+            for n in range(2):
+                self.build_event(club_id, self.args.end_date + timedelta(days=3 + 7 * n), None)
+
+    def poisson(self, mean):
+        # Knuth's method, small means only
+        limit, count, product = 2.718281828 ** -mean, 0, self.rng.random()
+        while product > limit:
+            count += 1
+            product *= self.rng.random()
+        return count
+
+    def build_event(self, club_id, day, round_robin):
+        from website.models import GameDay, GameDayPlayer, Event, EventRegistration, EventCourts
+        type_name = self.rng.choices([t[0] for t in EVENT_TYPES], weights=[t[1] for t in EVENT_TYPES])[0]
+        size = self.rng.choices([s[0] for s in EVENT_SIZES], weights=[s[1] for s in EVENT_SIZES])[0]
+        courts = self.courts[club_id][:size // 4]
+        size = len(courts) * 4
+        start_time = time(19, 0) if day.weekday() < 5 else time(10, 0)
+        future = round_robin is None
+        ev_id = self.new_id('event')
+        event = self.add(Event, ev_id=ev_id, ev_club_id=club_id, ev_title=f"{type_name} {day.strftime('%d/%m/%Y')}",
+                         ev_location=None, ev_date=day, ev_start_time=start_time, ev_type_id=self.event_types[type_name],
+                         ev_max_players=size, ev_nbr_substitutes=2,
+                         ev_registration_start=datetime.combine(day - timedelta(days=10), time(9, 0), tzinfo=timezone.utc),
+                         ev_registration_end=datetime.combine(day - timedelta(days=1), time(22, 0), tzinfo=timezone.utc),
+                         ev_pairing_type=self.rng.choice(['Random', 'Random', 'Ranking']),
+                         ev_status='registration_started' if future else 'event_ended',
+                         ev_winner1_id=None, ev_winner2_id=None, ev_created_by_id=self.superuser_id,
+                         ev_exclude_from_elo=self.rng.random() < 0.03, ev_data_version=0)
+        for ct_id in courts:
+            self.add(EventCourts, evc_event_id=ev_id, evc_court_id=ct_id)
+        players = self.pick_players(club_id, size + (0 if future else self.rng.choice([0, 0, 1, 2])))
+        if future:
+            players = players[:self.rng.randint(size // 2, size)]
+        for i, us_id in enumerate(players):
+            self.add(EventRegistration, er_event_id=ev_id, er_player_id=us_id, er_registered_by_id=self.superuser_id,
+                     er_is_substitute=i >= size)
+        if future:
+            return ev_id
+        players = players[:size]
+
+        gd_id = self.new_id('gameday')
+        self.add(GameDay, gd_id=gd_id, gd_idLeague=self.event_league_id, gd_date=day,
+                 gd_gameDayName=f"Event {event['ev_title']} - Games", gd_status='active')
+        for us_id in players:
+            self.add(GameDayPlayer, gp_idLeague=self.event_league_id, gp_idGameDay=gd_id, gp_idPlayer=us_id)
+
+        points = {us_id: 0 for us_id in players}
+        diff = {us_id: 0 for us_id in players}
+        round_start = datetime.combine(day, start_time)
+        if type_name == 'NonStop':
+            teams = [players[i:i + 2] for i in range(0, size, 2)]
+            rounds = [[(teams[a], teams[b]) for a, b in matchups] for matchups in round_robin(len(teams))]
+            minutes = {8: 25, 12: 20, 16: 15}.get(size, 20)
+        else:
+            nbr_rounds = self.rng.choice(dict((t[0], t[2]) for t in EVENT_TYPES)[type_name])
+            rounds = [None] * nbr_rounds
+            minutes = self.rng.choice([15, 18, 20])
+        for round_nbr, matchups in enumerate(rounds):
+            if matchups is None:
+                if type_name == 'Mexicano' and round_nbr > 0:
+                    # Mexicano: groups of four by standings, 1st+4th against 2nd+3rd
+                    order = sorted(players, key=lambda p: (-points[p], -diff[p]))
+                else:
+                    order = self.rng.sample(players, size)
+                matchups = [((g[0], g[3]), (g[1], g[2])) for g in (order[i:i + 4] for i in range(0, size, 4))]
+                matchups = matchups[:len(courts)]
+            for court, (team_a, team_b) in zip(courts, matchups):
+                score = points_score(self.rng, win_expectancy(team_a, team_b, self.strength))
+                self.add_game(self.event_league_id, gd_id, ev_id, day, round_start.time(), minutes, court, team_a, team_b, score)
+                for team, favor, against in ((team_a, score[0], score[1]), (team_b, score[1], score[0])):
+                    for us_id in team:
+                        points[us_id] += 3 if favor > against else 0
+                        diff[us_id] += favor - against
+            round_start += timedelta(minutes=minutes + 3)
+        return ev_id
+
+    def mark_live_events(self):
+        """The last event of each club is still being played: its last round has no scores yet."""
+        from website.models import Event, Game
+        live = set(self.live_events)
+        for event in self.rows[Event]:
+            if event['ev_id'] in live:
+                event['ev_status'] = 'event_started'
+        last_round = {}
+        for game in self.rows[Game]:
+            if game['gm_idEvent'] in live:
+                last_round[game['gm_idEvent']] = max(last_round.get(game['gm_idEvent'], time(0, 0)), game['gm_timeStart'])
+        for game in self.rows[Game]:
+            if game['gm_idEvent'] in live and game['gm_timeStart'] == last_round[game['gm_idEvent']]:
+                game['gm_result_A'] = game['gm_result_B'] = None
+
+    def build(self):
+        self.build_clubs()
+        self.build_users()
+        self.build_leagues()
+        self.build_events()
+        self.mark_live_events()
+
+
+def write_rows(data, chunk_size=2000):
+    """Insert the generated rows table by table, parents first, with executemany batches."""
+    from website import db
+    for model in sorted(data.rows, key=lambda m: [t.name for t in db.metadata.sorted_tables].index(m.__tablename__)):
+        # An executemany takes its columns from the first row, so rows with other keys go in their own batches
+        by_columns = {}
+        for row in data.rows[model]:
+            by_columns.setdefault(tuple(row), []).append(row)
+        for rows in by_columns.values():
+            for i in range(0, len(rows), chunk_size):
+                # Plain Core inserts: the ORM events are skipped, the derived tables are rebuilt below
+                db.session.execute(model.__table__.insert(), rows[i:i + chunk_size])
+    db.session.commit()
+
+
+def build_derived_tables(data):
+    """Everything the app maintains from the games, computed by the app itself."""
+    from website import db
+    from website.models import Event, EventClassification
+    from website.tools import (func_rebuild_game_participation, func_calculateGameDayClassification,
+                               func_calculateLeagueClassification, func_calculate_ELO_full, func_update_club_ELO)
+    from website.views import calculate_event_classifications
+    from website.db_engine import optimize_database
+
+    func_rebuild_game_participation()
+    for gd_id in data.gamedays:
+        func_calculateGameDayClassification(gd_id)
+    for lg_id in data.leagues:
+        func_calculateLeagueClassification(lg_id)
+
+    played = [row['ev_id'] for row in data.rows[Event] if row['ev_status'] != 'registration_started']
+    for ev_id in played:
+        calculate_event_classifications(ev_id)
+    db.session.commit()
+    # Winners of the finished events, as the organizer would set them from the standings
+    for ev_id in played:
+        event = db.session.get(Event, ev_id)
+        if event.ev_status != 'event_ended':
+            continue
+        top = (EventClassification.query.filter_by(ec_event_id=ev_id)
+               .order_by(EventClassification.ec_points.desc(), EventClassification.ec_games_diff.desc()).limit(2).all())
+        event.ev_winner1_id = top[0].ec_player_id if top else None
+        event.ev_winner2_id = top[1].ec_player_id if len(top) > 1 else None
+    db.session.commit()
+
+    func_calculate_ELO_full()
+    for club_id in data.event_clubs:
+        func_update_club_ELO(club_id, force_rebuild=True)
+    optimize_database(db.engine)
+
+
+def generate_synthetic_data(argv=None):
+    args = parse_args(argv)
+    if args.db == APP_DB_NAME:
+        print(f"❌ {args.db} is the application database, choose another name")
+        return None
+
+    Config.DB_NAME = args.db
+    from website import create_app, db
+    from website.tasks import stop_background_tasks
+    app = create_app()
+    # The status thread would write to the database while it is being filled
+    stop_background_tasks()
+
+    path = os.path.join(app.instance_path, args.db)
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        db.create_all()
+
+        print(f"=== SYNTHETIC DATA: {args.clubs} clubs, {args.players} players, {args.years:g} years, seed {args.seed} ===\n")
+        started = perf_counter()
+        data = SyntheticData(args)
+        data.build()
+        write_rows(data)
+        for model, rows in data.rows.items():
+            print(f"{model.__tablename__:<28} {len(rows):>8}")
+        print(f"\nrows written in {perf_counter() - started:.1f}s, building derived tables...")
+
+        started = perf_counter()
+        build_derived_tables(data)
+        print(f"derived tables built in {perf_counter() - started:.1f}s")
+        print(f"\n✅ {path}")
+    return path
+
+
+def synthetic_test_app(db_name):
+    """Generate a fresh TEST_DATASET_ARGS database named db_name and return an app on it, for the
+    checks in utility_scripts that change data. Fails the calling check when generation fails."""
+    assert generate_synthetic_data(['--db', db_name] + TEST_DATASET_ARGS), f"could not generate {db_name}"
+    Config.DB_NAME = db_name
+    from website import create_app
+    from website.render_cache import fragment_cache
+    from website.search_index import search_index
+    from website.tasks import stop_background_tasks
+    app = create_app()
+    stop_background_tasks()
+    logging.getLogger('website.sql').setLevel(logging.ERROR)
+    # Process-wide caches are keyed by ids: entries of a database used before would answer for this one
+    fragment_cache.clear()
+    search_index.invalidate()
+    return app
+
+
+if __name__ == '__main__':
+    sys.exit(0 if generate_synthetic_data() else 1)
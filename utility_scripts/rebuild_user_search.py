@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Rebuild the FTS5 user search table (tb_user_search) behind /search_users from tb_users and
+tb_player_nickname, and recreate its triggers.
+The triggers keep the table current on their own; run this after restoring a backup, after
+changes made with the triggers dropped, or when the search results look stale.
+
+Run from the project root:
+    python utility_scripts/rebuild_user_search.py
+"""
+import sys
+import os
+from time import perf_counter
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from website import create_app, db
+from website.user_search import rebuild_user_search
+
+
+def run():
+    app = create_app()
+    with app.app_context():
+        started = perf_counter()
+        try:
+            users = rebuild_user_search(db.engine)
+        except Exception as e:
+            print(f"❌ Error rebuilding the user search table: {e}")
+            return False
+        print(f"✅ User search table rebuilt: {users} users in {(perf_counter() - started) * 1000:.0f} ms")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run() else 1)
@@ -0,0 +1,37 @@
+"""
+setup_game_participation.py
+---------------------------
+Rebuilds tb_game_participation (one row per game and player) and the
+tb_player_pair_stats totals derived from it, from tb_game.
+Both are kept in sync by the Game ORM events; run this once after creating them,
+or whenever games were changed outside the app.
+
+Run from the project root:
+    python utility_scripts/setup_game_participation.py
+"""
+import sys
+import os
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import app
+from website.models import Game
+from website.tools import func_rebuild_game_participation
+
+
+def run():
+    with app.app_context():
+        nbr_games = Game.query.count()
+        print(f"Rebuilding participation rows for {nbr_games} games...")
+
+        nbr_rows = func_rebuild_game_participation()
+        if nbr_rows is None:
+            print("ERROR: rebuild failed, nothing was changed.")
+            return
+
+        print(f"✅ {nbr_rows} participation rows written")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Query-count check for the league and gameday classification functions.
+Recalculating a classification must issue the same small number of SQL statements
+whatever the number of players, so the old per-player query loop can't come back.
+Runs on a fresh synthetic database, generated in the instance folder.
+
+Run from the project root:
+    python utility_scripts/test_classification_queries.py
+"""
+import sys
+import os
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, func
+from generate_synthetic_data import synthetic_test_app
+
+TEST_DB_NAME = 'classification_test.db'
+
+# Maximum number of statements per recalculation, independent of the number of players
+GAMEDAY_QUERY_BUDGET = 8
+LEAGUE_QUERY_BUDGET = 6
+
+
+def count_queries(fn, *args):
+    from website import db
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        fn(*args)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def test_classification_queries():
+    app = synthetic_test_app(TEST_DB_NAME)
+    from website import db
+    from website.models import GameDay, GameDayPlayer, GameDayClassification, LeagueClassification
+    from website.tools import func_calculateGameDayClassification, func_calculateLeagueClassification
+    with app.app_context():
+        print("=== CLASSIFICATION QUERY COUNT ===\n")
+
+        # The gameday with the most players is the one a per-player loop would hurt the most
+        row = (
+            db.session.query(GameDayPlayer.gp_idGameDay, func.count(GameDayPlayer.gp_id).label('nbr_players'))
+            .group_by(GameDayPlayer.gp_idGameDay)
+            .order_by(func.count(GameDayPlayer.gp_id).desc())
+            .first()
+        )
+        assert row, "the synthetic database has no gameday players"
+
+        gameday = db.session.get(GameDay, row.gp_idGameDay)
+        league_id = gameday.gd_idLeague
+        db.session.expunge_all()
+
+        statements = count_queries(func_calculateGameDayClassification, row.gp_idGameDay)
+        print(f"func_calculateGameDayClassification({row.gp_idGameDay}): {row.nbr_players} players, {len(statements)} statements")
+        assert len(statements) <= GAMEDAY_QUERY_BUDGET, "\n".join(statements)
+        # The function logs and rolls back on errors: a failed recalculation would also fit the budget
+        rows = GameDayClassification.query.filter_by(gc_idGameDay=row.gp_idGameDay).count()
+        assert rows == row.nbr_players, f"{rows} classification rows for {row.nbr_players} players"
+        print(f"✅ within budget of {GAMEDAY_QUERY_BUDGET}")
+
+        db.session.expunge_all()
+        statements = count_queries(func_calculateLeagueClassification, league_id)
+        print(f"\nfunc_calculateLeagueClassification({league_id}): {len(statements)} statements")
+        assert len(statements) <= LEAGUE_QUERY_BUDGET, "\n".join(statements)
+        league_players = (db.session.query(func.count(func.distinct(GameDayPlayer.gp_idPlayer)))
+                          .filter(GameDayPlayer.gp_idLeague == league_id).scalar())
+        rows = LeagueClassification.query.filter_by(lc_idLeague=league_id).count()
+        assert rows == league_players, f"{rows} classification rows for {league_players} players"
+        print(f"✅ within budget of {LEAGUE_QUERY_BUDGET}")
+
+        db.session.remove()
+        db.engine.dispose()
+        print("\n=== CLASSIFICATION QUERY COUNT COMPLETE ===")
+
+
+if __name__ == '__main__':
+    try:
+        test_classification_queries()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
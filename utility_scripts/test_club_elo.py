@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Check of the materialized club ELO ranking (tb_club_ELO_ranking).
+On a fresh synthetic database, after each operation that changes the rated games of a club (scoring a
+round, scoring an old game out of order, editing a past score, moving an event to another club,
+toggling an event out of and back into the ELO, deleting an event), the ranking advanced from the
+club's watermark must equal a forced full replay.
+
+Run from the project root:
+    python utility_scripts/test_club_elo.py
+"""
+import sys
+import os
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from generate_synthetic_data import synthetic_test_app
+
+TEST_DB_NAME = 'club_elo_test.db'
+
+
+def ranking_snapshot(club_id):
+    from website.models import ClubELOranking
+    return {
+        row.ce_pl_id: (round(row.ce_rankingNow, 6), row.ce_wins, row.ce_losses, row.ce_totalGames)
+        for row in ClubELOranking.query.filter_by(ce_club_id=club_id)
+    }
+
+
+def assert_incremental_equals_full(app, club_ids, label):
+    from website import db
+    from website.tools import func_update_club_ELO
+    with app.app_context():
+        for club_id in club_ids:
+            func_update_club_ELO(club_id)
+            incremental = ranking_snapshot(club_id)
+            func_update_club_ELO(club_id, force_rebuild=True)
+            full = ranking_snapshot(club_id)
+            differing = sorted(pid for pid in incremental.keys() | full.keys() if incremental.get(pid) != full.get(pid))
+            assert incremental and not differing, (
+                f"{label}: club {club_id} has {len(differing)} players differing from a full replay, "
+                + ', '.join(f"{pid}: {incremental.get(pid)} != {full.get(pid)}" for pid in differing[:5])
+            )
+        db.session.remove()
+    print(f"✅ {label}")
+
+
+def test_club_elo():
+    app = synthetic_test_app(TEST_DB_NAME)
+    from website import db
+    from website.models import Event, Game, Users
+    client = app.test_client()
+
+    with app.app_context():
+        superuser_id = db.session.query(Users.us_id).filter(Users.us_is_superuser == True).scalar()
+        live = Event.query.filter(Event.ev_status == 'event_started').order_by(Event.ev_id).first()
+        live_id, club_id = live.ev_id, live.ev_club_id
+        other_club_id = (db.session.query(Event.ev_club_id)
+                         .filter(Event.ev_club_id != club_id, Event.ev_status == 'event_started').limit(1).scalar())
+        club_ids = (club_id, other_club_id)
+        ended_ids = [ev_id for (ev_id,) in db.session.query(Event.ev_id).join(Game, Game.gm_idEvent == Event.ev_id)
+                     .filter(Event.ev_club_id == club_id, Event.ev_status == 'event_ended',
+                             Event.ev_exclude_from_elo != True)
+                     .group_by(Event.ev_id).order_by(Event.ev_date)]
+        db.session.remove()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(superuser_id)
+
+    def game_ids(event_id, scored):
+        with app.app_context():
+            games = Game.query.filter_by(gm_idEvent=event_id).order_by(Game.gm_timeStart, Game.gm_id).all()
+            ids = [g.gm_id for g in games if (g.gm_result_A is not None) == scored]
+            db.session.remove()
+        return ids
+
+    def post_scores(event_id, scores):
+        form = {}
+        for gm_id, (score_a, score_b) in scores.items():
+            form[f'scores[{gm_id}][A]'], form[f'scores[{gm_id}][B]'] = str(score_a), str(score_b)
+        assert client.post(f'/update_all_game_scores/{event_id}', data=form).status_code == 302
+
+    print("=== CLUB ELO: INCREMENTAL VS FULL REPLAY ===\n")
+    assert_incremental_equals_full(app, club_ids, "generated ranking")
+
+    # The live event's last round is unscored: scoring it is the plain incremental case
+    pending = game_ids(live_id, scored=False)
+    assert pending, "the live event has no unscored round"
+    post_scores(live_id, {gm_id: (10, 6) for gm_id in pending})
+    assert not set(pending) & set(game_ids(live_id, scored=False)), "the round was not scored"
+    assert_incremental_equals_full(app, club_ids, "scoring a round")
+
+    # A game of an old event scored after newer games were rated: behind the watermark
+    with app.app_context():
+        game = Game.query.filter_by(gm_idEvent=ended_ids[0]).order_by(Game.gm_id).first()
+        old_score = (game.gm_result_A, game.gm_result_B)
+        game.gm_result_A = game.gm_result_B = None
+        db.session.commit()
+        from website.tools import func_update_club_ELO
+        func_update_club_ELO(club_id, force_rebuild=True)
+        game = db.session.get(Game, game.gm_id)
+        game.gm_result_A, game.gm_result_B = old_score
+        db.session.commit()
+        db.session.remove()
+    assert_incremental_equals_full(app, club_ids, "scoring an old game out of order")
+
+    first_game = game_ids(live_id, scored=True)[0]
+    post_scores(live_id, {first_game: (2, 14)})
+    assert_incremental_equals_full(app, club_ids, "editing a past score")
+
+    with app.app_context():
+        event = db.session.get(Event, live_id)
+        form = {'tab': 'basic', 'title': event.ev_title, 'location': event.ev_location or '',
+                'club_id': str(other_club_id), 'date': event.ev_date.isoformat(),
+                'start_time': event.ev_start_time.strftime('%H:%M'), 'status': event.ev_status}
+        db.session.remove()
+    client.post(f'/edit_event/{live_id}', data=form)
+    with app.app_context():
+        assert db.session.get(Event, live_id).ev_club_id == other_club_id, "the event was not moved"
+        db.session.remove()
+    assert_incremental_equals_full(app, club_ids, "moving an event to another club")
+
+    for expected in (True, False):
+        client.post(f'/toggle_event_elo/{ended_ids[-1]}')
+        with app.app_context():
+            assert bool(db.session.get(Event, ended_ids[-1]).ev_exclude_from_elo) == expected
+            db.session.remove()
+        assert_incremental_equals_full(app, club_ids, f"toggling an event {'out of' if expected else 'back into'} the ELO")
+
+    client.post(f'/delete_event/{ended_ids[1]}')
+    with app.app_context():
+        assert db.session.get(Event, ended_ids[1]) is None, "the event was not deleted"
+        db.session.remove()
+    assert_incremental_equals_full(app, club_ids, "deleting an event")
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    print("\n=== CLUB ELO COMPLETE ===")
+
+
+if __name__ == '__main__':
+    try:
+        test_club_elo()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
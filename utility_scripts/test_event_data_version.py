@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Check of the event data versions (ev_data_version) behind the 304 answers of /event_tv_data.
+On a fresh synthetic database, renaming a player (ORM, bulk Query.update() and the raw SQL of the
+user form) and changing a club nickname must bump the events showing the player, and only those,
+so a screen polling with the version it rendered gets the new name instead of a 304.
+
+Run from the project root:
+    python utility_scripts/test_event_data_version.py
+"""
+import sys
+import os
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from generate_synthetic_data import synthetic_test_app
+
+TEST_DB_NAME = 'event_data_version_test.db'
+
+
+def event_versions():
+    from website import db
+    from website.models import Event
+    return dict(db.session.query(Event.ev_id, Event.ev_data_version))
+
+
+def bumped_since(before):
+    return {ev_id for ev_id, version in event_versions().items() if version != before[ev_id]}
+
+
+def test_event_data_version():
+    app = synthetic_test_app(TEST_DB_NAME)
+    from website import db
+    from website.models import Event, EventRegistration, PlayerClubNickname, Users, player_event_ids
+    client = app.test_client()
+
+    with app.app_context():
+        print("=== EVENT DATA VERSIONS ===\n")
+        live = Event.query.filter(Event.ev_status == 'event_started').order_by(Event.ev_id).first()
+        live_id, club_id = live.ev_id, live.ev_club_id
+        nicknamed = db.session.query(PlayerClubNickname.pcn_user_id).filter(PlayerClubNickname.pcn_club_id == club_id)
+        player_id = (db.session.query(EventRegistration.er_player_id)
+                     .join(Users, Users.us_id == EventRegistration.er_player_id)
+                     .filter(EventRegistration.er_event_id == live_id, ~EventRegistration.er_player_id.in_(nicknamed),
+                             Users.us_is_superuser == False)
+                     .order_by(EventRegistration.er_player_id).limit(1).scalar())
+        assert player_id, "the live event has no registered player without a nickname"
+        shown = player_event_ids(db.session.connection(), [player_id])
+        shown_in_club = player_event_ids(db.session.connection(), [player_id], [club_id])
+        assert live_id in shown and len(shown) > 1, f"player {player_id} is shown in {sorted(shown)} only"
+        superuser_id = db.session.query(Users.us_id).filter(Users.us_is_superuser == True).scalar()
+        db.session.commit()
+
+        before = event_versions()
+        db.session.get(Users, player_id).us_name = 'Renamed Through The ORM'
+        db.session.commit()
+        assert bumped_since(before) == shown, f"ORM rename bumped {sorted(bumped_since(before))}, expected {sorted(shown)}"
+        print(f"✅ ORM rename bumps the {len(shown)} events showing the player")
+
+        before = event_versions()
+        Users.query.filter(Users.us_id == player_id).update({Users.us_name: 'Renamed In Bulk'}, synchronize_session=False)
+        db.session.commit()
+        assert bumped_since(before) == shown, f"bulk rename bumped {sorted(bumped_since(before))}"
+        print("✅ bulk Query.update() rename bumps them too")
+
+        before = event_versions()
+        Users.query.filter(Users.us_id == player_id).update({Users.us_email: 'renamed@example.com'},
+                                                            synchronize_session=False)
+        db.session.get(Users, superuser_id).us_email = 'superuser@example.com'
+        db.session.commit()
+        assert not bumped_since(before), f"e-mail changes bumped {sorted(bumped_since(before))}"
+        print("✅ changes of columns the screens don't show bump nothing")
+
+        before = event_versions()
+        nickname = PlayerClubNickname(pcn_user_id=player_id, pcn_club_id=club_id, pcn_nickname='Nick')
+        db.session.add(nickname)
+        db.session.commit()
+        assert bumped_since(before) == shown_in_club, f"nickname bumped {sorted(bumped_since(before))}"
+        before = event_versions()
+        db.session.delete(nickname)
+        db.session.commit()
+        assert bumped_since(before) == shown_in_club, f"nickname delete bumped {sorted(bumped_since(before))}"
+        print(f"✅ nickname changes bump the player's {len(shown_in_club)} events of the club")
+
+        player = db.session.get(Users, player_id)
+        form = {'user_name': 'Renamed Through The Form', 'user_email': player.us_email or '',
+                'user_telephone': player.us_telephone or '910000000', 'user_birthday': '',
+                'user_active': 'on', 'user_player': 'on'}
+        rendered = event_versions()[live_id]
+        db.session.remove()
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(superuser_id)
+    response = client.get(f'/event_tv_data/{live_id}?version={rendered}')
+    assert response.status_code == 304, f"poll with the current version answered {response.status_code}"
+
+    with app.app_context():
+        before = event_versions()
+        db.session.remove()
+    client.post(f'/updateUser/{player_id}', data=form)
+    with app.app_context():
+        assert db.session.get(Users, player_id).us_name == form['user_name'], "the form did not rename the player"
+        assert bumped_since(before) == shown, f"raw SQL rename bumped {sorted(bumped_since(before))}"
+        db.session.remove()
+    response = client.get(f'/event_tv_data/{live_id}?version={rendered}')
+    assert response.status_code == 200 and form['user_name'] in response.get_json()['html'], (
+        f"poll after the rename answered {response.status_code} without the new name")
+    print("✅ raw SQL rename of the user form bumps them, and the TV poll gets the new name")
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    print("\n=== EVENT DATA VERSIONS COMPLETE ===")
+
+
+if __name__ == '__main__':
+    try:
+        test_event_data_version()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
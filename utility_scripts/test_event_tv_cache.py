@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Check of the shared TV render cache.
+After a change, the first screen polling /event_tv_data renders the fragment and every other
+screen gets the cached copy with a single statement, so a poll costs the same for 1 or 20 screens.
+Also checks that concurrent misses on one key compute it only once, and that screens of running
+events ranked by club ELO are refreshed when another event of the club moves the ranking.
+Runs on a fresh synthetic database, generated in the instance folder.
+
+Run from the project root:
+    python utility_scripts/test_event_tv_cache.py [screens]
+"""
+import sys
+import os
+import threading
+import time
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+from generate_synthetic_data import synthetic_test_app
+
+TEST_DB_NAME = 'event_tv_cache_test.db'
+
+# Statements for a poll served from the cache: only the ev_data_version lookup
+CACHED_POLL_BUDGET = 1
+
+
+def count_statements(fn):
+    from website import db
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return result, statements
+
+
+def check_single_flight():
+    from website.render_cache import FragmentCache
+    cache = FragmentCache(max_entries=2)
+    calls = []
+
+    def slow_compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'value'
+
+    threads = [threading.Thread(target=cache.get_or_compute, args=(('key',), slow_compute)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1, f"computed {len(calls)} times"
+    print(f"8 concurrent misses computed once: {cache.stats()}")
+
+    for key in ('a', 'b', 'c'):
+        cache.get_or_compute((key,), lambda: key)
+    assert cache.stats()['entries'] == 2 and cache.stats()['evictions'] == 2
+    print("✅ single-flight and LRU bound")
+
+
+def check_club_elo_tiebreak(app, client):
+    """Standings of Mexicano events with Ranking pairing break ties by club ELO: scoring a round of
+    another event of the club moves the ranking, so the screens of those still running must not keep
+    getting 304s. Ended events keep their cached standings."""
+    from website import db
+    from website.models import Event, EventType, Game, Users
+    with app.app_context():
+        live = Event.query.filter(Event.ev_status == 'event_started').order_by(Event.ev_id).first()
+        ranked = (Event.query.join(EventType).filter(
+            Event.ev_club_id == live.ev_club_id, Event.ev_id != live.ev_id, EventType.et_name == 'Mexicano',
+            Event.ev_pairing_type == 'Ranking', Event.ev_status == 'event_ended').order_by(Event.ev_id.desc()).limit(2).all())
+        assert len(ranked) == 2, "the synthetic database has no two ended Mexicano events with Ranking pairing"
+        running, ended = ranked
+        running.ev_status = 'event_started'
+        db.session.commit()
+        live_id = live.ev_id
+        rendered = {ev.ev_id: ev.ev_data_version for ev in ranked}
+        pending = [g.gm_id for g in Game.query.filter_by(gm_idEvent=live_id, gm_result_A=None)]
+        superuser_id = db.session.query(Users.us_id).filter(Users.us_is_superuser == True).scalar()
+        db.session.remove()
+    assert pending, "the live event has no unscored round"
+    for ev_id, version in rendered.items():
+        assert client.get(f"/event_tv_data/{ev_id}?version={version}").status_code == 304
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(superuser_id)
+    form = {}
+    for gm_id in pending:
+        form[f'scores[{gm_id}][A]'], form[f'scores[{gm_id}][B]'] = '12', '4'
+    client.post(f'/update_all_game_scores/{live_id}', data=form)
+    with client.session_transaction() as sess:
+        sess.clear()
+
+    running_id, ended_id = rendered
+    response = client.get(f"/event_tv_data/{running_id}?version={rendered[running_id]}")
+    assert response.status_code == 200, (
+        f"event {running_id} answered {response.status_code} after the club ELO moved")
+    print(f"✅ scoring event {live_id} refreshes the club ELO tiebreak of running event {running_id}")
+    response = client.get(f"/event_tv_data/{ended_id}?version={rendered[ended_id]}")
+    assert response.status_code == 304, f"ended event {ended_id} was refreshed ({response.status_code})"
+    print(f"✅ ended event {ended_id} keeps its cached standings")
+
+
+def test_event_tv_cache(nbr_screens=10):
+    app = synthetic_test_app(TEST_DB_NAME)
+    from website import db
+    from website.models import Event, Game
+    from website.render_cache import fragment_cache
+    client = app.test_client()
+    with app.app_context():
+        print("=== EVENT TV RENDER CACHE ===\n")
+        check_single_flight()
+
+        ev = Event.query.join(Game, Game.gm_idEvent == Event.ev_id).order_by(Event.ev_id.desc()).first()
+        assert ev, "the synthetic database has no event with games"
+        event_id = ev.ev_id
+        # Simulate a change so every screen sees a version it has not rendered yet
+        ev.ev_data_version = ev.ev_data_version + 1
+        db.session.commit()
+
+        url = f"/event_tv_data/{event_id}?version=-1"
+        before = fragment_cache.stats()
+        response, statements = count_statements(lambda: client.get(url))
+        assert response.status_code == 200
+        print(f"\nfirst screen: {len(statements)} statements (renders the fragment)")
+
+        worst = 0
+        for _ in range(nbr_screens - 1):
+            response, statements = count_statements(lambda: client.get(url))
+            assert response.status_code == 200
+            worst = max(worst, len(statements))
+        after = fragment_cache.stats()
+        print(f"other {nbr_screens - 1} screens: at most {worst} statements each, "
+              f"{after['hits'] - before['hits']} cache hits, {after['misses'] - before['misses']} misses")
+        assert worst <= CACHED_POLL_BUDGET, f"cached poll took {worst} statements"
+        print(f"✅ cached polls within budget of {CACHED_POLL_BUDGET}")
+        db.session.remove()
+
+    check_club_elo_tiebreak(app, client)
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    print("\n=== EVENT TV RENDER CACHE COMPLETE ===")
+
+
+if __name__ == '__main__':
+    try:
+        test_event_tv_cache(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Check of the per-player game rows (tb_game_participation) kept current by the Game events.
+On a fresh synthetic database, after ORM inserts, updates and deletes, bulk Query.update() and
+Query.delete() statements and the raw SQL score writes of the gameday results form, the table must
+equal a rebuild from tb_game, and bulk updates of other columns must leave it alone.
+
+Run from the project root:
+    python utility_scripts/test_game_participation.py
+"""
+import sys
+import os
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+from generate_synthetic_data import synthetic_test_app
+
+TEST_DB_NAME = 'game_participation_test.db'
+
+
+def participation_snapshot():
+    from website import db
+    from website.models import GameParticipation
+    table = GameParticipation.__table__
+    return set(db.session.execute(table.select()).all())
+
+
+def assert_participation_equals_rebuild(label):
+    from website import db
+    from website.tools import func_rebuild_game_participation
+    db.session.commit()
+    incremental = participation_snapshot()
+    assert func_rebuild_game_participation() is not None, f"{label}: rebuild failed"
+    rebuilt = participation_snapshot()
+    assert incremental == rebuilt, (
+        f"{label}: {len(incremental - rebuilt)} stale rows, {len(rebuilt - incremental)} missing rows, e.g. "
+        f"{sorted(incremental - rebuilt)[:2]} / {sorted(rebuilt - incremental)[:2]}"
+    )
+    print(f"✅ {label}")
+
+
+def test_game_participation():
+    app = synthetic_test_app(TEST_DB_NAME)
+    from website import db
+    from website.models import Game, GameDay, League, Users
+    client = app.test_client()
+
+    with app.app_context():
+        print("=== GAME PARTICIPATION: INCREMENTAL VS REBUILD ===\n")
+        assert_participation_equals_rebuild("generated data")
+
+        template = Game.query.filter(Game.gm_idEvent.is_(None), Game.gm_result_A.isnot(None)).order_by(Game.gm_id).first()
+        template_id, gameday_id = template.gm_id, template.gm_idGameDay
+        game = Game(gm_idLeague=template.gm_idLeague, gm_idGameDay=template.gm_idGameDay, gm_date=template.gm_date,
+                    gm_timeStart=template.gm_timeStart, gm_court=template.gm_court,
+                    gm_idPlayer_A1=template.gm_idPlayer_B1, gm_idPlayer_A2=template.gm_idPlayer_B2,
+                    gm_idPlayer_B1=template.gm_idPlayer_A1, gm_idPlayer_B2=template.gm_idPlayer_A2,
+                    gm_result_A=4, gm_result_B=6)
+        db.session.add(game)
+        assert_participation_equals_rebuild("ORM insert")
+
+        game = db.session.get(Game, game.gm_id)
+        game.gm_idPlayer_A2, game.gm_idPlayer_B2 = game.gm_idPlayer_B2, game.gm_idPlayer_A2
+        game.gm_result_A = 7
+        assert_participation_equals_rebuild("ORM update")
+
+        db.session.delete(db.session.get(Game, game.gm_id))
+        assert_participation_equals_rebuild("ORM delete")
+
+        Game.query.filter(Game.gm_idGameDay == gameday_id).update(
+            {Game.gm_result_A: Game.gm_result_B, Game.gm_result_B: 5}, synchronize_session=False)
+        assert_participation_equals_rebuild("bulk Query.update()")
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            Game.query.filter(Game.gm_idGameDay == gameday_id).update({'gm_timeEnd': None}, synchronize_session=False)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        resync = [statement for statement in statements if 'tb_game_participation' in statement]
+        assert not resync, "a bulk update of other columns resynced the games:\n" + "\n".join(resync)
+        assert_participation_equals_rebuild("bulk Query.update() of other columns issues no resync")
+
+        Game.query.filter(Game.gm_idGameDay == gameday_id, Game.gm_id > template_id).delete(synchronize_session=False)
+        assert_participation_equals_rebuild("bulk Query.delete()")
+
+        # The gameday results form writes the scores with raw SQL, then resyncs the gameday
+        gameday = GameDay.query.join(Game, Game.gm_idGameDay == GameDay.gd_id).filter(
+            Game.gm_idEvent.is_(None), GameDay.gd_id != gameday_id).order_by(GameDay.gd_id).first()
+        gameday_id = gameday.gd_id
+        db.session.get(League, gameday.gd_idLeague).lg_status = 'being played'
+        game_ids = [gm_id for (gm_id,) in db.session.query(Game.gm_id).filter(Game.gm_idGameDay == gameday_id)]
+        superuser_id = db.session.query(Users.us_id).filter(Users.us_is_superuser == True).scalar()
+        db.session.commit()
+        db.session.remove()
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(superuser_id)
+    form = {}
+    for i, gm_id in enumerate(game_ids):
+        form[f'resultGameA{gm_id}'], form[f'resultGameB{gm_id}'] = str(i % 7), '6'
+    assert client.post(f'/submitResultsGameDay/{gameday_id}', data=form).status_code == 302
+
+    with app.app_context():
+        scores = {gm_id: result for gm_id, result in
+                  db.session.query(Game.gm_id, Game.gm_result_A).filter(Game.gm_idGameDay == gameday_id)}
+        assert scores == {gm_id: i % 7 for i, gm_id in enumerate(game_ids)}, "the results were not written"
+        assert_participation_equals_rebuild("raw SQL gameday results")
+
+        db.session.remove()
+        db.engine.dispose()
+    print("\n=== GAME PARTICIPATION COMPLETE ===")
+
+
+if __name__ == '__main__':
+    try:
+        test_game_participation()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
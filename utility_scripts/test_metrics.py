@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Check of the in-process metrics registry behind /metrics.
+Many threads record into one registry at once: no increment may be lost and the exposition must
+add them all up. Thousands of short-lived threads, one per request as the development server runs
+them, must neither lose increments nor grow the registry.
+Also prints the cost of recording one request (latency histogram + status counter + SQL counters).
+
+Run from the project root:
+    python utility_scripts/test_metrics.py
+"""
+import sys
+import os
+import threading
+from time import perf_counter
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from website.metrics import MetricsRegistry
+
+THREADS = 16
+PER_THREAD = 20000
+SHORT_LIVED_THREADS = 5000
+
+
+def test_metrics():
+    print("=== METRICS REGISTRY ===\n")
+    registry = MetricsRegistry()
+    requests = registry.counter('test_requests_total', 'Requests.', ('endpoint', 'status'))
+    latency = registry.histogram('test_latency_seconds', 'Latency.', ('endpoint',))
+
+    def worker():
+        for i in range(PER_THREAD):
+            requests.inc(('views.home', 200))
+            latency.observe('views.home', 0.001 if i % 2 else 0.2)
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    lines = registry.exposition().splitlines()
+    expected = THREADS * PER_THREAD
+    for line in (f'test_requests_total{{endpoint="views.home",status="200"}} {expected}',
+                 f'test_latency_seconds_count{{endpoint="views.home"}} {expected}',
+                 f'test_latency_seconds_bucket{{endpoint="views.home",le="0.005"}} {expected // 2}'):
+        assert line in lines, f"missing: {line}\n" + "\n".join(l for l in lines if l.startswith('test_'))
+        print(f"✅ {line}")
+
+    # One thread per request: every request is counted and the series stay bounded by the fixed shards
+    def request():
+        requests.inc(('views.detail_event', 200))
+        latency.observe('views.detail_event', 0.012)
+
+    started = perf_counter()
+    for _ in range(0, SHORT_LIVED_THREADS, 100):
+        threads = [threading.Thread(target=request) for _ in range(100)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    elapsed = perf_counter() - started
+    series = sum(1 for shard in registry._shards for key in shard.values if key[1] == 'views.detail_event')
+    assert series <= 2 * registry.SHARDS, f"{series} views.detail_event series for {registry.SHARDS} shards"
+    lines = registry.exposition().splitlines()
+    for line in (f'test_requests_total{{endpoint="views.detail_event",status="200"}} {SHORT_LIVED_THREADS}',
+                 f'test_latency_seconds_count{{endpoint="views.detail_event"}} {SHORT_LIVED_THREADS}'):
+        assert line in lines, f"missing: {line}\n" + "\n".join(l for l in lines if l.startswith('test_'))
+        print(f"✅ {line}")
+    print(f"✅ {SHORT_LIVED_THREADS} short-lived threads recorded into {series} series "
+          f"({elapsed / SHORT_LIVED_THREADS * 1e6:.0f} µs per thread, start and join included)")
+
+    # Cost of what the after_request hook records for one request
+    nbr = 200000
+    sql = registry.counter('test_db_queries_total', 'Queries.', ('endpoint',))
+    started = perf_counter()
+    for _ in range(nbr):
+        latency.observe('views.detail_event', 0.012)
+        requests.inc(('views.detail_event', 200))
+        sql.inc('views.detail_event', 27)
+    per_request = (perf_counter() - started) / nbr * 1e6
+    print(f"\nrecording one request: {per_request:.2f} µs")
+
+    print("\n=== METRICS REGISTRY COMPLETE ===")
+
+
+if __name__ == '__main__':
+    try:
+        test_metrics()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
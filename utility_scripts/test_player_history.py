@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Check of the keyset pages of the player_profile game history.
+On a fresh synthetic database where some games of a player have no date or no start time, walking
+the pages from cursor to cursor must list every game with a result exactly once, newest first, and
+the endpoint must answer the cursor of a game without date or start time.
+
+Run from the project root:
+    python utility_scripts/test_player_history.py
+"""
+import sys
+import os
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from generate_synthetic_data import synthetic_test_app
+
+TEST_DB_NAME = 'player_history_test.db'
+
+
+def test_player_history():
+    app = synthetic_test_app(TEST_DB_NAME)
+    from website import db
+    from website.models import Game, GameParticipation
+    from website.tools import func_get_player_game_history, func_parse_history_cursor
+    client = app.test_client()
+
+    with app.app_context():
+        print("=== PLAYER GAME HISTORY PAGES ===\n")
+        player_id, _ = (db.session.query(GameParticipation.gpt_pl_id, db.func.count())
+                        .filter(GameParticipation.gpt_result != None).group_by(GameParticipation.gpt_pl_id)
+                        .order_by(db.func.count().desc(), GameParticipation.gpt_pl_id).first())
+        game_ids = [gm_id for (gm_id,) in db.session.query(GameParticipation.gpt_gm_id).filter(
+            GameParticipation.gpt_pl_id == player_id, GameParticipation.gpt_result != None).order_by(GameParticipation.gpt_gm_id)]
+        undated, untimed = game_ids[1:4], game_ids[5:8]
+        for gm_id in undated:
+            db.session.get(Game, gm_id).gm_date = None
+        for gm_id in untimed:
+            db.session.get(Game, gm_id).gm_timeStart = None
+        db.session.commit()
+
+        # One game per page, so the cursor lands on every game, those without date or time included
+        listed, cursors, before = [], [], None
+        while True:
+            games, cursor = func_get_player_game_history(player_id, before, per_page=1)
+            listed += [(game['date'], game['time_start']) for game in games]
+            if cursor is None:
+                break
+            cursors.append(cursor)
+            before = func_parse_history_cursor(cursor)
+            assert len(listed) <= len(game_ids), f"the pages go on past the {len(game_ids)} games of player {player_id}"
+        assert len(listed) == len(game_ids), f"the pages list {len(listed)} of the {len(game_ids)} games of player {player_id}"
+        keys = [(day.isoformat() if day else '', start.isoformat() if start else '') for day, start in listed]
+        assert keys == sorted(keys, reverse=True), "the pages are not newest first, with the games without date last"
+        print(f"✅ {len(game_ids)} games of player {player_id} listed once each, "
+              f"{len(undated)} without date and {len(untimed)} without start time")
+        db.session.remove()
+
+    undated_cursors = [cursor for cursor in cursors if cursor.startswith('_')]
+    untimed_cursors = [cursor for cursor in cursors if '__' in cursor and not cursor.startswith('_')]
+    assert undated_cursors and untimed_cursors, f"no cursor on a game without date or start time: {cursors}"
+    for cursor in (undated_cursors[0], untimed_cursors[0]):
+        response = client.get(f'/player_profile/{player_id}/games', query_string={'before': cursor})
+        assert response.status_code == 200, f"cursor {cursor} answered {response.status_code}"
+        print(f"✅ /player_profile/{player_id}/games?before={cursor}: 200")
+    assert client.get(f'/player_profile/{player_id}/games', query_string={'before': 'x_y'}).status_code == 400
+    print("✅ malformed cursor: 400")
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    print("\n=== PLAYER GAME HISTORY PAGES COMPLETE ===")
+
+
+if __name__ == '__main__':
+    try:
+        test_player_history()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Check of the partnership and head-to-head matrix (tb_player_pair_stats) behind /compare_players.
+On a fresh synthetic database, after re-scoring, un-scoring and deleting games, the matrix moved by
+the participation deltas must equal func_rebuild_player_pair_stats, and the JSON endpoint must
+answer the totals counted from tb_game.
+
+Run from the project root:
+    python utility_scripts/test_player_pair_stats.py
+"""
+import sys
+import os
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from generate_synthetic_data import synthetic_test_app
+
+TEST_DB_NAME = 'player_pair_stats_test.db'
+
+
+def pair_stats_snapshot():
+    from website import db
+    from website.models import PlayerPairStats
+    return set(db.session.execute(PlayerPairStats.__table__.select()).all())
+
+
+def assert_pair_stats_equal_rebuild(label):
+    from website import db
+    from website.tools import func_rebuild_player_pair_stats
+    db.session.commit()
+    incremental = pair_stats_snapshot()
+    func_rebuild_player_pair_stats()
+    db.session.commit()
+    rebuilt = pair_stats_snapshot()
+    assert incremental == rebuilt, (
+        f"{label}: {len(incremental - rebuilt)} stale rows, {len(rebuilt - incremental)} missing rows, e.g. "
+        f"{sorted(incremental - rebuilt)[:2]} / {sorted(rebuilt - incremental)[:2]}"
+    )
+    print(f"✅ {label}")
+
+
+def expected_comparison(player_a, player_b):
+    """The /compare_players totals counted straight from tb_game, from player_a's side."""
+    from website.models import Game
+    totals = {relation: {'games': 0, 'wins': 0, 'losses': 0, 'games_diff': 0} for relation in ('together', 'against')}
+    for game in Game.query.all():
+        score_a, score_b = game.gm_result_A or 0, game.gm_result_B or 0
+        if not (score_a > 0 or score_b > 0):
+            continue
+        side_a, side_b = {game.gm_idPlayer_A1, game.gm_idPlayer_A2}, {game.gm_idPlayer_B1, game.gm_idPlayer_B2}
+        for mine, theirs, games_for, games_against in ((side_a, side_b, score_a, score_b), (side_b, side_a, score_b, score_a)):
+            if player_a not in mine:
+                continue
+            relation = 'together' if player_b in mine else 'against' if player_b in theirs else None
+            if relation:
+                totals[relation]['games'] += 1
+                totals[relation]['wins'] += games_for > games_against
+                totals[relation]['losses'] += games_for < games_against
+                totals[relation]['games_diff'] += games_for - games_against
+    for values in totals.values():
+        values['draws'] = values['games'] - values['wins'] - values['losses']
+        values['win_percentage'] = round(values['wins'] * 100 / values['games'], 2) if values['games'] else 0
+    return totals
+
+
+def test_player_pair_stats():
+    app = synthetic_test_app(TEST_DB_NAME)
+    from website import db
+    from website.models import ELOrankingHist, Game, PlayerPairStats, Users
+    client = app.test_client()
+
+    with app.app_context():
+        print("=== PLAYER PAIR STATS: INCREMENTAL VS REBUILD ===\n")
+        assert_pair_stats_equal_rebuild("generated data")
+
+        games = Game.query.filter(Game.gm_result_A.isnot(None)).order_by(Game.gm_id).limit(3).all()
+        rescored, unscored, deleted = (game.gm_id for game in games)
+
+        game = db.session.get(Game, rescored)
+        game.gm_result_A, game.gm_result_B = game.gm_result_B, (game.gm_result_A or 0) + 3
+        assert_pair_stats_equal_rebuild("re-scoring a game")
+
+        game = db.session.get(Game, unscored)
+        game.gm_result_A = game.gm_result_B = 0
+        assert_pair_stats_equal_rebuild("scoring a game 0-0 takes it out")
+
+        ELOrankingHist.query.filter_by(el_gm_id=deleted).delete()
+        db.session.delete(db.session.get(Game, deleted))
+        assert_pair_stats_equal_rebuild("deleting a game")
+
+        # Both directions of the pair with the most relations (together and against), and a pair that never met
+        pair = (db.session.query(PlayerPairStats.pp_pl_id, PlayerPairStats.pp_other_id)
+                .group_by(PlayerPairStats.pp_pl_id, PlayerPairStats.pp_other_id)
+                .order_by(db.func.count().desc(), PlayerPairStats.pp_pl_id, PlayerPairStats.pp_other_id).first())
+        strangers = (db.session.query(Users.us_id).filter(~Users.us_id.in_(db.session.query(PlayerPairStats.pp_pl_id)))
+                     .order_by(Users.us_id).limit(2).all())
+        missing_id = db.session.query(db.func.max(Users.us_id)).scalar() + 1
+        cases = [pair, (pair[1], pair[0]), tuple(user_id for (user_id,) in strangers)]
+        expected = [expected_comparison(*case) for case in cases]
+        db.session.remove()
+
+    print("\n=== /compare_players ===\n")
+    for (player_a, player_b), totals in zip(cases, expected):
+        response = client.get(f'/compare_players/{player_a}/{player_b}')
+        assert response.status_code == 200, f"/compare_players/{player_a}/{player_b}: {response.status_code}"
+        data = response.get_json()
+        assert data['player_a']['id'] == player_a and data['player_b']['id'] == player_b
+        assert {'together': data['together'], 'against': data['against']} == totals, (
+            f"/compare_players/{player_a}/{player_b}: {data} != {totals}")
+        print(f"✅ /compare_players/{player_a}/{player_b}: "
+              f"{totals['together']['games']} together, {totals['against']['games']} against")
+    assert client.get(f'/compare_players/{cases[0][0]}/{missing_id}').status_code == 404
+    print("✅ unknown player: 404")
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    print("\n=== PLAYER PAIR STATS COMPLETE ===")
+
+
+if __name__ == '__main__':
+    try:
+        test_player_pair_stats()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
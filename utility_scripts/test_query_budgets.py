@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+SQL statement budgets of the hot routes.
+Builds a small synthetic database (generate_synthetic_data.py, fixed seed) and requests every route for
+a small and a large target (a 4-team and an 8-team league, an 8- and a 16-player event, a player with
+few and with many games, the events page with two events and with the whole calendar...). A route fails when it sends more statements than its budget, or, for
+routes declared constant, when the large target needs more statements than the small one: that is an
+N+1 pattern, and the diff of the two statement lists shows the statement that repeats.
+
+Run from the project root:
+    python utility_scripts/test_query_budgets.py [--verbose]
+"""
+import sys
+import os
+import difflib
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, func
+from generate_synthetic_data import synthetic_test_app
+
+BUDGET_DB_NAME = 'query_budget.db'
+
+# route -> (max statements, constant in the size of the target)
+BUDGETS = {
+    'events': (10, True),
+    'event_public': (15, True),
+    'detail_event': (12, True),
+    'event_tv_data': (10, True),
+    'elo_ranking_club': (10, True),
+    'player_info': (10, True),
+    'player_profile': (10, True),
+    'league': (10, True),
+}
+
+
+def capture_statements(engine, fn):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        status = fn()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return status, statements
+
+
+@contextmanager
+def newest_events_only(app):
+    """The calendar down to the newest running and the newest ended event: the others are canceled meanwhile."""
+    from website import db
+    from website.models import Event
+    with app.app_context():
+        statuses = dict(db.session.query(Event.ev_id, Event.ev_status))
+        kept = [db.session.query(Event.ev_id).filter(Event.ev_status == status)
+                .order_by(Event.ev_date.desc(), Event.ev_id.desc()).limit(1).scalar()
+                for status in ('event_started', 'event_ended')]
+        Event.query.filter(Event.ev_id.notin_(kept)).update({Event.ev_status: 'canceled'}, synchronize_session=False)
+        db.session.commit()
+        db.session.remove()
+    try:
+        yield
+    finally:
+        with app.app_context():
+            for status in set(statuses.values()):
+                Event.query.filter(Event.ev_id.in_([ev_id for ev_id, was in statuses.items() if was == status])).update(
+                    {Event.ev_status: status}, synchronize_session=False)
+            db.session.commit()
+            db.session.remove()
+
+
+def pick_targets(db):
+    """(small, large) target of every route: a URL, or (URL, scope) when the size comes from the data
+    around it; scope(app) is a context manager changing the data meanwhile."""
+    from website.models import Event, Club, League, LeaguePlayers, GameParticipation, ClubELOranking
+    event_size = db.session.query(Event).filter(Event.ev_status == 'event_ended')
+    small_event = event_size.order_by(Event.ev_max_players.asc(), Event.ev_id).first()
+    large_event = event_size.order_by(Event.ev_max_players.desc(), Event.ev_id).first()
+
+    league_size = (db.session.query(League.lg_id).join(LeaguePlayers, LeaguePlayers.lp_league_id == League.lg_id)
+                   .filter(League.lg_status == 'finished').group_by(League.lg_id))
+    small_league = league_size.order_by(func.count().asc(), League.lg_id).first()[0]
+    large_league = league_size.order_by(func.count().desc(), League.lg_id).first()[0]
+
+    games = (db.session.query(GameParticipation.gpt_pl_id).group_by(GameParticipation.gpt_pl_id)
+             .having(func.count() >= 5))
+    casual = games.order_by(func.count().asc(), GameParticipation.gpt_pl_id).first()[0]
+    veteran = games.order_by(func.count().desc(), GameParticipation.gpt_pl_id).first()[0]
+
+    club_size = (db.session.query(Club.cl_slug).join(ClubELOranking, ClubELOranking.ce_club_id == Club.cl_id)
+                 .group_by(Club.cl_id))
+    small_club = club_size.order_by(func.count().asc(), Club.cl_id).first()[0]
+    large_club = club_size.order_by(func.count().desc(), Club.cl_id).first()[0]
+
+    return {
+        'events': (('/events', newest_events_only), '/events'),
+        'event_public': (f"/event/{small_event.ev_slug}", f"/event/{large_event.ev_slug}"),
+        'detail_event': (f"/detail_event/{small_event.ev_slug}", f"/detail_event/{large_event.ev_slug}"),
+        'event_tv_data': (f"/event_tv_data/{small_event.ev_id}?version=-1", f"/event_tv_data/{large_event.ev_id}?version=-1"),
+        'elo_ranking_club': (f"/elo_ranking/{small_club}", f"/elo_ranking/{large_club}"),
+        'player_info': (f"/player_info/{casual}", f"/player_info/{veteran}"),
+        'player_profile': (f"/player_profile/{casual}", f"/player_profile/{veteran}"),
+        'league': (f"/league/{small_league}", f"/league/{large_league}"),
+    }
+
+
+def _shorten(sql, width=160):
+    # Keep the end too: the WHERE clause tells which lookup repeats
+    return sql if len(sql) <= width else f"{sql[:width // 2 - 3]} ... {sql[-(width // 2 - 2):]}"
+
+
+def repeated_statements(statements, limit=5):
+    from website.sql_instrumentation import normalize_sql
+    counts = Counter(normalize_sql(s) for s in statements)
+    return [f"      x{count:<4} {_shorten(sql)}" for sql, count in counts.most_common(limit) if count > 1]
+
+
+def statement_diff(small, large):
+    from website.sql_instrumentation import normalize_sql
+    diff = difflib.unified_diff([_shorten(normalize_sql(s)) for s in small], [_shorten(normalize_sql(s)) for s in large],
+                                'small target', 'large target', lineterm='', n=1)
+    return [f"      {line}" for line in diff]
+
+
+def test_query_budgets(verbose=False):
+    app = synthetic_test_app(BUDGET_DB_NAME)
+    from website import db
+    from website.render_cache import fragment_cache
+
+    client = app.test_client()
+    with app.app_context():
+        targets = pick_targets(db)
+        superuser_id = db.session.execute(db.text("SELECT us_id FROM tb_users WHERE us_is_superuser = 1")).scalar()
+        engine = db.engine
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(superuser_id)
+
+    def request(url):
+        # Rendered caches would hide the statements of the render itself
+        fragment_cache.clear()
+        return client.get(url).status_code
+
+    def measure(target):
+        url, scope = target if isinstance(target, tuple) else (target, None)
+        with scope(app) if scope else nullcontext():
+            request(url)  # warm up: first-request work (ELO catch-up, catalogs) is not what the budget is about
+            status, statements = capture_statements(engine, lambda: request(url))
+        return url, status, statements
+
+    print("\n=== SQL STATEMENT BUDGETS ===\n")
+    print(f"{'route':<20}{'small':>7}{'large':>7}{'budget':>8}")
+    failures = []
+    for name, (budget, constant) in BUDGETS.items():
+        small_url, small_status, small = measure(targets[name][0])
+        large_url, large_status, large = measure(targets[name][1])
+
+        problems = []
+        if small_status != 200 or large_status != 200:
+            problems.append(f"status {small_status}/{large_status}")
+        if max(len(small), len(large)) > budget:
+            problems.append(f"over budget of {budget}")
+        if constant and len(large) > len(small):
+            problems.append(f"grows with the target ({len(small)} -> {len(large)})")
+
+        label = f"{name:<20}{len(small):>7}{len(large):>7}{budget:>8}{'' if constant else '  (scales)'}"
+        if problems:
+            report = [f"{label}  {', '.join(problems)}", f"    {small_url}  ->  {large_url}",
+                      "    most repeated statements on the large target:"] + repeated_statements(large)
+            if len(large) != len(small):
+                report += ["    statements added by the larger target:"] + statement_diff(small, large)[:40]
+            failures.append('\n'.join(report))
+            print(f"❌ {failures[-1]}")
+        else:
+            print(f"✅ {label}")
+            if verbose:
+                print('\n'.join(repeated_statements(large)))
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    print(f"\n=== SQL STATEMENT BUDGETS COMPLETE: {len(failures)} failing ===")
+    assert not failures, '\n'.join(failures)
+
+
+if __name__ == '__main__':
+    try:
+        test_query_budgets(verbose='--verbose' in sys.argv)
+    except AssertionError:
+        sys.exit(1)
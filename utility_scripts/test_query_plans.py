@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+EXPLAIN QUERY PLAN check for the hot lookups.
+Each query must be answered through the expected index; a full table scan (or an extra sort where
+the index gives the order) means an index was dropped or a query stopped matching it.
+The plans are taken on an empty in-memory database built from the models, so the result
+does not depend on the data or statistics of the local database.
+
+Run from the project root:
+    python utility_scripts/test_query_plans.py
+"""
+import sys
+import os
+from datetime import date, datetime
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, select, text
+from website import create_app, db
+from website.models import (Game, ELOrankingHist, Event, EventRegistration, EventClassification,
+                            PlayerClubNickname, ClubAuthorization, GameDayPlayer, GameDayClassification,
+                            LeagueClassification)
+from website.tools import _club_ELO_games_query, _player_history_query
+
+
+def hot_queries():
+    """(label, statement, {table: expected index}, sort allowed)"""
+    return [
+        ("event games in round order",
+         select(Game).where(Game.gm_idEvent == 1).order_by(Game.gm_timeStart, Game.gm_id),
+         {'tb_game': 'ix_game_event_start'}, False),
+        ("gameday games in time order",
+         select(Game).where(Game.gm_idGameDay == 1).order_by(Game.gm_timeStart),
+         {'tb_game': 'ix_game_gameday_start'}, False),
+        ("league games in date order",
+         select(Game).where(Game.gm_idLeague == 1).order_by(Game.gm_date, Game.gm_timeStart),
+         {'tb_game': 'ix_game_league_date'}, False),
+        ("games of a day",
+         select(Game).where(Game.gm_date == date(2025, 1, 1)).order_by(Game.gm_timeStart),
+         {'tb_game': 'ix_game_date_start'}, False),
+        ("player ELO history, newest first",
+         text("SELECT el_gm_id, el_date, el_startTime, el_result_team, el_result_op, el_beforeRank, el_afterRank "
+              "FROM tb_ELO_ranking_hist where el_pl_id=1 order by el_date desc, el_startTime desc LIMIT 50"),
+         {'tb_ELO_ranking_hist': 'ix_elo_hist_player_date'}, False),
+        ("regular players of an event",
+         select(EventRegistration).where(EventRegistration.er_event_id == 1, EventRegistration.er_is_substitute == False),
+         {'tb_event_registration': 'ix_event_registration_event_substitute'}, False),
+        ("event registrations of a player",
+         select(EventRegistration).where(EventRegistration.er_player_id == 1),
+         {'tb_event_registration': 'ix_event_registration_player'}, False),
+        ("event classification",
+         select(EventClassification).where(EventClassification.ec_event_id == 1),
+         {'tb_event_classification': 'sqlite_autoindex_tb_event_classification_1'}, True),
+        ("club nickname map",
+         select(PlayerClubNickname.pcn_user_id, PlayerClubNickname.pcn_nickname).where(PlayerClubNickname.pcn_club_id == 1),
+         {'tb_player_nickname': 'ix_player_nickname_club'}, False),
+        ("club authorization",
+         select(ClubAuthorization).where(ClubAuthorization.ca_user_id == 1, ClubAuthorization.ca_club_id == 1),
+         {'tb_club_authorization': 'sqlite_autoindex_tb_club_authorization_1'}, False),
+        ("gameday players",
+         select(GameDayPlayer).where(GameDayPlayer.gp_idGameDay == 1),
+         {'tb_gameDayPlayer': 'ix_gameday_player_gameday'}, False),
+        ("gameday classification",
+         select(GameDayClassification).where(GameDayClassification.gc_idGameDay == 1),
+         {'tb_gameDayClassification': 'ix_gameday_classification_gameday'}, True),
+        ("league classification",
+         select(LeagueClassification).where(LeagueClassification.lc_idLeague == 1),
+         {'tb_leagueClassification': 'ix_league_classification_league'}, True),
+        ("player game history, first page",
+         _player_history_query(1).limit(31).statement,
+         {'tb_game_participation': 'ix_game_participation_player_date', 'tb_game': 'INTEGER PRIMARY KEY'}, False),
+        ("player game history, next page",
+         _player_history_query(1, (date(2025, 1, 1), datetime(2025, 1, 1, 18, 30).time(), 100)).limit(31).statement,
+         {'tb_game_participation': 'ix_game_participation_player_date', 'tb_game': 'INTEGER PRIMARY KEY'}, False),
+        ("club ELO replay",
+         _club_ELO_games_query(1).order_by(Game.gm_date, Game.gm_timeStart, Game.gm_id).statement,
+         {'tb_event': 'ix_event_club_date', 'tb_game': 'ix_game_event_start'}, True),
+    ]
+
+
+def explain(connection, statement):
+    if not isinstance(statement, str) and not hasattr(statement, 'text'):
+        statement = str(statement.compile(connection.engine, compile_kwargs={'literal_binds': True}))
+    else:
+        statement = str(statement)
+    return [row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement)]
+
+
+def test_query_plans():
+    app = create_app()
+    engine = create_engine('sqlite://')
+    db.metadata.create_all(engine)
+    failures = []
+    with app.app_context(), engine.connect() as connection:
+        print("=== HOT QUERY PLANS ===\n")
+        for label, statement, expected, sort_allowed in hot_queries():
+            plan = explain(connection, statement)
+            problems = []
+            for table, index in expected.items():
+                steps = [step for step in plan if f" {table} " in f"{step} " or step.endswith(f" {table}")]
+                if not any(index in step for step in steps):
+                    problems.append(f"{table} not read through {index}")
+                if any(step.startswith('SCAN') and 'INDEX' not in step for step in steps):
+                    problems.append(f"full scan of {table}")
+            if not sort_allowed and any('TEMP B-TREE' in step for step in plan):
+                problems.append("extra sort")
+            if problems:
+                failures.append("\n".join([f"{label}: {', '.join(problems)}"] + [f"      {step}" for step in plan]))
+                print(f"❌ {failures[-1]}")
+            else:
+                print(f"✅ {label}")
+
+        print(f"\n=== HOT QUERY PLANS COMPLETE: {len(failures)} failing ===")
+    assert not failures, "\n".join(failures)
+
+
+if __name__ == '__main__':
+    try:
+        test_query_plans()
+    except AssertionError:
+        sys.exit(1)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Check of the FTS5 user search behind /search_users, on a fresh database in the instance folder:
+the triggers follow inserts, updates and deletes of users and nicknames, the ranking puts name
+matches first and shorter names first among many matches, the lookup is an index probe, a table
+from an older version is rebuilt, and the LIKE fallback answers without FTS5.
+
+Run from the project root:
+    python utility_scripts/test_user_search.py
+"""
+import sys
+import os
+
+# Allow running from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+from website.config import Config
+
+TEST_DB_NAME = 'user_search_test.db'
+
+
+def test_user_search():
+    path = os.path.join(os.path.dirname(__file__), '..', 'instance', TEST_DB_NAME)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    Config.DB_NAME = TEST_DB_NAME
+    from website import create_app, db
+    from website.models import Users, Club, PlayerClubNickname
+    from website.tasks import stop_background_tasks
+    from website import user_search
+    app = create_app()
+    stop_background_tasks()
+
+    def check(label, ok):
+        assert ok, label
+        print(f"✅ {label}")
+
+    def names(query):
+        return [row.us_name for row in user_search.find_users(query)]
+
+    with app.app_context():
+        print("=== USER SEARCH ===\n")
+        check("FTS5 available", user_search.fts_available)
+
+        joao = Users(us_name='João Silva', us_email='jsilva@example.com', us_telephone='+351 912 345 678')
+        ana = Users(us_name='Ana Costa', us_email='ana.silvano@example.com', us_telephone='913000111')
+        rui = Users(us_name='Rui Pereira', us_email='rui@example.com', us_telephone='914000222')
+        club = Club(cl_name='Test Club', cl_slug='test-club')
+        db.session.add_all([joao, ana, rui, club])
+        db.session.commit()
+
+        check("insert: accent-insensitive word prefix", names('joa') == ['João Silva'])
+        check("insert: several words all required", names('jo sil') == ['João Silva'])
+        check("ranking: name match before email match", names('silva')[:2] == ['João Silva', 'Ana Costa'])
+        check("telephone with separators", names('912 345') == ['João Silva'])
+        check("telephone digits only", names('351912') == ['João Silva'])
+        check("email", names('rui@example') == ['Rui Pereira'])
+
+        joao.us_name = 'João Santos'
+        db.session.commit()
+        check("update: new name found", names('santos') == ['João Santos'])
+        check("update: old name gone", 'João Santos' not in names('silva'))
+
+        db.session.execute(text("UPDATE tb_users SET us_telephone = '915999888' WHERE us_id = :id"), {'id': rui.us_id})
+        db.session.commit()
+        check("raw SQL update", names('915999') == ['Rui Pereira'])
+
+        nickname = PlayerClubNickname(pcn_user_id=rui.us_id, pcn_club_id=club.cl_id, pcn_nickname='Shiri')
+        db.session.add(nickname)
+        db.session.commit()
+        check("nickname insert", names('shir') == ['Rui Pereira'])
+        nickname.pcn_nickname = 'Tiko'
+        db.session.commit()
+        check("nickname update", names('shir') == [] and names('tiko') == ['Rui Pereira'])
+        db.session.delete(nickname)
+        db.session.commit()
+        check("nickname delete", names('tiko') == [])
+
+        db.session.delete(ana)
+        db.session.commit()
+        check("delete", names('costa') == [])
+
+        # The best match comes after more matches than the page shows, in id order
+        db.session.add_all([Users(us_name=f'Silvestre Longname Number {i}', us_email=f'silvestre{i}@example.com',
+                                  us_telephone=f'92{i:07d}') for i in range(60)])
+        db.session.add(Users(us_name='Ana Silva', us_email='anasilva@example.com', us_telephone='930000000'))
+        db.session.commit()
+        check("ranking: shortest name first among many matches",
+              names('silv')[:2] == ['Ana Silva', 'Silvestre Longname Number 0'])
+        db.session.get(Users, rui.us_id).us_name = 'Rui Silvano'
+        db.session.commit()
+        check("ranking: a rename moves the row", names('silv')[:2] == ['Ana Silva', 'Rui Silvano'])
+        nickname = PlayerClubNickname(pcn_user_id=rui.us_id, pcn_club_id=club.cl_id, pcn_nickname='Tiko')
+        db.session.add(nickname)
+        db.session.commit()
+        check("nickname of a renamed user", names('tiko') == ['Rui Silvano'])
+        db.session.delete(nickname)
+        db.session.commit()
+
+        plan = [row[-1] for row in db.session.execute(text(
+            f"EXPLAIN QUERY PLAN SELECT rowid FROM {user_search.USER_SEARCH_TABLE} "
+            f"WHERE {user_search.USER_SEARCH_TABLE} MATCH '\"rui\"*'"))]
+        check("lookup is an FTS5 index probe", any('VIRTUAL TABLE INDEX' in step for step in plan))
+
+        count = user_search.rebuild_user_search(db.engine)
+        check("rebuild", count == 63 and names('santos') == ['João Santos'])
+
+        # A table left by an older version (other triggers) is rebuilt when the app starts
+        db.session.execute(text(f"DROP TRIGGER {user_search.USER_SEARCH_TABLE}_user_update"))
+        db.session.execute(text(f"CREATE TRIGGER {user_search.USER_SEARCH_TABLE}_user_update "
+                                f"AFTER UPDATE OF us_name ON tb_users BEGIN SELECT 1; END"))
+        db.session.commit()
+        user_search.init_user_search(db.engine)
+        joao.us_name = 'João Sardinha'
+        db.session.commit()
+        check("outdated table rebuilt at start", names('sardinha') == ['João Sardinha'])
+
+        user_search.fts_available = False
+        try:
+            check("LIKE fallback", names('silvano') == ['Rui Silvano'])
+        finally:
+            user_search.fts_available = True
+
+        db.session.remove()
+        db.engine.dispose()
+
+    print("\n=== USER SEARCH COMPLETE ===")
+
+
+if __name__ == '__main__':
+    try:
+        test_user_search()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -44,7 +44,14 @@ def create_app():
     # Configuration loaded - removed debug message
 
     app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{Config.DB_NAME}'
+    from .db_engine import engine_options, configure_sqlite
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(Config)
     db.init_app(app)
+    with app.app_context():
+        # WAL, busy timeout and the other pragmas, before the first connection is opened
+        configure_sqlite(db.engine, Config)
+        from .sql_instrumentation import init_sql_instrumentation
+        init_sql_instrumentation(app, db.engine)
     migrate = Migrate(app, db)
     # Database initialized - removed debug message
 
@@ -54,12 +61,7 @@ def create_app():
         'pt': 'Portuguese'
     }
 
-    def load_translations(lang):
-        translations_path = os.path.join(app.root_path, 'translations', f'{lang}.json')
-        if not os.path.exists(translations_path):
-            translations_path = os.path.join(app.root_path, '..', 'translations', 'translations.json')
-        with open(translations_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    from .translations import catalog, translate
 
     @app.before_request
     def before_request():
@@ -68,7 +70,9 @@ def create_app():
             g.lang = lang
         else:
             g.lang = 'en'  # default to English
-        g.translations = load_translations(g.lang)
+        # Shared process-wide catalog, only re-read when translations.json changes
+        g.translations = catalog.entries()
+        g.lang_translations = catalog.language(g.lang)
 
     from .views import views
     from .auth import auth
@@ -76,6 +80,11 @@ def create_app():
     app.register_blueprint(views, url_prefix='/')
     app.register_blueprint(auth, url_prefix='/')
 
+    from .metrics import init_metrics
+    init_metrics(app)
+    from .profiling import init_profiling
+    init_profiling(app)
+
     from .models import Users
     from datetime import date
     from datetime import datetime, timedelta
@@ -87,6 +96,9 @@ def create_app():
             # Database tables created successfully - removed debug message
         except Exception as e:
             app.logger.error(f'Error creating database tables: {str(e)}')
+        # FTS5 mirror of the users for the player pickers, kept current by triggers
+        from .user_search import init_user_search
+        init_user_search(db.engine)
 
 
     migrate.init_app(app, db)
@@ -117,9 +129,6 @@ def create_app():
     # Make the display_short_name function accessible to the entire application
     app.jinja_env.globals.update(display_short_name=display_short_name)
 
-    def translate(text):
-        return g.translations.get(text, {}).get(g.lang, text)
-
     app.jinja_env.globals.update(translate=translate)
 
     # Start background tasks differently based on environment
@@ -1,3 +1,5 @@
+import os
+
 class Config:
     TITLE = "My Padel League"
     # FAVICON = "../static/images/favicon.ico"
@@ -5,4 +7,40 @@ class Config:
     # LOGOICON = "../static/images/logo-icon.png"
     LOGOICON = "../static/images/newLOGO.png"
     DB_NAME = "myPadelLeague.db"
-    SECRET_KEY = 'Hello From Hell! :D'
\ No newline at end of file
+    SECRET_KEY = 'Hello From Hell! :D'
+
+    # SQLite tuning, applied to every new connection (see website/db_engine.py)
+    SQLITE_JOURNAL_MODE = 'WAL'        # readers no longer block behind a writer
+    SQLITE_SYNCHRONOUS = 'NORMAL'      # safe with WAL, fsync only at checkpoints
+    SQLITE_CACHE_SIZE_KB = 16000       # page cache per connection
+    SQLITE_MMAP_SIZE = 64 * 1024 * 1024
+    SQLITE_TEMP_STORE = 'MEMORY'
+    SQLITE_BUSY_TIMEOUT_MS = 10000     # wait for the write lock instead of failing with "database is locked"
+    SQLITE_FOREIGN_KEYS = False        # existing deletes rely on it being off
+    # Connection pool
+    SQLITE_POOL_SIZE = 10
+    SQLITE_MAX_OVERFLOW = 10
+    SQLITE_POOL_TIMEOUT = 30
+    # Hours between PRAGMA optimize runs of the background task
+    SQLITE_OPTIMIZE_INTERVAL_HOURS = 6
+
+    # Per-request SQL instrumentation (see website/sql_instrumentation.py)
+    SQL_INSTRUMENTATION = True
+    SQL_STATS_HEADERS = None           # X-SQL-* response headers; None = only in debug mode
+    SQL_TOP_N = 5                      # slowest statements kept per request
+    SQL_SLOW_QUERY_MS = 100            # statements slower than this go to the slow query log
+    SQL_SLOW_QUERY_LOG = 'slow_queries.log'  # in the instance folder
+    SQL_LOG_MIN_QUERIES = 50           # requests over either limit get a JSON log line
+    SQL_LOG_MIN_MS = 500
+
+    # In-process metrics served at /metrics (see website/metrics.py)
+    METRICS_ENABLED = True
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # scrapers send "Authorization: Bearer <token>"; superusers can always read it
+
+    # On-demand request profiling (see website/profiling.py)
+    PROFILING_ENABLED = True
+    PROFILE_DIR = 'profiles'           # in the instance folder
+    PROFILE_TOKEN_MAX_AGE = 3600       # seconds a profiling link from the admin page stays valid
+    PROFILE_SAMPLE_ENDPOINTS = {}      # e.g. {'views.detail_league': 100}: stack-sample one request in 100
+    PROFILE_SAMPLE_INTERVAL_MS = 5
+    PROFILE_KEEP = 50                  # older profiles are deleted
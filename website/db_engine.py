@@ -0,0 +1,59 @@
+import logging
+from sqlalchemy import event, text
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the SQLite database: pool sizing and the driver-level lock timeout."""
+    return {
+        'pool_size': config.SQLITE_POOL_SIZE,
+        'max_overflow': config.SQLITE_MAX_OVERFLOW,
+        'pool_timeout': config.SQLITE_POOL_TIMEOUT,
+        'connect_args': {
+            'timeout': config.SQLITE_BUSY_TIMEOUT_MS / 1000,
+            # Pooled connections are handed to whichever request thread checks them out
+            'check_same_thread': False,
+        },
+    }
+
+
+def connection_pragmas(config):
+    """PRAGMA statements run on every new connection, in order."""
+    return [
+        f"PRAGMA journal_mode = {config.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous = {config.SQLITE_SYNCHRONOUS}",
+        # A negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size = -{int(config.SQLITE_CACHE_SIZE_KB)}",
+        f"PRAGMA mmap_size = {int(config.SQLITE_MMAP_SIZE)}",
+        f"PRAGMA temp_store = {config.SQLITE_TEMP_STORE}",
+        f"PRAGMA busy_timeout = {int(config.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA foreign_keys = {'ON' if config.SQLITE_FOREIGN_KEYS else 'OFF'}",
+    ]
+
+
+def configure_sqlite(engine, config):
+    """Apply the connection pragmas to every connection the engine opens."""
+    pragmas = connection_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return engine
+
+
+def optimize_database(engine):
+    """Refresh the query planner statistics: PRAGMA optimize only re-analyzes tables that need it,
+    a full ANALYZE runs when the database has never been analyzed."""
+    try:
+        with engine.begin() as connection:
+            analyzed = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='sqlite_stat1'")
+            ).first()
+            connection.execute(text("PRAGMA optimize" if analyzed else "ANALYZE"))
+    except Exception as e:
+        logging.error(f"Error optimizing database: {str(e)}")
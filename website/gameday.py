@@ -7,22 +7,10 @@ from website.models import League, Club, Users, GameDay, GameDayPlayer, Game, Le
 from PIL import Image
 from datetime import datetime, date, timedelta
 from .tools import *
+from .translations import translate
 import json
 from flask import session
 
-def translate(text):
-    # Import translations file
-    with open('translations/translations.json', 'r', encoding='utf-8') as f:
-        translations = json.load(f)
-    
-    # Get current language from cookie or default to English
-    lang = request.cookies.get('lang', 'en')
-    
-    # Try to get translation, return original text if not found
-    if text in translations and lang in translations[text]:
-        return translations[text][lang]
-    return text
-
 # Gameday management routes
 def func_create_gamedays():
     # Get league_id from query parameter
@@ -472,6 +460,10 @@ def func_insert_game_day_players(gameDayID):
                     {"player1ID": player1ID, "player2ID": player2ID, "gameDay_id": gameDay_id, "team": team}
                 )
                 db.session.commit()
+
+    # The team assignment above writes tb_game with raw SQL, which skips the Game ORM events
+    func_sync_game_participation(Game.gm_idGameDay == gameDayID)
+    db.session.commit()
     
     flash(translate('Players registered successfully!'), 'success')
     return redirect(url_for('views.edit_gameday', gameday_id=gameDayID))
@@ -500,6 +492,9 @@ def func_submitResultsGameDay(gameDayID):
             )
             db.session.commit()
 
+        func_sync_game_participation(Game.gm_idGameDay == gameDayID)
+        db.session.commit()
+
         db.session.execute(
         text(f"update tb_gameday SET gd_status='finished' where gd_id=:gameDayID and gd_idLeague=:league_id"),
             {"gameDayID": gameDayID, "league_id": league_id}
@@ -520,6 +515,7 @@ def func_submitResultsGameDay(gameDayID):
         func_calculateGameDayClassification(gameDayID)
         func_calculateLeagueClassification(league_id)
         func_calculate_ELO_parcial()
+        func_refresh_game_players_stats(Game.gm_idGameDay == gameDayID)
     
     flash(translate('Results submitted successfully!'), 'success')
     return redirect(url_for('views.edit_gameday', gameday_id=gameDayID))
@@ -0,0 +1,80 @@
+import queue
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Each open stream keeps a server thread busy, so the registry is bounded; refused screens fall back to polling
+MAX_STREAMS = 32
+MAX_STREAMS_PER_EVENT = 8
+# Seconds between heartbeats; every heartbeat also re-reads the version so changes made by other processes still arrive
+HEARTBEAT_SECONDS = 15
+# Streams are closed after this long and the browser reconnects, so a stuck connection can't hold a slot forever
+STREAM_LIFETIME_SECONDS = 30 * 60
+RECONNECT_MILLISECONDS = 5000
+
+
+class EventBroadcaster:
+    """In-process registry of the live screens listening to each event.
+    Subscribers get a one-slot queue: only "something changed" matters, so pending notifications collapse."""
+
+    def __init__(self, max_streams=MAX_STREAMS, max_per_event=MAX_STREAMS_PER_EVENT):
+        self.max_streams = max_streams
+        self.max_per_event = max_per_event
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, event_id):
+        """A new queue for event_id, or None when the registry is full."""
+        with self._lock:
+            listeners = self._subscribers.get(event_id, set())
+            if self.stream_count() >= self.max_streams or len(listeners) >= self.max_per_event:
+                return None
+            subscriber = queue.Queue(maxsize=1)
+            self._subscribers.setdefault(event_id, set()).add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, event_id, subscriber):
+        with self._lock:
+            listeners = self._subscribers.get(event_id)
+            if listeners:
+                listeners.discard(subscriber)
+                if not listeners:
+                    del self._subscribers[event_id]
+
+    def publish(self, event_ids):
+        """Wake every stream of the given events."""
+        with self._lock:
+            targets = [s for event_id in event_ids for s in self._subscribers.get(event_id, ())]
+        for subscriber in targets:
+            try:
+                subscriber.put_nowait(True)
+            except queue.Full:
+                pass  # already has a notification pending
+
+    def stream_count(self):
+        return sum(len(listeners) for listeners in self._subscribers.values())
+
+
+broadcaster = EventBroadcaster()
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_changed_events(session):
+    changed = session.info.pop('changed_events', None)
+    if changed:
+        broadcaster.publish(changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_events(session):
+    session.info.pop('changed_events', None)
+
+
+def sse_message(data, event_name=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event_name:
+        lines.append(f"event: {event_name}")
+    lines.append(f"data: {data}")
+    return '\n'.join(lines) + '\n\n'
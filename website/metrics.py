@@ -0,0 +1,262 @@
+import hmac
+import threading
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+from flask import Blueprint, Response, abort, current_app, g, request
+from flask_login import current_user
+
+# Seconds; the last bucket (+Inf) is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+class MetricsRegistry:
+    """In-process counters and histograms, exported in the Prometheus text format.
+    Recording goes to one of a fixed set of shards (a plain dict of lists with its own lock) picked by
+    the thread id, so threads rarely wait on each other and, once a shard has seen a series, recording
+    allocates nothing, however many short-lived request threads the server starts. A scrape sums the shards."""
+
+    SHARDS = 31  # prime, as thread ids are aligned addresses
+
+    def __init__(self):
+        self._shards = tuple(_Shard() for _ in range(self.SHARDS))
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(self, name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(self, name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """Register fn() -> [(name, type, help, [(label values dict, value)])], called at every scrape."""
+        self._collectors.append(fn)
+        return fn
+
+    def _shard(self):
+        return self._shards[threading.get_ident() % self.SHARDS]
+
+    def snapshot(self):
+        """{(metric name, label values): [counts...]} summed over all shards."""
+        total = {}
+        for shard in self._shards:
+            with shard.lock:
+                _merge(total, shard.values)
+        return total
+
+    def exposition(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        values = self.snapshot()
+        lines = []
+        for metric in self._metrics:
+            metric.render(lines, values)
+        for collect in self._collectors:
+            for name, kind, help, samples in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+        lines.append('')
+        return '\n'.join(lines)
+
+
+class _Shard:
+    __slots__ = ('lock', 'values')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+
+def _merge(total, values):
+    for key, series in values.items():
+        current = total.get(key)
+        if current is None:
+            total[key] = list(series)
+        else:
+            for i, value in enumerate(series):
+                current[i] += value
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def _label_values(key):
+    return key if isinstance(key, tuple) else (key,)
+
+
+class Counter:
+    """Monotonic counter. With one label the label value is the key itself, with several a tuple."""
+
+    def __init__(self, registry, name, help, labels):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = labels
+
+    def inc(self, key=None, amount=1):
+        shard = self.registry._shard()
+        with shard.lock:
+            series = shard.values.get((self.name, key))
+            if series is None:
+                series = shard.values[(self.name, key)] = [0]
+            series[0] += amount
+
+    def render(self, lines, values):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} counter")
+        for (name, key), series in sorted(values.items(), key=_sort_key):
+            if name == self.name:
+                lines.append(f"{name}{_format_labels(self.labels, _label_values(key))} {_format_value(series[0])}")
+
+
+class Histogram:
+    """Histogram with fixed buckets. The series is one count per bucket (not cumulative) then the sum."""
+
+    def __init__(self, registry, name, help, labels, buckets):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+
+    def observe(self, key, value):
+        bucket = bisect_left(self.buckets, value)
+        shard = self.registry._shard()
+        with shard.lock:
+            series = shard.values.get((self.name, key))
+            if series is None:
+                series = shard.values[(self.name, key)] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bucket] += 1
+            series[-1] += value
+
+    def time(self, key):
+        """Decorator observing the duration of every call of the function, failed calls included."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(key, perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def render(self, lines, values):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} histogram")
+        for (name, key), series in sorted(values.items(), key=_sort_key):
+            if name != self.name:
+                continue
+            label_values = _label_values(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(self.labels, label_values)} {_format_value(series[-1])}")
+            lines.append(f"{name}_count{_format_labels(self.labels, label_values)} {cumulative}")
+
+
+def _sort_key(item):
+    (name, key), _ = item
+    return name, tuple(str(value) for value in _label_values(key))
+
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION = registry.histogram('padel_http_request_duration_seconds', 'Time to produce the response, by endpoint.', ('endpoint',))
+REQUESTS = registry.counter('padel_http_requests_total', 'Responses sent, by endpoint and status code.', ('endpoint', 'status'))
+DB_QUERIES = registry.counter('padel_db_queries_total', 'SQL statements executed while serving requests, by endpoint.', ('endpoint',))
+DB_SECONDS = registry.counter('padel_db_seconds_total', 'Time spent in SQL statements while serving requests, by endpoint.', ('endpoint',))
+ELO_RECALCULATION = registry.histogram('padel_elo_recalculation_seconds', 'Duration of ELO recalculations, by kind.', ('kind',), TASK_BUCKETS)
+BACKGROUND_TASK = registry.histogram('padel_background_task_seconds', 'Duration of background task runs, by task.', ('task',), TASK_BUCKETS)
+IMAGE_CACHE = registry.counter('padel_image_cache_lookups_total', 'Derived image lookups, by result (hit or miss).', ('result',))
+
+UNMATCHED_ENDPOINT = '<unmatched>'
+
+
+@registry.collector
+def _cache_metrics():
+    from .render_cache import fragment_cache
+    from .live_updates import broadcaster
+    values = registry.snapshot()
+    caches = {'fragments': fragment_cache.stats()}
+    caches['images'] = {
+        'hits': values.get((IMAGE_CACHE.name, 'hit'), [0])[0],
+        'misses': values.get((IMAGE_CACHE.name, 'miss'), [0])[0],
+    }
+    samples = {'hits': [], 'misses': [], 'ratio': []}
+    for cache, stats in caches.items():
+        lookups = stats['hits'] + stats['misses']
+        samples['hits'].append(({'cache': cache}, stats['hits']))
+        samples['misses'].append(({'cache': cache}, stats['misses']))
+        samples['ratio'].append(({'cache': cache}, stats['hits'] / lookups if lookups else 0.0))
+    return [
+        ('padel_cache_hits_total', 'counter', 'Cache lookups answered from the cache.', samples['hits']),
+        ('padel_cache_misses_total', 'counter', 'Cache lookups that had to compute the value.', samples['misses']),
+        ('padel_cache_hit_ratio', 'gauge', 'Hits over lookups since the process started.', samples['ratio']),
+        ('padel_cache_entries', 'gauge', 'Entries held by the in-memory fragment cache.', [({'cache': 'fragments'}, caches['fragments']['entries'])]),
+        ('padel_event_streams', 'gauge', 'Open Server-Sent Events streams of the TV screens.', [({}, broadcaster.stream_count())]),
+    ]
+
+
+metrics = Blueprint('metrics', __name__)
+
+
+@metrics.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape target: a bearer token matching METRICS_TOKEN, or a logged-in superuser."""
+    token = current_app.config.get('METRICS_TOKEN')
+    authorization = request.headers.get('Authorization', '')
+    authorized = bool(token) and hmac.compare_digest(authorization, f"Bearer {token}")
+    if not authorized and not (current_user.is_authenticated and current_user.us_is_superuser):
+        abort(403)
+    return Response(registry.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_metrics(app):
+    """Time every request and count it by endpoint and status, with the SQL totals of the request."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        endpoint = request.endpoint or UNMATCHED_ENDPOINT
+        REQUEST_DURATION.observe(endpoint, perf_counter() - started)
+        REQUESTS.inc((endpoint, response.status_code))
+        stats = g.get('sql_stats')
+        if stats is not None:
+            DB_QUERIES.inc(endpoint, stats.count)
+            DB_SECONDS.inc(endpoint, stats.total_seconds)
+        return response
+
+    app.register_blueprint(metrics)
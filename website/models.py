@@ -1,6 +1,9 @@
 from . import db
 from flask_login import UserMixin
 from sqlalchemy.sql import func
+from sqlalchemy import event, select, literal_column
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime, timezone, timedelta, time
 import re
 
@@ -14,6 +17,18 @@ def slugify(text):
     text = re.sub(r'_+', '_', text)
     return text
 
+
+def memoized_count(key, query):
+    """COUNT of query, memoized in the session (one request) until registrations change;
+    pages show the same player count several times."""
+    session = db.session()
+    if _registrations_pending(session):
+        session.info.pop('registration_counts', None)  # the query would autoflush them first
+    counts = session.info.setdefault('registration_counts', {})
+    if key not in counts:
+        counts[key] = query.count()
+    return counts[key]
+
 class Users(db.Model, UserMixin):
     __tablename__ = 'tb_users'
     us_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -96,7 +111,11 @@ class PlayerClubNickname(db.Model):
     user = db.relationship('Users', backref=db.backref('club_nicknames', lazy=True))
     club = db.relationship('Club', backref=db.backref('player_nicknames', lazy=True))
 
-    __table_args__ = (db.UniqueConstraint('pcn_user_id', 'pcn_club_id', name='uq_player_club_nickname'),)
+    __table_args__ = (
+        db.UniqueConstraint('pcn_user_id', 'pcn_club_id', name='uq_player_club_nickname'),
+        # Covers the per-club nickname map without touching the table
+        db.Index('ix_player_nickname_club', 'pcn_club_id', 'pcn_user_id', 'pcn_nickname'),
+    )
 
 class Court(db.Model):
     __tablename__ = 'tb_court'
@@ -132,7 +151,7 @@ class League(db.Model):
 
     @property
     def current_player_count(self):
-        return LeaguePlayers.query.filter_by(lp_league_id=self.lg_id).count()
+        return memoized_count(('league', self.lg_id), LeaguePlayers.query.filter_by(lp_league_id=self.lg_id))
 
     @property
     def registration_start_utc(self):
@@ -253,7 +272,7 @@ class GameDay(db.Model):
 
     @property
     def current_player_count(self):
-        return GameDayRegistration.query.filter_by(gdr_gameday_id=self.gd_id).count()
+        return memoized_count(('gameday', self.gd_id), GameDayRegistration.query.filter_by(gdr_gameday_id=self.gd_id))
 
     @property
     def max_players(self):
@@ -316,6 +335,249 @@ class Game(db.Model):
     player_B1 = db.relationship('Users', foreign_keys=[gm_idPlayer_B1])
     player_B2 = db.relationship('Users', foreign_keys=[gm_idPlayer_B2])
 
+    __table_args__ = (
+        db.Index('ix_game_event_start', 'gm_idEvent', 'gm_timeStart', 'gm_id'),
+        db.Index('ix_game_gameday_start', 'gm_idGameDay', 'gm_timeStart'),
+        db.Index('ix_game_league_date', 'gm_idLeague', 'gm_date', 'gm_timeStart'),
+        db.Index('ix_game_date_start', 'gm_date', 'gm_timeStart'),
+    )
+
+class GameParticipation(db.Model):
+    """One row per (game, player), so per-player lookups can use an index instead of OR-ing the four player columns.
+    Kept in sync with tb_game by the Game events below; never written directly."""
+    __tablename__ = 'tb_game_participation'
+    gpt_gm_id = db.Column(db.Integer, db.ForeignKey('tb_game.gm_id'), primary_key=True)
+    gpt_pl_id = db.Column(db.Integer, db.ForeignKey('tb_users.us_id'), primary_key=True)
+    gpt_side = db.Column(db.String(1), nullable=False)
+    gpt_partner_id = db.Column(db.Integer, nullable=True)
+    gpt_op1_id = db.Column(db.Integer, nullable=True)
+    gpt_op2_id = db.Column(db.Integer, nullable=True)
+    gpt_date = db.Column(db.Date)
+    gpt_timeStart = db.Column(db.Time)
+    gpt_idEvent = db.Column(db.Integer, nullable=True)
+    gpt_idLeague = db.Column(db.Integer, nullable=True)
+    gpt_idGameDay = db.Column(db.Integer, nullable=True)
+    gpt_games_for = db.Column(db.Integer, nullable=True)
+    gpt_games_against = db.Column(db.Integer, nullable=True)
+    gpt_result = db.Column(db.Integer, nullable=True)  # 1 win, 0 draw, -1 loss, NULL not played yet
+
+    # Relationships
+    game = db.relationship('Game', viewonly=True)
+    player = db.relationship('Users', viewonly=True)
+
+# Order of a player's game history pages, newest first. Dates and start times are nullable: missing
+# ones sort as '' (oldest), so a keyset cursor can step past those games instead of losing them.
+GAME_HISTORY_KEY = (
+    func.coalesce(GameParticipation.gpt_date, literal_column("''")),
+    func.coalesce(GameParticipation.gpt_timeStart, literal_column("''")),
+    GameParticipation.gpt_gm_id,
+)
+db.Index('ix_game_participation_player_date', GameParticipation.gpt_pl_id, *GAME_HISTORY_KEY)
+
+class PlayerStats(db.Model):
+    """Precomputed player_info figures, one row per player, refreshed by func_refresh_player_stats.
+    ps_needs_refresh is raised whenever one of the player's games, ELO history or gameday wins change."""
+    __tablename__ = 'tb_player_stats'
+    ps_pl_id = db.Column(db.Integer, db.ForeignKey('tb_users.us_id'), primary_key=True)
+    ps_total_games = db.Column(db.Integer, nullable=False, default=0)
+    ps_games_won = db.Column(db.Integer, nullable=False, default=0)
+    ps_last_game_date = db.Column(db.Date, nullable=True)
+    ps_gamedays_won = db.Column(db.Integer, nullable=False, default=0)
+    ps_best_teammate_id = db.Column(db.Integer, db.ForeignKey('tb_users.us_id'), nullable=True)
+    ps_best_teammate_wins = db.Column(db.Integer, nullable=False, default=0)
+    ps_best_teammate_games = db.Column(db.Integer, nullable=False, default=0)
+    ps_worst_teammate_id = db.Column(db.Integer, db.ForeignKey('tb_users.us_id'), nullable=True)
+    ps_worst_teammate_losses = db.Column(db.Integer, nullable=False, default=0)
+    ps_worst_teammate_games = db.Column(db.Integer, nullable=False, default=0)
+    ps_nemesis_id = db.Column(db.Integer, db.ForeignKey('tb_users.us_id'), nullable=True)
+    ps_nemesis_losses = db.Column(db.Integer, nullable=False, default=0)
+    ps_nemesis_games = db.Column(db.Integer, nullable=False, default=0)
+    ps_fav_opponent_id = db.Column(db.Integer, db.ForeignKey('tb_users.us_id'), nullable=True)
+    ps_fav_opponent_wins = db.Column(db.Integer, nullable=False, default=0)
+    ps_fav_opponent_games = db.Column(db.Integer, nullable=False, default=0)
+    ps_elo_best = db.Column(db.Float, nullable=True)
+    ps_elo_worst = db.Column(db.Float, nullable=True)
+    ps_elo_now = db.Column(db.Float, nullable=True)
+    ps_needs_refresh = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    ps_updated_at = db.Column(db.DateTime(timezone=True), default=func.now(), onupdate=func.now())
+
+class PlayerPairStats(db.Model):
+    """Partnership and head-to-head totals of a player with another one over the scored games.
+    Sparse and stored in both directions; maintained together with tb_game_participation."""
+    __tablename__ = 'tb_player_pair_stats'
+    pp_pl_id = db.Column(db.Integer, db.ForeignKey('tb_users.us_id'), primary_key=True)
+    pp_other_id = db.Column(db.Integer, db.ForeignKey('tb_users.us_id'), primary_key=True)
+    pp_relation = db.Column(db.String(8), primary_key=True)  # partner, opponent
+    pp_games = db.Column(db.Integer, nullable=False, default=0)
+    pp_wins = db.Column(db.Integer, nullable=False, default=0)
+    pp_losses = db.Column(db.Integer, nullable=False, default=0)
+    pp_games_diff = db.Column(db.Integer, nullable=False, default=0)
+
+# (player, side, partner, opponent 1, opponent 2)
+GAME_PARTICIPATION_SLOTS = (
+    ('gm_idPlayer_A1', 'A', 'gm_idPlayer_A2', 'gm_idPlayer_B1', 'gm_idPlayer_B2'),
+    ('gm_idPlayer_A2', 'A', 'gm_idPlayer_A1', 'gm_idPlayer_B1', 'gm_idPlayer_B2'),
+    ('gm_idPlayer_B1', 'B', 'gm_idPlayer_B2', 'gm_idPlayer_A1', 'gm_idPlayer_A2'),
+    ('gm_idPlayer_B2', 'B', 'gm_idPlayer_B1', 'gm_idPlayer_A1', 'gm_idPlayer_A2'),
+)
+GAME_PARTICIPATION_COLUMNS = (
+    'gm_idPlayer_A1', 'gm_idPlayer_A2', 'gm_idPlayer_B1', 'gm_idPlayer_B2', 'gm_result_A', 'gm_result_B',
+    'gm_date', 'gm_timeStart', 'gm_idEvent', 'gm_idLeague', 'gm_idGameDay',
+)
+
+def _participation_score(value):
+    # Results written through raw SQL from form fields may be stored as text
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def game_participation_rows(game):
+    """Build the tb_game_participation rows of a Game instance or a tb_game result row."""
+    result_a = _participation_score(game.gm_result_A)
+    result_b = _participation_score(game.gm_result_B)
+    rows = []
+    seen = set()
+    for slot, side, partner, op1, op2 in GAME_PARTICIPATION_SLOTS:
+        player_id = getattr(game, slot)
+        # 0 is used as an empty slot by the gameday team assignment
+        if not player_id or player_id in seen:
+            continue
+        seen.add(player_id)
+        games_for, games_against = (result_a, result_b) if side == 'A' else (result_b, result_a)
+        result = None
+        if games_for is not None and games_against is not None:
+            result = (games_for > games_against) - (games_for < games_against)
+        rows.append({
+            'gpt_gm_id': game.gm_id,
+            'gpt_pl_id': player_id,
+            'gpt_side': side,
+            'gpt_partner_id': getattr(game, partner) or None,
+            'gpt_op1_id': getattr(game, op1) or None,
+            'gpt_op2_id': getattr(game, op2) or None,
+            'gpt_date': game.gm_date,
+            'gpt_timeStart': game.gm_timeStart,
+            'gpt_idEvent': game.gm_idEvent,
+            'gpt_idLeague': game.gm_idLeague,
+            'gpt_idGameDay': game.gm_idGameDay,
+            'gpt_games_for': games_for,
+            'gpt_games_against': games_against,
+            'gpt_result': result,
+        })
+    return rows
+
+def player_pair_deltas(rows, sign=1, deltas=None):
+    """Add the tb_player_pair_stats increments of participation rows to deltas (sign=-1 takes them back out).
+    Only games where someone scored count, like the player statistics. Returns {(player, other, relation): [games, wins, losses, diff]}."""
+    deltas = {} if deltas is None else deltas
+    for row in rows:
+        games_for, games_against = row['gpt_games_for'] or 0, row['gpt_games_against'] or 0
+        if not (games_for > 0 or games_against > 0):
+            continue
+        result = row['gpt_result']
+        for other_id, relation in ((row['gpt_partner_id'], 'partner'), (row['gpt_op1_id'], 'opponent'), (row['gpt_op2_id'], 'opponent')):
+            if not other_id:
+                continue
+            delta = deltas.setdefault((row['gpt_pl_id'], other_id, relation), [0, 0, 0, 0])
+            delta[0] += sign
+            delta[1] += sign * (result == 1)
+            delta[2] += sign * (result == -1)
+            delta[3] += sign * (games_for - games_against)
+    return deltas
+
+def _apply_player_pair_deltas(connection, deltas):
+    pairs = PlayerPairStats.__table__
+    rows = [
+        {'pp_pl_id': pl_id, 'pp_other_id': other_id, 'pp_relation': relation,
+         'pp_games': games, 'pp_wins': wins, 'pp_losses': losses, 'pp_games_diff': diff}
+        for (pl_id, other_id, relation), (games, wins, losses, diff) in deltas.items()
+        if games or wins or losses or diff
+    ]
+    if not rows:
+        return
+    upsert = sqlite_insert(pairs)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[pairs.c.pp_pl_id, pairs.c.pp_other_id, pairs.c.pp_relation],
+        set_={name: pairs.c[name] + upsert.excluded[name] for name in ('pp_games', 'pp_wins', 'pp_losses', 'pp_games_diff')},
+    )
+    connection.execute(upsert, rows)
+    connection.execute(pairs.delete().where(
+        pairs.c.pp_pl_id.in_({row['pp_pl_id'] for row in rows}),
+        pairs.c.pp_games <= 0
+    ))
+
+def _replace_game_participation(connection, game_ids, rows):
+    """Swap the participation rows of game_ids for rows, moving their pair totals along and
+    flagging the stats of every player involved before and after."""
+    participation = GameParticipation.__table__
+    stats = PlayerStats.__table__
+    previous_rows = connection.execute(select(participation).where(participation.c.gpt_gm_id.in_(game_ids))).mappings().all()
+    _apply_player_pair_deltas(connection, player_pair_deltas(rows, 1, player_pair_deltas(previous_rows, -1)))
+    players = {row['gpt_pl_id'] for row in previous_rows} | {row['gpt_pl_id'] for row in rows}
+    if players:
+        connection.execute(stats.update().where(stats.c.ps_pl_id.in_(players)).values(ps_needs_refresh=True))
+    if previous_rows:
+        connection.execute(participation.delete().where(participation.c.gpt_gm_id.in_(game_ids)))
+    if rows:
+        connection.execute(participation.insert(), rows)
+
+def sync_game_participation(connection, game_ids, chunk_size=500):
+    """Rewrite the participation rows of the given games from tb_game (deleted games just lose their rows)."""
+    game = Game.__table__
+    game_ids = list(game_ids)
+    for start in range(0, len(game_ids), chunk_size):
+        chunk = game_ids[start:start + chunk_size]
+        games = connection.execute(select(game).where(game.c.gm_id.in_(chunk))).all()
+        _replace_game_participation(connection, chunk, [row for g in games for row in game_participation_rows(g)])
+
+@event.listens_for(Game, 'after_insert')
+def _game_participation_insert(mapper, connection, target):
+    rows = game_participation_rows(target)
+    if rows:
+        _replace_game_participation(connection, [target.gm_id], rows)
+
+@event.listens_for(Game, 'after_update')
+def _game_participation_update(mapper, connection, target):
+    state = db.inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in GAME_PARTICIPATION_COLUMNS):
+        return
+    _replace_game_participation(connection, [target.gm_id], game_participation_rows(target))
+
+@event.listens_for(Game, 'after_delete')
+def _game_participation_delete(mapper, connection, target):
+    _replace_game_participation(connection, [target.gm_id], [])
+
+def _updated_columns(statement):
+    # Names of the columns an UPDATE sets, None when they can't be told (then assume any)
+    values = getattr(statement, '_ordered_values', None) or getattr(statement, '_values', None)
+    if not values:
+        return None
+    return {getattr(key, 'key', key) for key, _ in (values if isinstance(values, list) else values.items())}
+
+@event.listens_for(Session, 'do_orm_execute')
+def _game_participation_bulk(orm_execute_state):
+    """Query(Game).update()/.delete() skip the mapper events, so resync the games they touch.
+    Updates of columns the participation rows don't copy are skipped. A statement without a WHERE
+    touches every game, so it resyncs every game (in chunks of sync_game_participation)."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ is not Game:
+        return
+    statement = orm_execute_state.statement
+    session = orm_execute_state.session
+    if orm_execute_state.is_update:
+        columns = _updated_columns(statement)
+        if columns is not None and not columns & set(GAME_PARTICIPATION_COLUMNS):
+            return
+    ids_query = select(Game.gm_id)
+    if statement.whereclause is not None:
+        ids_query = ids_query.where(statement.whereclause)
+    game_ids = session.execute(ids_query).scalars().all()
+    result = orm_execute_state.invoke_statement()
+    sync_game_participation(session.connection(), game_ids)
+    return result
+
 class LeagueCourts(db.Model):
     __tablename__ = 'tb_league_courts'
     lc_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -340,6 +602,8 @@ class GameDayPlayer(db.Model):
     gameday = db.relationship('GameDay', backref=db.backref('players', lazy=True))
     player = db.relationship('Users', backref=db.backref('gameday_participations', lazy=True))
 
+    __table_args__ = (db.Index('ix_gameday_player_gameday', 'gp_idGameDay', 'gp_idPlayer'),)
+
 class GameDayClassification(db.Model):
     __tablename__ = 'tb_gameDayClassification'
     gc_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -359,6 +623,8 @@ class GameDayClassification(db.Model):
     gameday = db.relationship('GameDay', backref=db.backref('classifications', lazy=True))
     player = db.relationship('Users', backref=db.backref('gameday_classifications', lazy=True))
 
+    __table_args__ = (db.Index('ix_gameday_classification_gameday', 'gc_idGameDay'),)
+
 class LeagueClassification(db.Model):
     __tablename__ = 'tb_leagueClassification'
     lc_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -376,6 +642,8 @@ class LeagueClassification(db.Model):
     league = db.relationship('League', backref=db.backref('league_classifications', lazy=True))
     player = db.relationship('Users', backref=db.backref('league_classifications', lazy=True))
 
+    __table_args__ = (db.Index('ix_league_classification_league', 'lc_idLeague'),)
+
 
 # EVENT SYSTEM MODELS
 class EventType(db.Model):
@@ -486,6 +754,7 @@ class Event(db.Model):
     ev_created_by_id = db.Column(db.Integer, db.ForeignKey('tb_users.us_id', name='fk_event_created_by'), nullable=False)
     ev_created_at = db.Column(db.DateTime(timezone=True), default=func.now())
     ev_exclude_from_elo = db.Column(db.Boolean, default=False, nullable=False, server_default='0')
+    ev_data_version = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # bumped whenever the TV view's data changes
 
     # Relationships
     club = db.relationship('Club', backref=db.backref('events', lazy=True))
@@ -495,13 +764,15 @@ class Event(db.Model):
     created_by = db.relationship('Users', foreign_keys=[ev_created_by_id], backref=db.backref('events_created', lazy=True))
     games = db.relationship('Game', foreign_keys='Game.gm_idEvent', backref=db.backref('event', lazy=True))
 
+    __table_args__ = (db.Index('ix_event_club_date', 'ev_club_id', 'ev_date'),)
+
     @property
     def current_player_count(self):
-        return EventRegistration.query.filter_by(er_event_id=self.ev_id, er_is_substitute=False).count()
+        return memoized_count(('event', self.ev_id, False), EventRegistration.query.filter_by(er_event_id=self.ev_id, er_is_substitute=False))
 
     @property
     def current_substitute_count(self):
-        return EventRegistration.query.filter_by(er_event_id=self.ev_id, er_is_substitute=True).count()
+        return memoized_count(('event', self.ev_id, True), EventRegistration.query.filter_by(er_event_id=self.ev_id, er_is_substitute=True))
 
     @property
     def ev_slug(self):
@@ -619,7 +890,11 @@ class EventRegistration(db.Model):
     player = db.relationship('Users', foreign_keys=[er_player_id], backref=db.backref('event_registrations', lazy=True))
     registered_by = db.relationship('Users', foreign_keys=[er_registered_by_id], backref=db.backref('event_registrations_made', lazy=True))
 
-    __table_args__ = (db.UniqueConstraint('er_event_id', 'er_player_id', name='uq_event_player_registration'),)
+    __table_args__ = (
+        db.UniqueConstraint('er_event_id', 'er_player_id', name='uq_event_player_registration'),
+        db.Index('ix_event_registration_event_substitute', 'er_event_id', 'er_is_substitute'),
+        db.Index('ix_event_registration_player', 'er_player_id'),
+    )
 
 class EventClassification(db.Model):
     __tablename__ = 'tb_event_classification'
@@ -671,6 +946,114 @@ class EventPlayerNames(db.Model):
     def __repr__(self):
         return f'<EventPlayerNames {self.epn_player_name} for event {self.epn_event_id}>'
 
+# Rows shown on an event's TV view: model -> column holding the event id.
+# Player names and nicknames are shown too, so renaming a player bumps the events showing them.
+EVENT_DATA_SOURCES = {
+    Game: 'gm_idEvent',
+    EventClassification: 'ec_event_id',
+    EventRegistration: 'er_event_id',
+}
+
+def bump_event_data_version(connection, event_ids=()):
+    """Increment ev_data_version of the given events."""
+    event_ids = {i for i in event_ids if i}
+    if not event_ids:
+        return
+    ev = Event.__table__
+    connection.execute(ev.update().where(ev.c.ev_id.in_(event_ids)).values(ev_data_version=ev.c.ev_data_version + 1))
+
+def player_event_ids(connection, player_ids, club_ids=None):
+    """Events showing any of the given players (registered, or in one of the event games), of club_ids when given."""
+    player_ids = {i for i in player_ids if i}
+    if not player_ids:
+        return set()
+    registered = select(EventRegistration.er_event_id).where(EventRegistration.er_player_id.in_(player_ids))
+    played = select(GameParticipation.gpt_idEvent).where(
+        GameParticipation.gpt_pl_id.in_(player_ids), GameParticipation.gpt_idEvent.isnot(None))
+    query = select(Event.ev_id).where(Event.ev_id.in_(registered.union(played)))
+    if club_ids is not None:
+        query = query.where(Event.ev_club_id.in_({i for i in club_ids if i}))
+    return set(connection.execute(query).scalars())
+
+def bump_events(session, event_ids):
+    """Bump the given events and announce them once the session commits, for changes the hooks below
+    don't see (raw SQL, derived tables like the club ELO ranking)."""
+    event_ids = {i for i in event_ids if i}
+    bump_event_data_version(session.connection(), event_ids)
+    session.info.setdefault('changed_events', set()).update(event_ids)
+
+def bump_player_events(session, player_ids):
+    """Bump and announce the events showing the given players, for renames written with raw SQL."""
+    bump_events(session, player_event_ids(session.connection(), player_ids))
+
+def _changed_values(obj, column, deleted):
+    """Current and previous values of a column of a flushed object."""
+    state = db.inspect(obj)
+    if deleted:
+        return [state.dict.get(column)]
+    history = state.attrs[column].history
+    return [getattr(obj, column)] + list(history.deleted or ())
+
+@event.listens_for(Session, 'after_flush')
+def _event_data_version_flush(session, flush_context):
+    event_ids = set()
+    connection = session.connection()
+    for objects, deleted in ((session.new, False), (session.dirty, False), (session.deleted, True)):
+        for obj in objects:
+            if not deleted and obj not in session.new and not session.is_modified(obj, include_collections=False):
+                continue
+            if isinstance(obj, PlayerClubNickname):
+                # Nicknames are per club: only the player's events of that club show them
+                event_ids.update(player_event_ids(connection, _changed_values(obj, 'pcn_user_id', deleted),
+                                                  _changed_values(obj, 'pcn_club_id', deleted)))
+            elif type(obj) in EVENT_DATA_SOURCES:
+                event_ids.update(_changed_values(obj, EVENT_DATA_SOURCES[type(obj)], deleted))
+            elif isinstance(obj, Users) and not deleted and obj not in session.new:
+                if db.inspect(obj).attrs.us_name.history.has_changes():
+                    event_ids.update(player_event_ids(connection, [obj.us_id]))
+            elif isinstance(obj, Event) and not deleted and obj not in session.new:
+                state = db.inspect(obj)
+                if any(state.attrs[c.key].history.has_changes() for c in Event.__mapper__.column_attrs if c.key != 'ev_data_version'):
+                    event_ids.add(obj.ev_id)
+    bump_event_data_version(connection, event_ids)
+    # Announced to live screens once the transaction commits (see live_updates)
+    session.info.setdefault('changed_events', set()).update(i for i in event_ids if i)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _event_data_version_bulk(orm_execute_state):
+    """Query(...).update()/.delete() skip the flush, so bump the events of the rows they touch."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    statement = orm_execute_state.statement
+    if mapper.class_ is PlayerClubNickname:
+        ids_query = select(PlayerClubNickname.pcn_user_id, PlayerClubNickname.pcn_club_id)
+    elif mapper.class_ is Users:
+        columns = _updated_columns(statement)
+        if orm_execute_state.is_delete or (columns is not None and 'us_name' not in columns):
+            return
+        ids_query = select(Users.us_id)
+    elif mapper.class_ in EVENT_DATA_SOURCES:
+        ids_query = select(getattr(mapper.class_, EVENT_DATA_SOURCES[mapper.class_])).distinct()
+    else:
+        return
+    if statement.whereclause is not None:
+        ids_query = ids_query.where(statement.whereclause)
+    session = orm_execute_state.session
+    rows = session.execute(ids_query).all()
+    if mapper.class_ is PlayerClubNickname:
+        event_ids = player_event_ids(session.connection(), [row[0] for row in rows], [row[1] for row in rows])
+    elif mapper.class_ is Users:
+        event_ids = player_event_ids(session.connection(), [row[0] for row in rows])
+    else:
+        event_ids = {row[0] for row in rows if row[0]}
+    result = orm_execute_state.invoke_statement()
+    bump_event_data_version(session.connection(), event_ids)
+    session.info.setdefault('changed_events', set()).update(event_ids)
+    return result
+
 class ELOranking(db.Model):
     __tablename__ = 'tb_ELO_ranking'
     pl_id = db.Column(db.Integer, db.ForeignKey('tb_users.us_id'), primary_key=True)
@@ -704,6 +1087,36 @@ class ELOrankingHist(db.Model):
     opponent1 = db.relationship('Users', foreign_keys=[el_pl_id_op1], backref=db.backref('elo_history_as_opponent1', lazy=True))
     opponent2 = db.relationship('Users', foreign_keys=[el_pl_id_op2], backref=db.backref('elo_history_as_opponent2', lazy=True))
 
+    # The primary key leads with the game; per-player history needs its own index, in display order
+    __table_args__ = (db.Index('ix_elo_hist_player_date', 'el_pl_id', 'el_date', 'el_startTime'),)
+
+class ClubELOranking(db.Model):
+    """Materialized per-club ELO rating of a player, advanced incrementally as games are scored."""
+    __tablename__ = 'tb_club_ELO_ranking'
+    ce_club_id = db.Column(db.Integer, db.ForeignKey('tb_club.cl_id'), primary_key=True)
+    ce_pl_id = db.Column(db.Integer, db.ForeignKey('tb_users.us_id'), primary_key=True)
+    ce_rankingNow = db.Column(db.Float, nullable=False, default=1000.0)
+    ce_wins = db.Column(db.Integer, nullable=False, default=0)
+    ce_losses = db.Column(db.Integer, nullable=False, default=0)
+    ce_totalGames = db.Column(db.Integer, nullable=False, default=0)
+    ce_last_gm_id = db.Column(db.Integer, db.ForeignKey('tb_game.gm_id'), nullable=True)
+
+    # Relationships
+    club = db.relationship('Club', backref=db.backref('elo_rankings', lazy=True))
+    player = db.relationship('Users', backref=db.backref('club_elo_rankings', lazy=True))
+
+class ClubELOstate(db.Model):
+    """Watermark of the last game applied to a club's ELO ranking.
+    Games are applied in (gm_date, gm_timeStart, gm_id) order; cs_needs_rebuild forces a full replay."""
+    __tablename__ = 'tb_club_ELO_state'
+    cs_club_id = db.Column(db.Integer, db.ForeignKey('tb_club.cl_id'), primary_key=True)
+    cs_last_gm_id = db.Column(db.Integer, nullable=True)
+    cs_last_date = db.Column(db.Date, nullable=True)
+    cs_last_time = db.Column(db.Time, nullable=True)
+    cs_games_applied = db.Column(db.Integer, nullable=False, default=0)
+    cs_needs_rebuild = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    cs_updated_at = db.Column(db.DateTime(timezone=True), default=func.now(), onupdate=func.now())
+
 class LeaguePlayers(db.Model):
     __tablename__ = 'tb_league_players'
     lp_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -717,4 +1130,28 @@ class LeaguePlayers(db.Model):
     player = db.relationship('Users', foreign_keys=[lp_player_id], backref=db.backref('league_registrations', lazy=True))
     registered_by = db.relationship('Users', foreign_keys=[lp_registered_by_id], backref=db.backref('player_registrations_made', lazy=True))
 
-    __table_args__ = (db.UniqueConstraint('lp_league_id', 'lp_player_id', name='uq_league_player'),)
\ No newline at end of file
+    __table_args__ = (db.UniqueConstraint('lp_league_id', 'lp_player_id', name='uq_league_player'),)
+
+# Memoized registration counts (memoized_count) are dropped whenever registrations may have changed
+REGISTRATION_MODELS = (LeaguePlayers, GameDayRegistration, EventRegistration)
+
+def _registrations_pending(session):
+    return any(isinstance(obj, REGISTRATION_MODELS) for obj in (*session.new, *session.dirty, *session.deleted))
+
+@event.listens_for(Session, 'after_flush')
+def _registration_counts_flush(session, flush_context):
+    if _registrations_pending(session):
+        session.info.pop('registration_counts', None)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _registration_counts_bulk(orm_execute_state):
+    if orm_execute_state.is_select:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in REGISTRATION_MODELS:
+        orm_execute_state.session.info.pop('registration_counts', None)
+
+# Other requests may commit registrations between our transactions
+@event.listens_for(Session, 'after_transaction_end')
+def _registration_counts_transaction_end(session, transaction):
+    session.info.pop('registration_counts', None)
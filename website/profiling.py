@@ -0,0 +1,197 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from time import perf_counter
+from flask import g, request
+from flask_login import current_user
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+# A request is profiled when it carries a token minted on the profiles admin page, in either of these,
+# and is made by the superuser who minted it
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'X-Profile-Token'
+TOKEN_SALT = 'request-profile'
+
+# cProfile allows one active profiler, and one sampled request at a time keeps the overhead bounded
+_profile_lock = threading.Lock()
+_sample_counts = {}
+
+
+class StackSampler(threading.Thread):
+    """Samples the Python stack of one thread every interval seconds.
+    collapsed() returns the samples in the collapsed-stack format of flamegraph tools: 'root;...;leaf count'."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            key = ';'.join(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def collapsed(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in sorted(self.counts.items())) + '\n'
+
+
+def _serializer(app):
+    return URLSafeTimedSerializer(app.secret_key, salt=TOKEN_SALT)
+
+
+def profile_token(app, path, user_id):
+    """Signed token that profiles one request to path (query string not included) made by the superuser
+    user_id, valid PROFILE_TOKEN_MAX_AGE seconds."""
+    return _serializer(app).dumps([path, user_id])
+
+
+def _token_matches(app, token, path):
+    """A leaked link profiles nothing: the request must come from the superuser the token was minted for."""
+    if not (current_user.is_authenticated and current_user.us_is_superuser):
+        return False
+    try:
+        return _serializer(app).loads(token, max_age=app.config.get('PROFILE_TOKEN_MAX_AGE', 3600)) == [path, current_user.us_id]
+    except BadSignature:
+        return False
+
+
+def profile_dir(app):
+    return os.path.join(app.instance_path, app.config.get('PROFILE_DIR', 'profiles'))
+
+
+def list_profiles(app, limit=50):
+    """Metadata of the most recent profiles, newest first."""
+    directory = profile_dir(app)
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+        if len(profiles) >= limit:
+            break
+    return profiles
+
+
+def _prune_profiles(directory, keep):
+    names = sorted(n[:-len('.json')] for n in os.listdir(directory) if n.endswith('.json'))
+    for name in names[:-keep] if keep else []:
+        for suffix in ('.json', '.prof', '.collapsed.txt'):
+            try:
+                os.remove(os.path.join(directory, name + suffix))
+            except OSError:
+                pass
+
+
+def init_profiling(app):
+    """Profile single requests on demand.
+    A request of a superuser carrying a token minted for them (PROFILE_PARAM or PROFILE_HEADER) runs under cProfile
+    plus the stack sampler and leaves a .prof and a .collapsed.txt file in the instance folder. Endpoints listed in
+    PROFILE_SAMPLE_ENDPOINTS ({endpoint: N}) get one request in N profiled with the stack sampler only."""
+    if not app.config.get('PROFILING_ENABLED', True):
+        return
+    interval = app.config.get('PROFILE_SAMPLE_INTERVAL_MS', 5) / 1000
+    sample_endpoints = app.config.get('PROFILE_SAMPLE_ENDPOINTS') or {}
+    keep = app.config.get('PROFILE_KEEP', 50)
+
+    @app.before_request
+    def _start_profile():
+        token = request.args.get(PROFILE_PARAM) or request.headers.get(PROFILE_HEADER)
+        if token:
+            if not _token_matches(app, token, request.path):
+                return
+            mode = 'cprofile'
+        else:
+            every = sample_endpoints.get(request.endpoint)
+            if not every:
+                return
+            _sample_counts[request.endpoint] = count = _sample_counts.get(request.endpoint, 0) + 1
+            if count % every:
+                return
+            mode = 'sampled'
+        if not _profile_lock.acquire(blocking=False):
+            return  # another request is being profiled
+
+        sampler = StackSampler(threading.get_ident(), interval)
+        sampler.start()
+        profiler = None
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{request.endpoint or 'unmatched'}-{mode}"
+        g.request_profile = {'name': name, 'mode': mode, 'profiler': profiler, 'sampler': sampler,
+                             'started': perf_counter(), 'status': None}
+
+    @app.after_request
+    def _tag_profiled_response(response):
+        profile = g.get('request_profile')
+        if profile is not None:
+            profile['status'] = response.status_code
+            response.headers['X-Profile-Id'] = profile['name']
+        return response
+
+    # Teardown also runs when the view raised, so the profiler is always stopped and the lock released
+    @app.teardown_request
+    def _finish_profile(exception):
+        profile = g.pop('request_profile', None)
+        if profile is None:
+            return
+        try:
+            if profile['profiler'] is not None:
+                profile['profiler'].disable()
+            duration = perf_counter() - profile['started']
+            profile['sampler'].stop()
+
+            directory = profile_dir(app)
+            os.makedirs(directory, exist_ok=True)
+            base = os.path.join(directory, profile['name'])
+            files = []
+            if profile['profiler'] is not None:
+                profile['profiler'].dump_stats(base + '.prof')
+                files.append(profile['name'] + '.prof')
+            with open(base + '.collapsed.txt', 'w', encoding='utf-8') as f:
+                f.write(profile['sampler'].collapsed())
+            files.append(profile['name'] + '.collapsed.txt')
+            with open(base + '.json', 'w', encoding='utf-8') as f:
+                json.dump({
+                    'name': profile['name'],
+                    'mode': profile['mode'],
+                    'endpoint': request.endpoint,
+                    'method': request.method,
+                    'path': request.path,
+                    'status': profile['status'] or 500,
+                    'error': repr(exception) if exception else None,
+                    'duration_ms': round(duration * 1000, 2),
+                    'samples': profile['sampler'].samples,
+                    'created_at': datetime.now().isoformat(timespec='seconds'),
+                    'files': files,
+                }, f)
+            _prune_profiles(directory, keep)
+        except Exception as e:
+            app.logger.error(f"Error writing request profile: {str(e)}")
+        finally:
+            _profile_lock.release()
@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+
+# Rendered fragments are small strings; this bounds the cache to a few MB
+MAX_ENTRIES = 256
+# A waiting request recomputes itself if the request it waits for takes longer than this
+WAIT_SECONDS = 30
+
+
+class FragmentCache:
+    """Process-wide LRU cache of computed values (mostly rendered HTML) keyed by hashable tuples.
+    Keys carry a data version, so entries are never invalidated: stale ones just fall out of the LRU.
+    Computation is single-flight: concurrent misses on one key wait for the first request instead of
+    all computing the same value."""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        """Cached value of key, calling compute() on a miss."""
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]
+                pending = self._inflight.get(key)
+                if pending is None:
+                    pending = self._inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+                self.waits += 1
+            # Someone else is computing it: wait, then look again (it may have failed, then we compute)
+            if not pending.wait(WAIT_SECONDS):
+                return compute()
+
+        try:
+            value = compute()
+        except Exception:
+            with self._lock:
+                del self._inflight[key]
+            pending.set()
+            raise
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            del self._inflight[key]
+        pending.set()
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'waits': self.waits,
+                'evictions': self.evictions,
+            }
+
+
+fragment_cache = FragmentCache()
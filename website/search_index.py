@@ -0,0 +1,271 @@
+import difflib
+import heapq
+import re
+import threading
+import unicodedata
+from collections import Counter
+from time import monotonic, perf_counter
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from . import db
+from .models import Users, Event, Club, PlayerClubNickname, slugify
+
+# Rebuilt from the database when older than this, so changes committed by other processes show up too
+MAX_AGE_SECONDS = 600
+# A candidate must share this fraction of the query trigrams to be scored at all
+MIN_TRIGRAM_SHARE = 0.3
+# Only the candidates with the most shared trigrams get the exact (difflib) score
+MAX_SCORED_CANDIDATES = 200
+# Ties go to events, then users, then clubs: the order /search always checked them in
+KIND_ORDER = {'event': 0, 'user': 1, 'club': 2}
+
+_WORD = re.compile(r'\w+')
+
+
+def fold(text):
+    """Lowercase without accents, so 'João' matches 'joao'."""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def trigrams(folded):
+    """Trigrams of every word padded as '  word ', so short queries still match word starts."""
+    grams = set()
+    for word in _WORD.findall(folded):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def match_score(query, name):
+    """1.0 for a substring (shorter names first), the difflib ratio otherwise; both folded."""
+    if query in name:
+        return 1.0 - (len(name) - len(query)) * 0.001
+    return difflib.SequenceMatcher(None, query, name).ratio()
+
+
+class SearchIndex:
+    """Process-wide trigram index over event titles, user names (and their club nicknames) and club names.
+    Built lazily from the database; committed ORM changes are applied in place (see the session events
+    below), and the whole index is rebuilt after MAX_AGE_SECONDS for changes made by other processes.
+    Documents are (kind, id, folded text, display name, slug); an object has one document per searchable
+    name. Updated objects leave tombstones (None) in the document list until the next rebuild.
+    The documents, postings and key map are one snapshot that is never modified once published: updates
+    copy what they change and swap the snapshot in, so searches hold the lock only to take the reference."""
+
+    def __init__(self, max_age=MAX_AGE_SECONDS):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._snapshot = ([], {}, {})  # (docs, postings, by_key)
+        self._built_at = None
+        self.build_seconds = 0.0
+
+    # --- building ---
+
+    def _load(self):
+        """Searchable names of every eligible object: {(kind, id): (display name, slug, [names])}."""
+        objects = {}
+        for ev_id, title in db.session.query(Event.ev_id, Event.ev_title).filter(Event.ev_status != 'canceled'):
+            objects[('event', ev_id)] = (title, f"{slugify(title)}-{ev_id}", [title])
+        for us_id, name in db.session.query(Users.us_id, Users.us_name).filter(Users.us_is_active == True):
+            objects[('user', us_id)] = (name, None, [name])
+        for user_id, nickname in db.session.query(PlayerClubNickname.pcn_user_id, PlayerClubNickname.pcn_nickname):
+            entry = objects.get(('user', user_id))
+            if entry and nickname:
+                entry[2].append(nickname)
+        for cl_id, name, slug in db.session.query(Club.cl_id, Club.cl_name, Club.cl_slug).filter(Club.cl_active == True):
+            objects[('club', cl_id)] = (name, slug, [name])
+        return objects
+
+    @staticmethod
+    def _documents(key, display, slug, names):
+        return [(key[0], key[1], folded, display, slug) for folded in dict.fromkeys(fold(n) for n in names if n)]
+
+    @staticmethod
+    def _add(docs, postings, by_key, doc):
+        doc_id = len(docs)
+        docs.append(doc)
+        for gram in trigrams(doc[2]):
+            postings.setdefault(gram, []).append(doc_id)
+        by_key.setdefault(doc[:2], []).append(doc_id)
+
+    def rebuild(self):
+        started = perf_counter()
+        documents = [doc for key, value in self._load().items() for doc in self._documents(key, *value)]
+        # Numbered shortest first: among documents sharing as many trigrams, the shorter name is the better match
+        documents.sort(key=lambda doc: len(doc[2]))
+        docs, postings, by_key = [], {}, {}
+        for doc in documents:
+            self._add(docs, postings, by_key, doc)
+        with self._write_lock:
+            self._publish((docs, postings, by_key))
+            self._built_at = monotonic()
+        self.build_seconds = perf_counter() - started
+
+    def invalidate(self):
+        """Rebuild on the next search (after bulk changes the ORM events can't see)."""
+        self._built_at = None
+
+    def _ensure_built(self):
+        if self._built_at is not None and monotonic() - self._built_at < self.max_age:
+            return
+        # One request rebuilds; the others keep searching the previous index meanwhile
+        if self._build_lock.acquire(blocking=self._built_at is None):
+            try:
+                if self._built_at is None or monotonic() - self._built_at >= self.max_age:
+                    self.rebuild()
+            finally:
+                self._build_lock.release()
+
+    # --- updates ---
+
+    def _publish(self, snapshot):
+        with self._lock:
+            self._snapshot = snapshot
+
+    def _current(self):
+        with self._lock:
+            return self._snapshot
+
+    def apply(self, changes):
+        """Apply committed changes: {(kind, id): (display name, slug, [names]) or None when removed}.
+        Copy-on-write: the document list and the two dicts are copied, and of the posting lists only
+        those that gain a document (the key was popped, so its list is new), so searches running on
+        the previous snapshot never see a change."""
+        if self._built_at is None:
+            return  # the next search builds from the database anyway
+        with self._write_lock:
+            docs, postings, by_key = self._snapshot
+            docs, postings, by_key = list(docs), dict(postings), dict(by_key)
+            copied = set()
+            for key, value in changes.items():
+                for doc_id in by_key.pop(key, ()):
+                    docs[doc_id] = None
+                for doc in self._documents(key, *value) if value is not None else ():
+                    for gram in trigrams(doc[2]) - copied:
+                        if gram in postings:
+                            postings[gram] = list(postings[gram])
+                        copied.add(gram)
+                    self._add(docs, postings, by_key, doc)
+            self._publish((docs, postings, by_key))
+
+    # --- searching ---
+
+    def search(self, query, limit=10):
+        """Best matches of query as (score, kind, id, display name, slug), best first, one per object."""
+        folded = fold(query).strip()
+        if not folded:
+            return []
+        self._ensure_built()
+        docs, postings, _ = self._current()
+        grams = trigrams(folded)
+        if not grams:
+            return []
+        # Shared trigrams per document, counted over the postings in C (Counter.update)
+        shared = Counter()
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting:
+                shared.update(posting)
+        required = max(1, int(len(grams) * MIN_TRIGRAM_SHARE))
+        # Only the best candidates get the exact score: most shared trigrams, then lowest number (shortest name)
+        candidates = heapq.nsmallest(MAX_SCORED_CANDIDATES,
+                                     ((-count, doc_id) for doc_id, count in shared.items() if count >= required))
+        scored = [docs[doc_id] for _, doc_id in candidates if docs[doc_id] is not None]
+
+        best = {}
+        for kind, obj_id, text, display, slug in scored:
+            score = match_score(folded, text)
+            key = (kind, obj_id)
+            if key not in best or score > best[key][0]:
+                best[key] = (score, kind, obj_id, display, slug)
+        results = sorted(best.values(), key=lambda r: (-r[0], KIND_ORDER[r[1]], r[2]))
+        return results[:limit]
+
+    def stats(self):
+        docs, postings, _ = self._current()
+        return {'documents': sum(1 for d in docs if d is not None),
+                'tombstones': sum(1 for d in docs if d is None),
+                'trigrams': len(postings),
+                'build_seconds': self.build_seconds}
+
+
+search_index = SearchIndex()
+
+
+# --- keeping the index current ---
+# Changes are collected at flush time (the objects still hold their values) and applied once the
+# transaction commits, so rolled back changes never reach the index.
+
+def _indexed_value(obj, session):
+    """(kind, id) and the indexed value of obj ((display, slug, names) or None when not searchable)."""
+    if isinstance(obj, Event):
+        key = ('event', obj.ev_id)
+        if obj.ev_status == 'canceled' or obj in session.deleted:
+            return key, None
+        return key, (obj.ev_title, f"{slugify(obj.ev_title)}-{obj.ev_id}", [obj.ev_title])
+    if isinstance(obj, Club):
+        key = ('club', obj.cl_id)
+        if not obj.cl_active or obj in session.deleted:
+            return key, None
+        return key, (obj.cl_name, obj.cl_slug, [obj.cl_name])
+    if isinstance(obj, Users):
+        key = ('user', obj.us_id)
+        if not obj.us_is_active or obj in session.deleted:
+            return key, None
+        nicknames = session.query(PlayerClubNickname.pcn_nickname).filter(PlayerClubNickname.pcn_user_id == obj.us_id)
+        return key, (obj.us_name, None, [obj.us_name] + [n for (n,) in nicknames if n])
+    return None, None
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_search_changes(session, flush_context):
+    users = set()
+    changed = []
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, PlayerClubNickname):
+            users.add(obj.pcn_user_id)
+        elif isinstance(obj, (Event, Club, Users)):
+            if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+                continue
+            changed.append(obj)
+    if not changed and not users:
+        return
+    pending = session.info.setdefault('search_changes', {})
+    with session.no_autoflush:
+        for obj in changed:
+            key, value = _indexed_value(obj, session)
+            pending[key] = value
+            users.discard(obj.us_id if isinstance(obj, Users) else None)
+        for user_id in users:
+            user = session.get(Users, user_id)
+            if user is not None:
+                key, value = _indexed_value(user, session)
+                pending[key] = value
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _bulk_search_changes(orm_execute_state):
+    """Query(...).update()/.delete() skip the flush: rebuild after the commit."""
+    if orm_execute_state.is_select:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in (Users, Event, Club, PlayerClubNickname):
+        orm_execute_state.session.info['search_rebuild'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_search_changes(session):
+    changes = session.info.pop('search_changes', None)
+    if session.info.pop('search_rebuild', False):
+        search_index.invalidate()
+    elif changes:
+        search_index.apply(changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_search_changes(session):
+    session.info.pop('search_changes', None)
+    session.info.pop('search_rebuild', None)
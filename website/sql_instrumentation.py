@@ -0,0 +1,126 @@
+import heapq
+import json
+import logging
+import os
+import re
+from time import perf_counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+stats_logger = logging.getLogger('website.sql')
+slow_query_logger = logging.getLogger('website.slow_queries')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement):
+    """One-line SQL with literals replaced by ? and IN lists collapsed, so the same query groups together
+    and no value (name, email, score...) ends up in a header or log."""
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _NUMBER_LITERAL.sub('?', statement)
+    statement = _PLACEHOLDER_LIST.sub('(?, ...)', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+
+class RequestQueryStats:
+    """SQL statements issued while serving one request: count, total time and the N slowest."""
+
+    def __init__(self, top_n):
+        self.top_n = top_n
+        self.count = 0
+        self.total_seconds = 0.0
+        self._slowest = []
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.total_seconds += seconds
+        entry = (seconds, self.count, statement)
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, entry)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self):
+        """[(milliseconds, normalized sql)], slowest first."""
+        return [(round(seconds * 1000, 2), normalize_sql(statement))
+                for seconds, _, statement in sorted(self._slowest, reverse=True)]
+
+
+def init_sql_instrumentation(app, engine):
+    """Time every statement of the engine and attach the per-request totals to the response:
+    X-SQL-* headers when SQL_STATS_HEADERS is on (defaults to debug mode), a JSON log line for
+    requests over SQL_LOG_MIN_QUERIES statements or SQL_LOG_MIN_MS of DB time, and one line per
+    statement slower than SQL_SLOW_QUERY_MS in the instance folder's slow query log."""
+    if not app.config.get('SQL_INSTRUMENTATION', True):
+        return
+    top_n = app.config.get('SQL_TOP_N', 5)
+    slow_seconds = app.config.get('SQL_SLOW_QUERY_MS', 100) / 1000
+    log_min_queries = app.config.get('SQL_LOG_MIN_QUERIES', 50)
+    log_min_seconds = app.config.get('SQL_LOG_MIN_MS', 500) / 1000
+    if not slow_query_logger.handlers:
+        handler = logging.FileHandler(os.path.join(app.instance_path, app.config.get('SQL_SLOW_QUERY_LOG', 'slow_queries.log')))
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        slow_query_logger.addHandler(handler)
+        slow_query_logger.setLevel(logging.INFO)
+        slow_query_logger.propagate = False
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_time', []).append(perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_start_time'].pop()
+        seconds = perf_counter() - started
+        if not has_request_context():
+            return
+        stats = g.get('sql_stats')
+        if stats is None:
+            stats = g.sql_stats = RequestQueryStats(top_n)
+        stats.record(statement, seconds)
+        if seconds >= slow_seconds:
+            # Parameters are never logged, only how many there were
+            nbr_params = len(parameters) if isinstance(parameters, (list, tuple, dict)) else 0
+            slow_query_logger.info(json.dumps({
+                'ms': round(seconds * 1000, 2),
+                'endpoint': request.endpoint,
+                'method': request.method,
+                'path': request.path,
+                'params': nbr_params if not executemany else f"{nbr_params} rows",
+                'sql': normalize_sql(statement),
+            }))
+
+    # Drop the pending start times of statements that failed
+    @event.listens_for(engine, 'handle_error')
+    def _clear_timer(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('query_start_time'):
+            connection.info['query_start_time'].pop()
+
+    @app.after_request
+    def _report_sql_stats(response):
+        stats = g.get('sql_stats')
+        if stats is None:
+            return response
+        total_ms = round(stats.total_seconds * 1000, 2)
+        headers = app.config.get('SQL_STATS_HEADERS')
+        if headers if headers is not None else app.debug:
+            response.headers['X-SQL-Queries'] = str(stats.count)
+            response.headers['X-SQL-Time-ms'] = str(total_ms)
+            slowest = stats.slowest()
+            if slowest:
+                response.headers['X-SQL-Slowest'] = f"{slowest[0][0]}ms {slowest[0][1][:200]}"
+        if stats.count >= log_min_queries or stats.total_seconds >= log_min_seconds:
+            stats_logger.warning(json.dumps({
+                'endpoint': request.endpoint,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': stats.count,
+                'db_ms': total_ms,
+                'slowest': stats.slowest(),
+            }))
+        return response
@@ -1,6 +1,9 @@
 from datetime import datetime, timezone
 from . import db
 from .models import League
+from .config import Config
+from .db_engine import optimize_database
+from .metrics import BACKGROUND_TASK
 import threading
 import time
 import logging
@@ -10,6 +13,7 @@ import atexit
 _update_thread = None
 _should_stop = False
 
+@BACKGROUND_TASK.time('update_league_statuses')
 def update_league_statuses(app):
     with app.app_context():
         try:
@@ -24,13 +28,23 @@ def update_league_statuses(app):
         finally:
             db.session.close()  # Ensure connections are closed
 
+@BACKGROUND_TASK.time('optimize_database')
+def optimize_database_statistics(app):
+    with app.app_context():
+        optimize_database(db.engine)
+
 def run_status_updates(app):
     global _should_stop
+    last_optimize = None
     while not _should_stop:
         try:
             update_league_statuses(app)
         except Exception as e:
             logging.error(f"Unhandled exception in status update thread: {str(e)}")
+
+        if last_optimize is None or time.monotonic() - last_optimize >= Config.SQLITE_OPTIMIZE_INTERVAL_HOURS * 3600:
+            optimize_database_statistics(app)
+            last_optimize = time.monotonic()
         
         # Check every minute
         for _ in range(60):  # Check stop flag every second instead of blocking for 60 seconds
@@ -69,5 +83,6 @@ def scheduled_task(app):
     with app.app_context():
         try:
             update_league_statuses(app)
+            optimize_database_statistics(app)
         except Exception as e:
             logging.error(f"Error in scheduled task: {str(e)}")
\ No newline at end of file
@@ -1,11 +1,18 @@
 from flask_login import login_required, current_user
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import and_, func, cast, String, text, desc, case, literal_column
-from flask import render_template, Blueprint
+from sqlalchemy import and_, or_, func, cast, String, text, desc, case, literal_column, union_all, tuple_
+from sqlalchemy.orm import aliased
+from flask import render_template, Blueprint, current_app
 from website import db
-from website.models import League, Club, Users, GameDay, GameDayPlayer, Game, LeagueClassification, GameDayClassification, ELOranking, ELOrankingHist, LeagueCourts, Event
+from website.models import League, Club, Users, GameDay, GameDayPlayer, Game, LeagueClassification, GameDayClassification, ELOranking, ELOrankingHist, LeagueCourts, Court, Event, ClubELOranking, ClubELOstate, GameParticipation, PlayerStats, PlayerPairStats, EventType, GAME_HISTORY_KEY, game_participation_rows, sync_game_participation, bump_events, slugify
 from PIL import Image
-from datetime import datetime, date, timedelta
+from datetime import datetime, date, time, timedelta
+from time import perf_counter
+from collections import Counter
+from .metrics import ELO_RECALCULATION, IMAGE_CACHE
+import hashlib
+import os
+import tempfile
 
 #tools
 def func_crop_image_in_memory(filePath):
@@ -19,6 +26,49 @@ def func_crop_image_in_memory(filePath):
     img = img.crop((left, top, right, bottom))
     return img
 
+# Square variants of the display_*_image routes: name -> side in pixels (None keeps the cropped size)
+IMAGE_VARIANTS = {'avatar': 96, 'card': 320, 'full': None}
+
+def func_derived_image(source_path, variant='full'):
+    """Square-cropped (and for avatar/card resized) JPEG of source_path, generated once under instance/image_cache.
+    The cache key carries the source mtime and size, so replacing the photo makes a new variant and drops the old one.
+    Returns (cached_path, etag)."""
+    stat = os.stat(source_path)
+    source_key = hashlib.sha1(os.path.abspath(source_path).encode('utf-8')).hexdigest()
+    version = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    cache_dir = os.path.join(current_app.instance_path, 'image_cache', source_key)
+    cached_path = os.path.join(cache_dir, f"{variant}-{version}.jpg")
+    etag = f"{source_key[:16]}-{variant}-{version}"
+
+    if os.path.isfile(cached_path):
+        IMAGE_CACHE.inc('hit')
+    else:
+        IMAGE_CACHE.inc('miss')
+        os.makedirs(cache_dir, exist_ok=True)
+        img = func_crop_image_in_memory(source_path)
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        side = IMAGE_VARIANTS[variant]
+        if side and img.width > side:
+            img = img.resize((side, side), Image.LANCZOS)
+        # Write to a unique temporary name first so concurrent requests never serve, or replace, a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                img.save(tmp_file, 'JPEG', quality=85)
+            os.replace(tmp_path, cached_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        # Variants of older photos; a request still about to send one looks again (see send_derived_image)
+        for name in os.listdir(cache_dir):
+            if name.startswith(f"{variant}-") and name != os.path.basename(cached_path) and not name.endswith('.tmp'):
+                try:
+                    os.remove(os.path.join(cache_dir, name))
+                except OSError:
+                    pass
+    return cached_path, etag
+
 def func_calculate_player_age(birthdate):
         today = date.today()
         age = today.year - birthdate.year - ((today.month, today.day) < (birthdate.month, birthdate.day))
@@ -44,359 +94,493 @@ def func_delete_gameday_players_upd_class(gameDayID):
     #Calculate the league classification after
     func_calculateLeagueClassification(leagueID)
 
-def func_calculateLeagueClassification(leagueID):
-    #print("Enter LeagueClassification")
-    # clear the league classification
+def func_sync_game_participation(*game_filters):
+    """Resync tb_game_participation for the games matching game_filters.
+    Needed after raw SQL writes to tb_game, which bypass the Game ORM events. The caller commits."""
+    game_ids = [gm_id for (gm_id,) in db.session.query(Game.gm_id).filter(*game_filters).all()]
+    sync_game_participation(db.session.connection(), game_ids)
+    return len(game_ids)
+
+
+def func_rebuild_game_participation(batch_size=1000):
+    """Rebuild tb_game_participation from every game in one transaction. Returns the number of rows written."""
     try:
-        LeagueClassification.query.filter_by(lc_idLeague=leagueID).delete()
+        participation = GameParticipation.__table__
+        db.session.execute(participation.delete())
+        nbr_rows = 0
+        batch = []
+        for game in db.session.execute(db.select(Game.__table__).execution_options(yield_per=batch_size)):
+            batch.extend(game_participation_rows(game))
+            if len(batch) >= batch_size:
+                db.session.execute(participation.insert(), batch)
+                nbr_rows += len(batch)
+                batch = []
+        if batch:
+            db.session.execute(participation.insert(), batch)
+            nbr_rows += len(batch)
+        # The bulk rewrite skips the incremental pair totals, so rebuild them from the new rows
+        func_rebuild_player_pair_stats()
+        func_invalidate_player_stats()
         db.session.commit()
+        return nbr_rows
+    except Exception as e:
+        print(f"Error: {e}")
+        db.session.rollback()
+        return None
+
+
+def func_rebuild_player_pair_stats():
+    """Rebuild tb_player_pair_stats from tb_game_participation with one grouped INSERT ... SELECT. The caller commits."""
+    db.session.execute(PlayerPairStats.__table__.delete())
+    db.session.execute(text("""
+        INSERT INTO tb_player_pair_stats (pp_pl_id, pp_other_id, pp_relation, pp_games, pp_wins, pp_losses, pp_games_diff)
+        SELECT gpt_pl_id, other_id, relation, COUNT(*),
+               SUM(CASE WHEN gpt_result = 1 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN gpt_result = -1 THEN 1 ELSE 0 END),
+               SUM(COALESCE(gpt_games_for, 0) - COALESCE(gpt_games_against, 0))
+        FROM (
+            SELECT gpt_pl_id, gpt_partner_id AS other_id, 'partner' AS relation, gpt_result, gpt_games_for, gpt_games_against FROM tb_game_participation
+            UNION ALL
+            SELECT gpt_pl_id, gpt_op1_id, 'opponent', gpt_result, gpt_games_for, gpt_games_against FROM tb_game_participation
+            UNION ALL
+            SELECT gpt_pl_id, gpt_op2_id, 'opponent', gpt_result, gpt_games_for, gpt_games_against FROM tb_game_participation
+        )
+        WHERE other_id IS NOT NULL AND (COALESCE(gpt_games_for, 0) > 0 OR COALESCE(gpt_games_against, 0) > 0)
+        GROUP BY gpt_pl_id, other_id, relation
+    """))
+
+
+def func_compare_players(player_a, player_b):
+    """Partnership and head-to-head totals of player_a with player_b, from player_a's side.
+    Two primary-key reads on tb_player_pair_stats; missing pairs come back as zeros."""
+    rows = {
+        row.pp_relation: row
+        for row in PlayerPairStats.query.filter(
+            PlayerPairStats.pp_pl_id == player_a,
+            PlayerPairStats.pp_other_id == player_b,
+            PlayerPairStats.pp_relation.in_(('partner', 'opponent'))
+        )
+    }
+    result = {}
+    for relation in ('partner', 'opponent'):
+        row = rows.get(relation)
+        games = row.pp_games if row else 0
+        wins = row.pp_wins if row else 0
+        losses = row.pp_losses if row else 0
+        result[relation] = {
+            'games': games,
+            'wins': wins,
+            'losses': losses,
+            'draws': games - wins - losses,
+            'games_diff': row.pp_games_diff if row else 0,
+            'win_percentage': round(wins * 100 / games, 2) if games else 0,
+        }
+    return result
 
-        players_query = Users.query.filter(Users.us_id.in_(db.session.query(GameDayPlayer.gp_idPlayer).filter(GameDayPlayer.gp_idLeague == leagueID).group_by(GameDayPlayer.gp_idPlayer)))
-        players_data = players_query.all()
-
-
-        for player in players_data:
-            id_player = player.us_id
-            player_name = player.us_name
-            player_birthday = player.us_birthday
-            player_age = func_calculate_player_age(player_birthday)
-
-            games_info_query = Game.query.filter(Game.gm_idLeague == leagueID, ((Game.gm_idPlayer_A1 == id_player) | (Game.gm_idPlayer_A2 == id_player) | (Game.gm_idPlayer_B1 == id_player) | (Game.gm_idPlayer_B2 == id_player)), ((Game.gm_result_A > 0) | (Game.gm_result_B > 0)))
-            games_info = games_info_query.first()
-
-            league = League.query.filter_by(lg_id=leagueID).first()
-            presence_points = league.lg_presence_points if league else 0
-
-            if games_info:
-                subquery = (
-                    db.session.query(
-                        case(
-                            (and_(Game.gm_idPlayer_A1 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("3")),
-                            (and_(Game.gm_idPlayer_A2 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("3")),
-                            (and_(Game.gm_idPlayer_A1 == id_player, Game.gm_result_A == Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_A2 == id_player, Game.gm_result_A == Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_A1 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_A2 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_B1 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_B2 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_B1 == id_player, Game.gm_result_A == Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_B2 == id_player, Game.gm_result_A == Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_B1 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("3")),
-                            (and_(Game.gm_idPlayer_B2 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("3")),
-                            else_=None
-                        ).label("POINTS"),
-                        case(
-                            (and_(Game.gm_idPlayer_A1 == id_player), Game.gm_result_A),
-                            (and_(Game.gm_idPlayer_A2 == id_player), Game.gm_result_A),
-                            (and_(Game.gm_idPlayer_B1 == id_player), Game.gm_result_B),
-                            (and_(Game.gm_idPlayer_B2 == id_player), Game.gm_result_B),
-                            else_=None
-                        ).label("GAMESFAVOR"),
-                        case(
-                            (and_(Game.gm_idPlayer_A1 == id_player), Game.gm_result_B),
-                            (and_(Game.gm_idPlayer_A2 == id_player), Game.gm_result_B),
-                            (and_(Game.gm_idPlayer_B1 == id_player), Game.gm_result_A),
-                            (and_(Game.gm_idPlayer_B2 == id_player), Game.gm_result_A),
-                            else_=None
-                        ).label("GAMESAGAINST"),
-                        literal_column("1").label("GAMES"),
-                        case(
-                            (and_(Game.gm_idPlayer_A1 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_A2 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_B1 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_B2 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("1")),
-                            else_=literal_column("0")
-                        ).label("WINS"),
-                        case(
-                            (and_(Game.gm_idPlayer_A1 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_A2 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_B1 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_B2 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("1")),
-                            else_=literal_column("0")
-                        ).label("LOSSES")
-                    )
-                    .filter(Game.gm_idLeague == leagueID, (Game.gm_idPlayer_A1 == id_player) | (Game.gm_idPlayer_A2 == id_player) | (Game.gm_idPlayer_B1 == id_player) | (Game.gm_idPlayer_B2 == id_player))
-                    .subquery("TOTALS")
-                )
 
-                query = (
-                    db.session.query(
-                        literal_column(str(leagueID)).label("LEAGUEID"),
-                        literal_column(str(id_player)).label("PLAYERID"),
-                        literal_column(f"'{player_name}'").label("PLAYERNAME"), 
-                        (func.sum(subquery.c.POINTS)+(presence_points)).label("POINTS"),
-                        func.sum(subquery.c.WINS).label("WINS"),
-                        func.sum(subquery.c.LOSSES).label("LOSSES"),
-                        func.sum(subquery.c.GAMESFAVOR).label("GAMESFAVOR"),
-                        func.sum(subquery.c.GAMESAGAINST).label("GAMESAGAINST"),
-                        (func.sum(subquery.c.GAMESFAVOR) - func.sum(subquery.c.GAMESAGAINST)).label("GAMESDIFFERENCE"),
-                        (
-                            ((func.sum(subquery.c.POINTS) + presence_points) * 100000) +
-                            (func.sum(subquery.c.WINS) *10000) +
-                            (func.sum(subquery.c.GAMES) *1000) +
-                            ((func.sum(subquery.c.GAMESFAVOR)- func.sum(subquery.c.GAMESAGAINST))*100) +
-                            # ((func.sum(subquery.c.WINS) / func.sum(subquery.c.GAMES)) * 10000) +
-                            # ((func.sum(subquery.c.GAMESFAVOR) / (func.sum(subquery.c.GAMESFAVOR) + func.sum(subquery.c.GAMESAGAINST))) * 100) +
-                            (player_age / 100)
-                        ).label("RANKING")
-                    )
-                    .select_from(subquery)
-                    .group_by("LEAGUEID", "PLAYERID", "PLAYERNAME")
-                )
+# Games and gamedays before this date are left out of the player statistics
+PLAYER_STATS_CUTOFF = date(2024, 1, 1)
+
+
+def _top_player_share(counts, games):
+    """(player, count, games) with the highest count / games share, ties going to the highest count then the lowest id."""
+    if not counts:
+        return None, 0, 0
+    other_id = max(counts, key=lambda pid: (counts[pid] * 100.0 / games[pid], counts[pid], -pid))
+    return other_id, counts[other_id], games[other_id]
+
+
+def _player_stats_values(player_id):
+    """Column values of tb_player_stats for one player, from the player's participation rows."""
+    rows = db.session.query(
+        GameParticipation.gpt_partner_id, GameParticipation.gpt_op1_id, GameParticipation.gpt_op2_id,
+        GameParticipation.gpt_games_for, GameParticipation.gpt_games_against, GameParticipation.gpt_result,
+        GameParticipation.gpt_date,
+    ).filter(
+        GameParticipation.gpt_pl_id == player_id,
+        GameParticipation.gpt_date > PLAYER_STATS_CUTOFF
+    ).all()
+
+    total_games = games_won = 0
+    last_game_date = None
+    # Best teammate only counts games with a score, worst teammate counts every game
+    teammate_played, teammate_wins = Counter(), Counter()
+    teammate_games, teammate_losses = Counter(), Counter()
+    opponent_games, nemesis_losses, fav_opponent_wins = Counter(), Counter(), Counter()
+    for partner, op1, op2, games_for, games_against, result, game_date in rows:
+        if last_game_date is None or game_date > last_game_date:
+            last_game_date = game_date
+        played = (games_for or 0) > 0 or (games_against or 0) > 0
+        if played:
+            total_games += 1
+            games_won += result == 1
+        if partner:
+            if played:
+                teammate_played[partner] += 1
+                teammate_wins[partner] += result == 1
+            teammate_games[partner] += 1
+            teammate_losses[partner] += result == -1
+        for opponent in (op1, op2):
+            if opponent:
+                opponent_games[opponent] += 1
+        # A win or a loss is credited to the first opponent only
+        if result in (1, -1):
+            opponent = op1 if op1 is not None and op1 != player_id else op2
+            if opponent:
+                (fav_opponent_wins if result == 1 else nemesis_losses)[opponent] += 1
+
+    best_teammate = _top_player_share({pid: teammate_wins[pid] for pid in teammate_played}, teammate_played)
+    worst_teammate = _top_player_share({pid: teammate_losses[pid] for pid in teammate_games}, teammate_games)
+    nemesis = _top_player_share(nemesis_losses, opponent_games)
+    fav_opponent = _top_player_share(fav_opponent_wins, opponent_games)
+
+    gamedays_won = db.session.query(func.count(GameDay.gd_id)).filter(
+        or_(GameDay.gd_idWinner1 == player_id, GameDay.gd_idWinner2 == player_id),
+        GameDay.gd_date > PLAYER_STATS_CUTOFF
+    ).scalar()
+
+    elo_best, elo_worst = db.session.query(
+        func.max(ELOrankingHist.el_afterRank), func.min(ELOrankingHist.el_afterRank)
+    ).filter(ELOrankingHist.el_pl_id == player_id).one()
+    elo_now = db.session.query(ELOrankingHist.el_afterRank).filter(
+        ELOrankingHist.el_pl_id == player_id
+    ).order_by(ELOrankingHist.el_date.desc(), ELOrankingHist.el_startTime.desc()).limit(1).scalar()
+
+    return {
+        'ps_total_games': total_games,
+        'ps_games_won': games_won,
+        'ps_last_game_date': last_game_date,
+        'ps_gamedays_won': gamedays_won or 0,
+        'ps_best_teammate_id': best_teammate[0],
+        'ps_best_teammate_wins': best_teammate[1],
+        'ps_best_teammate_games': best_teammate[2],
+        'ps_worst_teammate_id': worst_teammate[0],
+        'ps_worst_teammate_losses': worst_teammate[1],
+        'ps_worst_teammate_games': worst_teammate[2],
+        'ps_nemesis_id': nemesis[0],
+        'ps_nemesis_losses': nemesis[1],
+        'ps_nemesis_games': nemesis[2],
+        'ps_fav_opponent_id': fav_opponent[0],
+        'ps_fav_opponent_wins': fav_opponent[1],
+        'ps_fav_opponent_games': fav_opponent[2],
+        'ps_elo_best': elo_best,
+        'ps_elo_worst': elo_worst,
+        'ps_elo_now': elo_now,
+        'ps_needs_refresh': False,
+    }
 
-                result = query.all()
-
-                for r2 in result:
-                    # Write Classification
-                    classification = LeagueClassification(
-                        lc_idLeague=leagueID,
-                        lc_idPlayer=r2.PLAYERID,
-                        # lc_namePlayer=r2.PLAYERNAME,
-                        lc_points=r2.POINTS or 0,
-                        lc_wins=r2.WINS or 0,
-                        lc_losses=r2.LOSSES or 0,
-                        lc_gamesFavor=r2.GAMESFAVOR or 0,
-                        lc_gamesAgainst=r2.GAMESAGAINST or 0,
-                        lc_gamesDiff=r2.GAMESDIFFERENCE or 0,
-                        lc_ranking=r2.RANKING or 0,
-                    )
-                    db.session.add(classification)
-
-                # Commit the changes to the database
-                db.session.commit()
 
-            else:
-                # Calculation for players without games
-                # Write Classification
-                classification = LeagueClassification(
-                    lc_idLeague=leagueID,
-                    lc_idPlayer=id_player,
-                    # lc_namePlayer=player_name,
-                    lc_points=0,
-                    lc_wins=0,
-                    lc_losses=0,
-                    lc_gamesFavor=0,
-                    lc_gamesAgainst=0,
-                    lc_gamesDiff=0,
-                    lc_ranking=0+(player_age/100),
-                )
-                db.session.add(classification)
-                db.session.commit()
+def func_refresh_player_stats(player_ids):
+    """Recompute tb_player_stats for the given players and commit once."""
+    player_ids = {pid for pid in player_ids if pid}
+    if not player_ids:
+        return
+    try:
+        existing = {ps.ps_pl_id: ps for ps in PlayerStats.query.filter(PlayerStats.ps_pl_id.in_(player_ids))}
+        for player_id in player_ids:
+            stats = existing.get(player_id)
+            if stats is None:
+                stats = PlayerStats(ps_pl_id=player_id)
+                db.session.add(stats)
+            for column, value in _player_stats_values(player_id).items():
+                setattr(stats, column, value)
+        db.session.commit()
+    except Exception as e:
+        print(f"Error: {e}")
+        db.session.rollback()
+
+
+def func_invalidate_player_stats(player_ids=None):
+    """Flag the stats of the given players (every player when None) for a refresh on next read. The caller commits."""
+    query = PlayerStats.query
+    if player_ids is not None:
+        query = query.filter(PlayerStats.ps_pl_id.in_({pid for pid in player_ids if pid}))
+    query.update({PlayerStats.ps_needs_refresh: True}, synchronize_session=False)
+
+
+def func_refresh_game_players_stats(*game_filters):
+    """Refresh the stale stats of the players of the games matching game_filters, e.g. right after scoring them.
+    Players without a stats row yet get one on their first player_info view."""
+    player_ids = [pid for (pid,) in db.session.query(PlayerStats.ps_pl_id).join(
+        GameParticipation, GameParticipation.gpt_pl_id == PlayerStats.ps_pl_id
+    ).join(
+        Game, Game.gm_id == GameParticipation.gpt_gm_id
+    ).filter(PlayerStats.ps_needs_refresh == True, *game_filters).distinct()]
+    func_refresh_player_stats(player_ids)
+
+
+def func_get_player_stats(player_id):
+    """tb_player_stats row of a player with the names of the players it points to, refreshed first if stale.
+    Returns (stats, {'best_teammate': name, 'worst_teammate': name, 'nemesis': name, 'fav_opponent': name})."""
+    best_teammate, worst_teammate, nemesis, fav_opponent = (aliased(Users) for _ in range(4))
+    query = db.session.query(
+        PlayerStats, best_teammate.us_name, worst_teammate.us_name, nemesis.us_name, fav_opponent.us_name
+    ).outerjoin(
+        best_teammate, best_teammate.us_id == PlayerStats.ps_best_teammate_id
+    ).outerjoin(
+        worst_teammate, worst_teammate.us_id == PlayerStats.ps_worst_teammate_id
+    ).outerjoin(
+        nemesis, nemesis.us_id == PlayerStats.ps_nemesis_id
+    ).outerjoin(
+        fav_opponent, fav_opponent.us_id == PlayerStats.ps_fav_opponent_id
+    ).filter(PlayerStats.ps_pl_id == player_id)
+
+    row = query.first()
+    if row is None or row[0].ps_needs_refresh:
+        func_refresh_player_stats([player_id])
+        row = query.first()
+    if row is None:
+        return None, {}
+    stats, best_name, worst_name, nemesis_name, fav_name = row
+    return stats, {'best_teammate': best_name or '', 'worst_teammate': worst_name or '',
+                   'nemesis': nemesis_name or '', 'fav_opponent': fav_name or ''}
+
+
+def func_get_player_game_totals(player_id):
+    """(games, wins) of a player over the games with a result, counted in one aggregate query."""
+    total, wins = db.session.query(
+        func.count(),
+        func.coalesce(func.sum(case((GameParticipation.gpt_result == 1, 1), else_=0)), 0),
+    ).filter(
+        GameParticipation.gpt_pl_id == player_id,
+        GameParticipation.gpt_result != None,
+    ).one()
+    return total, wins
+
+
+def _player_history_query(player_id, before=None):
+    """Games with a result of a player, newest first in GAME_HISTORY_KEY order, with court and event.
+    before is the (date, start time, game id) key of the last game already shown, None for a missing date or time."""
+    query = db.session.query(
+        GameParticipation.gpt_date, GameParticipation.gpt_timeStart, GameParticipation.gpt_side, GameParticipation.gpt_result,
+        Game.gm_id, Game.gm_timeEnd, Game.gm_idEvent,
+        Game.gm_idPlayer_A1, Game.gm_idPlayer_A2, Game.gm_idPlayer_B1, Game.gm_idPlayer_B2,
+        Game.gm_result_A, Game.gm_result_B,
+        Court.ct_name, Event.ev_title,
+    ).join(
+        Game, Game.gm_id == GameParticipation.gpt_gm_id
+    ).outerjoin(
+        Court, Court.ct_id == Game.gm_court
+    ).outerjoin(
+        Event, Event.ev_id == Game.gm_idEvent
+    ).filter(
+        GameParticipation.gpt_pl_id == player_id,
+        GameParticipation.gpt_result != None,
+    )
+    if before is not None:
+        before = [literal_column("''") if value is None else value for value in before]
+        # The bound on the date alone lets SQLite seek the index; the row value comparison alone is only filtered
+        query = query.filter(GAME_HISTORY_KEY[0] <= before[0], tuple_(*GAME_HISTORY_KEY) < tuple_(*before))
+    return query.order_by(*(key.desc() for key in GAME_HISTORY_KEY))
+
+
+def func_parse_history_cursor(cursor):
+    """(date, start time, game id) key of a game history cursor; raises ValueError when malformed."""
+    day, start, game_id = cursor.split('_')
+    return date.fromisoformat(day) if day else None, time.fromisoformat(start) if start else None, int(game_id)
+
+
+def _history_cursor(row):
+    return f"{row.gpt_date.isoformat() if row.gpt_date else ''}_{row.gpt_timeStart.isoformat() if row.gpt_timeStart else ''}_{row.gm_id}"
+
+
+def func_get_player_game_history(player_id, before=None, per_page=30):
+    """One page of a player's game history as display dicts, and the cursor of the next page (None on the last one).
+    The page comes from one keyset query and the player names from one batched query, whatever the size of the history."""
+    rows = _player_history_query(player_id, before).limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = _history_cursor(rows[-1])
+
+    player_ids = {pid for row in rows for pid in (row.gm_idPlayer_A1, row.gm_idPlayer_A2, row.gm_idPlayer_B1, row.gm_idPlayer_B2) if pid}
+    names = dict(db.session.query(Users.us_id, Users.us_name).filter(Users.us_id.in_(player_ids)).all()) if player_ids else {}
+
+    def team(*ids):
+        return [{'id': pid if pid in names else None, 'name': names.get(pid, '?')} for pid in ids]
+
+    games = []
+    for row in rows:
+        on_team_a = row.gpt_side == 'A'
+        games.append({
+            'date': row.gpt_date,
+            'time_start': row.gpt_timeStart,
+            'time_end': row.gm_timeEnd,
+            'event_id': row.gm_idEvent,
+            'event_slug': f"{slugify(row.ev_title)}-{row.gm_idEvent}" if row.ev_title is not None else None,
+            'court': row.ct_name,
+            'won': row.gpt_result == 1,
+            'draw': row.gpt_result == 0,
+            'team_a': {
+                'players': team(row.gm_idPlayer_A1, row.gm_idPlayer_A2),
+                'score': row.gm_result_A,
+                'is_mine': on_team_a,
+            },
+            'team_b': {
+                'players': team(row.gm_idPlayer_B1, row.gm_idPlayer_B2),
+                'score': row.gm_result_B,
+                'is_mine': not on_team_a,
+            },
+        })
+    return games, next_cursor
+
+
+def func_players_classification_totals(*game_filters):
+    """Per-player totals over the games matching game_filters, computed in one grouped query.
+    The four gm_idPlayer_* slots are unpivoted into (player, games favor, games against) rows
+    and aggregated with the same rules as the classification: 3 points for a win, 1 for a
+    draw (0-0 included), SUM() ignoring games without result and every game counting in GAMES.
+    PLAYED counts the games where any team scored. Returns {player_id: row}."""
+    slots = union_all(*[
+        db.session.query(
+            player_col.label('PLAYERID'),
+            favor_col.label('FAVOR'),
+            against_col.label('AGAINST'),
+        ).filter(*game_filters)
+        for player_col, favor_col, against_col in (
+            (Game.gm_idPlayer_A1, Game.gm_result_A, Game.gm_result_B),
+            (Game.gm_idPlayer_A2, Game.gm_result_A, Game.gm_result_B),
+            (Game.gm_idPlayer_B1, Game.gm_result_B, Game.gm_result_A),
+            (Game.gm_idPlayer_B2, Game.gm_result_B, Game.gm_result_A),
+        )
+    ]).subquery("SLOTS")
+
+    query = (
+        db.session.query(
+            slots.c.PLAYERID,
+            func.sum(case(
+                (slots.c.FAVOR > slots.c.AGAINST, literal_column("3")),
+                (slots.c.FAVOR == slots.c.AGAINST, literal_column("1")),
+                (slots.c.FAVOR < slots.c.AGAINST, literal_column("0")),
+                else_=None
+            )).label("POINTS"),
+            func.sum(case((slots.c.FAVOR > slots.c.AGAINST, literal_column("1")), else_=literal_column("0"))).label("WINS"),
+            func.sum(case((slots.c.FAVOR < slots.c.AGAINST, literal_column("1")), else_=literal_column("0"))).label("LOSSES"),
+            func.sum(slots.c.FAVOR).label("GAMESFAVOR"),
+            func.sum(slots.c.AGAINST).label("GAMESAGAINST"),
+            func.count().label("GAMES"),
+            func.sum(case((or_(slots.c.FAVOR > 0, slots.c.AGAINST > 0), literal_column("1")), else_=literal_column("0"))).label("PLAYED"),
+        )
+        .filter(slots.c.PLAYERID != None)
+        .group_by(slots.c.PLAYERID)
+    )
+    return {row.PLAYERID: row for row in query.all()}
+
+
+def func_classification_values(totals, presence_points, player_birthday):
+    """Classification values of one player from a func_players_classification_totals row.
+    RANKING = (POINTS + presence) * 100000 + WINS * 10000 + GAMES * 1000 + GAMESDIFFERENCE * 100 + age / 100.
+    Players without any scored game get zeros and only the age part of the ranking."""
+    player_age = func_calculate_player_age(player_birthday) if player_birthday else 0
+    if totals is None or not totals.PLAYED:
+        return {'points': 0, 'wins': 0, 'losses': 0, 'gamesFavor': 0, 'gamesAgainst': 0, 'gamesDiff': 0, 'ranking': 0 + (player_age / 100)}
+
+    points = totals.POINTS + presence_points if totals.POINTS is not None else None
+    games_diff = totals.GAMESFAVOR - totals.GAMESAGAINST if totals.GAMESFAVOR is not None and totals.GAMESAGAINST is not None else None
+    ranking = None
+    if points is not None and games_diff is not None:
+        ranking = (points * 100000) + (totals.WINS * 10000) + (totals.GAMES * 1000) + (games_diff * 100) + (player_age / 100)
+    return {
+        'points': points or 0,
+        'wins': totals.WINS or 0,
+        'losses': totals.LOSSES or 0,
+        'gamesFavor': totals.GAMESFAVOR or 0,
+        'gamesAgainst': totals.GAMESAGAINST or 0,
+        'gamesDiff': games_diff or 0,
+        'ranking': ranking or 0,
+    }
+
+
+def func_calculateLeagueClassification(leagueID):
+    # Replace the league classification in one transaction, from one grouped query over the league games
+    try:
+        league = League.query.filter_by(lg_id=leagueID).first()
+        presence_points = league.lg_presence_points if league else 0
+
+        players_data = (
+            db.session.query(Users.us_id, Users.us_birthday)
+            .filter(Users.us_id.in_(db.session.query(GameDayPlayer.gp_idPlayer).filter(GameDayPlayer.gp_idLeague == leagueID)))
+            .order_by(Users.us_id)
+            .all()
+        )
+        totals = func_players_classification_totals(Game.gm_idLeague == leagueID)
+
+        classifications = []
+        for id_player, player_birthday in players_data:
+            values = func_classification_values(totals.get(id_player), presence_points, player_birthday)
+            classifications.append({
+                'lc_idLeague': leagueID,
+                'lc_idPlayer': id_player,
+                'lc_points': values['points'],
+                'lc_wins': values['wins'],
+                'lc_losses': values['losses'],
+                'lc_gamesFavor': values['gamesFavor'],
+                'lc_gamesAgainst': values['gamesAgainst'],
+                'lc_gamesDiff': values['gamesDiff'],
+                'lc_ranking': values['ranking'],
+            })
+
+        LeagueClassification.query.filter_by(lc_idLeague=leagueID).delete()
+        if classifications:
+            db.session.execute(LeagueClassification.__table__.insert(), classifications)
 
         # Commit the changes to the database
         db.session.commit()
 
     except Exception as e:
         print(f"Error: {e}")
-        # Handle the error, maybe log it or display a message to the user
+        db.session.rollback()
 
 def func_calculateGameDayClassification(gameDayID):
-    #print("Enter GameDayClassification")
-    # clear the league classification
+    # Standings and winners of the gameday from one grouped query over its games, written once at the end
     gameDay = GameDay.query.filter_by(gd_id=gameDayID).first()
     leagueID = gameDay.gd_idLeague
     league = League.query.filter_by(lg_id=leagueID).first()
     presence_points = league.lg_presence_points if league else 0
     try:
-        GameDayClassification.query.filter_by(gc_idGameDay=gameDayID).delete()
-        db.session.commit()
+        players_data = (
+            db.session.query(Users.us_id, Users.us_birthday)
+            .filter(Users.us_id.in_(db.session.query(GameDayPlayer.gp_idPlayer).filter(GameDayPlayer.gp_idGameDay == gameDayID)))
+            .order_by(Users.us_id)
+            .all()
+        )
+        totals = func_players_classification_totals(Game.gm_idGameDay == gameDayID)
+
+        classifications = []
+        for id_player, player_birthday in players_data:
+            values = func_classification_values(totals.get(id_player), presence_points, player_birthday)
+            classifications.append({
+                'gc_idLeague': leagueID,
+                'gc_idGameDay': gameDayID,
+                'gc_idPlayer': id_player,
+                'gc_points': values['points'],
+                'gc_wins': values['wins'],
+                'gc_losses': values['losses'],
+                'gc_gamesFavor': values['gamesFavor'],
+                'gc_gamesAgainst': values['gamesAgainst'],
+                'gc_gamesDiff': values['gamesDiff'],
+                'gc_ranking': values['ranking'],
+            })
 
-        players_query = Users.query.filter(Users.us_id.in_(db.session.query(GameDayPlayer.gp_idPlayer).filter(GameDayPlayer.gp_idGameDay == gameDayID).group_by(GameDayPlayer.gp_idPlayer)))
-        players_data = players_query.all()
-
-
-        for player in players_data:
-            #print(player)
-            id_player = player.us_id
-            player_name = player.us_name
-            player_birthday = player.us_birthday
-            player_age = func_calculate_player_age(player_birthday)
-
-            games_info_query = Game.query.filter(Game.gm_idGameDay == gameDayID, ((Game.gm_idPlayer_A1 == id_player) | (Game.gm_idPlayer_A2 == id_player) | (Game.gm_idPlayer_B1 == id_player) | (Game.gm_idPlayer_B2 == id_player)), ((Game.gm_result_A > 0) | (Game.gm_result_B > 0)))
-            games_info = games_info_query.first()
-
-            if games_info:
-                subquery = (
-                    db.session.query(
-                        case(
-                            (and_(Game.gm_idPlayer_A1 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("3")),
-                            (and_(Game.gm_idPlayer_A2 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("3")),
-                            (and_(Game.gm_idPlayer_A1 == id_player, Game.gm_result_A == Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_A2 == id_player, Game.gm_result_A == Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_A1 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_A2 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_B1 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_B2 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_B1 == id_player, Game.gm_result_A == Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_B2 == id_player, Game.gm_result_A == Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_B1 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("3")),
-                            (and_(Game.gm_idPlayer_B2 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("3")),
-                            else_=None
-                        ).label("POINTS"),
-                        case(
-                            (and_(Game.gm_idPlayer_A1 == id_player), Game.gm_result_A),
-                            (and_(Game.gm_idPlayer_A2 == id_player), Game.gm_result_A),
-                            (and_(Game.gm_idPlayer_B1 == id_player), Game.gm_result_B),
-                            (and_(Game.gm_idPlayer_B2 == id_player), Game.gm_result_B),
-                            else_=None
-                        ).label("GAMESFAVOR"),
-                        case(
-                            (and_(Game.gm_idPlayer_A1 == id_player), Game.gm_result_B),
-                            (and_(Game.gm_idPlayer_A2 == id_player), Game.gm_result_B),
-                            (and_(Game.gm_idPlayer_B1 == id_player), Game.gm_result_A),
-                            (and_(Game.gm_idPlayer_B2 == id_player), Game.gm_result_A),
-                            else_=None
-                        ).label("GAMESAGAINST"),
-                        literal_column("1").label("GAMES"),
-                        case(
-                            (and_(Game.gm_idPlayer_A1 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_A2 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_A1 == id_player, Game.gm_result_A == Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_A2 == id_player, Game.gm_result_A == Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_A1 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_A2 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_B1 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_B2 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_B1 == id_player, Game.gm_result_A == Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_B2 == id_player, Game.gm_result_A == Game.gm_result_B), literal_column("0")),
-                            (and_(Game.gm_idPlayer_B1 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_B2 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("1")),
-                            else_=None
-                        ).label("WINS"),
-                        case(
-                            (and_(Game.gm_idPlayer_A1 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_A2 == id_player, Game.gm_result_A < Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_B1 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("1")),
-                            (and_(Game.gm_idPlayer_B2 == id_player, Game.gm_result_A > Game.gm_result_B), literal_column("1")),
-                            else_=literal_column("0")
-                        ).label("LOSSES")
-                    )
-                    .filter(Game.gm_idGameDay == gameDayID, (Game.gm_idPlayer_A1 == id_player) | (Game.gm_idPlayer_A2 == id_player) | (Game.gm_idPlayer_B1 == id_player) | (Game.gm_idPlayer_B2 == id_player))
-                    .subquery("TOTALS")
-                )
-                
-                query = (
-                    db.session.query(
-                        literal_column(str(leagueID)).label("LEAGUEID"),
-                        literal_column(str(gameDayID)).label("GAMEDAYID"),
-                        literal_column(str(id_player)).label("PLAYERID"),
-                        literal_column(f"'{player_name}'").label("PLAYERNAME"), 
-                        (func.sum(subquery.c.POINTS)+(presence_points)).label("POINTS"),
-                        func.sum(subquery.c.WINS).label("WINS"),
-                        func.sum(subquery.c.LOSSES).label("LOSSES"),
-                        func.sum(subquery.c.GAMESFAVOR).label("GAMESFAVOR"),
-                        func.sum(subquery.c.GAMESAGAINST).label("GAMESAGAINST"),
-                        (func.sum(subquery.c.GAMESFAVOR) - func.sum(subquery.c.GAMESAGAINST)).label("GAMESDIFFERENCE"),
-                        (
-                            ((func.sum(subquery.c.POINTS) + presence_points) * 100000) +
-                            (func.sum(subquery.c.WINS) *10000) +
-                            (func.sum(subquery.c.GAMES) *1000) +
-                            ((func.sum(subquery.c.GAMESFAVOR)- func.sum(subquery.c.GAMESAGAINST))*100) +
-                            # ((func.sum(subquery.c.WINS) / func.sum(subquery.c.GAMES)) * 10000) +
-                            # ((func.sum(subquery.c.GAMESFAVOR) / (func.sum(subquery.c.GAMESFAVOR) + func.sum(subquery.c.GAMESAGAINST))) * 100) +
-                            (player_age / 100)
-                        ).label("RANKING")
-                    )
-                    .select_from(subquery)
-                    .group_by("GAMEDAYID", "PLAYERID", "PLAYERNAME")
-                )
-                #print(f"query: {query}")
-                result = query.all()
-                #print(f"result: {result}")
-
-                for r2 in result:
-                    #print(r2)
-                    # Write Classification
-                    classification = GameDayClassification(
-                        gc_idLeague=leagueID,
-                        gc_idGameDay=gameDayID,
-                        gc_idPlayer=r2.PLAYERID,
-                        # gc_namePlayer=r2.PLAYERNAME,
-                        gc_points=r2.POINTS or 0,
-                        gc_wins=r2.WINS or 0,
-                        gc_losses=r2.LOSSES or 0,
-                        gc_gamesFavor=r2.GAMESFAVOR or 0,
-                        gc_gamesAgainst=r2.GAMESAGAINST or 0,
-                        gc_gamesDiff=r2.GAMESDIFFERENCE or 0,
-                        gc_ranking=r2.RANKING or 0,
-                    )
-                    db.session.add(classification)
-
-                # Commit the changes to the database
-                db.session.commit()
+        # The two best ranked players win the gameday; winner1 is the one with the lower id
+        winners = sorted(classifications, key=lambda c: -c['gc_ranking'])[:2]
+        winner_ids = sorted(c['gc_idPlayer'] for c in winners)
+        func_invalidate_player_stats([gameDay.gd_idWinner1, gameDay.gd_idWinner2] + winner_ids)
+        gameDay.gd_idWinner1 = winner_ids[0] if winner_ids else None
+        gameDay.gd_idWinner2 = winner_ids[-1] if winner_ids else None
 
-            else:
-                # Calculation for players without games
-                # Write Classification
-                classification = GameDayClassification(
-                    gc_idLeague=leagueID,
-                    gc_idGameDay=gameDayID,
-                    gc_idPlayer=id_player,
-                    # gc_namePlayer=player_name,
-                    gc_points=0,
-                    gc_wins=0,
-                    gc_losses=0,
-                    gc_gamesFavor=0,
-                    gc_gamesAgainst=0,
-                    gc_gamesDiff=0,
-                    gc_ranking=0+(player_age/100),
-                )
-                db.session.add(classification)
-                db.session.commit()
+        GameDayClassification.query.filter_by(gc_idGameDay=gameDayID).delete()
+        if classifications:
+            db.session.execute(GameDayClassification.__table__.insert(), classifications)
 
         # Commit the changes to the database
         db.session.commit()
 
     except Exception as e:
         print(f"Error: {e}")
-        # Handle the error, maybe log it or display a message to the user
-
-    #print("Reached Finally")
-    # Finally we need to update the winners
-    winners_query = (
-        db.session.query(
-            GameDayClassification.gc_idPlayer.label('idPlayer'),
-            Users.us_name.label('namePlayer')
-        )
-        .join(Users, GameDayClassification.gc_idPlayer == Users.us_id)
-        .filter(GameDayClassification.gc_idLeague == leagueID)
-        .filter(GameDayClassification.gc_idGameDay == gameDayID)
-        .order_by(GameDayClassification.gc_ranking.desc())
-        .limit(2)
-        .subquery()
-    )
-
-    # Fetch the first winner
-    winner1 = (
-        db.session.query(winners_query.c.idPlayer, winners_query.c.namePlayer)
-        .order_by(winners_query.c.idPlayer.asc())
-        .first()
-    )
-
-    # Fetch the second winner
-    winner2 = (
-        db.session.query(winners_query.c.idPlayer, winners_query.c.namePlayer)
-        .order_by(winners_query.c.idPlayer.desc())
-        .first()
-    )
-
-    # Update winners to tb_gameday
-    gameday_update_query = (
-        db.session.query(GameDay)
-        .filter(GameDay.gd_idLeague == leagueID)
-        .filter(GameDay.gd_id == gameDayID)
-        .update(
-            {
-                GameDay.gd_idWinner1: winner1.idPlayer,
-                GameDay.gd_idWinner2: winner2.idPlayer,
-            }
-        )
-    )
-
-    # Commit the changes
-    db.session.commit()
-    #print("Ended Finally")
+        db.session.rollback()
 
+@ELO_RECALCULATION.time('partial')
 def func_calculate_ELO_parcial():
     # Check if tb_ELO_ranking has any entries
     try:
@@ -579,20 +763,29 @@ def func_calculate_ELO_parcial():
                     # Close the session
                     db.session.close()
 
+        # The ELO history of every player of those games changed
+        if r1:
+            func_invalidate_player_stats({pid for d1 in r1 for pid in d1[1:5]})
+            db.session.commit()
+
     except Exception as e:
         print("Error99:", e)
 
     #print("Print from end of ELO calc")
 
 
-def func_calculate_ELO_by_club(club_id):
-    """Calculate ELO rankings for all players at a specific club, computed from
-    scratch in chronological order. Each player starts at 1000 when first seen.
-    K = ev_max_players * 2.5 per game (consistent with lg_eloK convention).
-    Returns a list of dicts sorted by rankingNow desc."""
-    games = (
-        db.session.query(Game)
+def _club_ELO_games_query(club_id):
+    """Rated games at a club as plain tuples: every scored game with four players
+    from an event that is not excluded from ELO."""
+    return (
+        db.session.query(
+            Game.gm_id, Game.gm_date, Game.gm_timeStart,
+            Game.gm_idPlayer_A1, Game.gm_idPlayer_A2, Game.gm_idPlayer_B1, Game.gm_idPlayer_B2,
+            Game.gm_result_A, Game.gm_result_B,
+            League.lg_eloK, Event.ev_max_players,
+        )
         .join(Event, Game.gm_idEvent == Event.ev_id)
+        .outerjoin(League, Game.gm_idLeague == League.lg_id)
         .filter(
             Event.ev_club_id == club_id,
             Event.ev_exclude_from_elo != True,
@@ -603,76 +796,181 @@ def func_calculate_ELO_by_club(club_id):
             Game.gm_idPlayer_B1 != None,
             Game.gm_idPlayer_B2 != None,
         )
-        .order_by(Game.gm_date.asc(), Game.gm_timeStart.asc())
-        .all()
     )
 
-    elo = {}  # player_id -> {'rankingNow', 'wins', 'losses', 'totalGames'}
 
-    def ensure(pid):
+def _apply_club_ELO_game(elo, game):
+    """Apply one game tuple from _club_ELO_games_query to the in-memory ratings.
+    elo maps player_id -> [rankingNow, wins, losses, totalGames, last_gm_id]; unseen players start at 1000.
+    K = lg_eloK when set, otherwise ev_max_players * 2.5 (consistent with lg_eloK convention)."""
+    gm_id, _, _, A1, A2, B1, B2, score_A, score_B, league_k, max_players = game
+    for pid in (A1, A2, B1, B2):
         if pid not in elo:
-            elo[pid] = {'rankingNow': 1000.0, 'wins': 0, 'losses': 0, 'totalGames': 0}
-
-    for game in games:
-        A1, A2, B1, B2 = (
-            game.gm_idPlayer_A1,
-            game.gm_idPlayer_A2,
-            game.gm_idPlayer_B1,
-            game.gm_idPlayer_B2,
-        )
-        for pid in (A1, A2, B1, B2):
-            ensure(pid)
-
-        rA1, rA2 = elo[A1]['rankingNow'], elo[A2]['rankingNow']
-        rB1, rB2 = elo[B1]['rankingNow'], elo[B2]['rankingNow']
-        team_A_avg = (rA1 + rA2) / 2.0
-        team_B_avg = (rB1 + rB2) / 2.0
-
-        score_A, score_B = game.gm_result_A, game.gm_result_B
-        if score_A == 0 and score_B == 0:
-            continue  # Skip 0-0 games
-
-        # Use the league's eloK when explicitly set; fall back to ev_max_players * 2.5
-        # for new-format games stored under the generic "Event System" league (eloK=None).
-        league_k = game.league.lg_eloK if game.league and game.league.lg_eloK else None
-        K = league_k if league_k else (game.event.ev_max_players or 16) * 2.5
-
-        if score_A > score_B:
-            outcome_A, outcome_B = 1, 0
-        elif score_B > score_A:
-            outcome_A, outcome_B = 0, 1
+            elo[pid] = [1000.0, 0, 0, 0, None]
+
+    if score_A == 0 and score_B == 0:
+        return  # Skip 0-0 games
+
+    rA1, rA2 = elo[A1][0], elo[A2][0]
+    rB1, rB2 = elo[B1][0], elo[B2][0]
+    team_A_avg = (rA1 + rA2) / 2.0
+    team_B_avg = (rB1 + rB2) / 2.0
+
+    # Use the league's eloK when explicitly set; fall back to ev_max_players * 2.5
+    # for new-format games stored under the generic "Event System" league (eloK=None).
+    K = league_k if league_k else (max_players or 16) * 2.5
+
+    if score_A > score_B:
+        outcome_A, outcome_B = 1, 0
+    elif score_B > score_A:
+        outcome_A, outcome_B = 0, 1
+    else:
+        outcome_A, outcome_B = 0.5, 0.5
+
+    for pid, r, opp_avg, outcome in (
+        (A1, rA1, team_B_avg, outcome_A),
+        (A2, rA2, team_B_avg, outcome_A),
+        (B1, rB1, team_A_avg, outcome_B),
+        (B2, rB2, team_A_avg, outcome_B),
+    ):
+        E = 1.0 / (1.0 + 10.0 ** ((opp_avg - r) / 400.0))
+        stats = elo[pid]
+        stats[0] += K * (outcome - E)
+        stats[3] += 1
+        if outcome == 1:
+            stats[1] += 1
+        elif outcome == 0:
+            stats[2] += 1
+        stats[4] = gm_id
+
+
+@ELO_RECALCULATION.time('club')
+def func_update_club_ELO(club_id, force_rebuild=False):
+    """Bring the materialized ELO ranking of a club (tb_club_ELO_ranking) up to date.
+    Only games scored after the club's watermark are applied. The ranking is replayed
+    from scratch when forced, when the club was invalidated (a past game was edited or an
+    event's ev_exclude_from_elo was toggled) or when rated games appeared/disappeared
+    behind the watermark."""
+    state = db.session.get(ClubELOstate, club_id)
+    games_query = _club_ELO_games_query(club_id)
+    rebuild = force_rebuild or state is None or state.cs_needs_rebuild
+
+    if not rebuild:
+        new_games = []
+        if state.cs_last_gm_id is not None:
+            new_games = games_query.filter(or_(
+                Game.gm_date > state.cs_last_date,
+                and_(Game.gm_date == state.cs_last_date, Game.gm_timeStart > state.cs_last_time),
+                and_(Game.gm_date == state.cs_last_date, Game.gm_timeStart == state.cs_last_time, Game.gm_id > state.cs_last_gm_id),
+            ))
         else:
-            outcome_A, outcome_B = 0.5, 0.5
-
-        for pid, r, opp_avg, outcome in (
-            (A1, rA1, team_B_avg, outcome_A),
-            (A2, rA2, team_B_avg, outcome_A),
-            (B1, rB1, team_A_avg, outcome_B),
-            (B2, rB2, team_A_avg, outcome_B),
-        ):
-            E = 1.0 / (1.0 + 10.0 ** ((opp_avg - r) / 400.0))
-            delta = K * (outcome - E)
-            elo[pid]['rankingNow'] += delta
-            elo[pid]['totalGames'] += 1
-            if outcome == 1:
-                elo[pid]['wins'] += 1
-            elif outcome == 0:
-                elo[pid]['losses'] += 1
-
-    result = []
-    for player_id, stats in elo.items():
-        player = Users.query.get(player_id)
-        if player and player.us_is_player == 1 and player.us_is_active == 1 and not player.us_hide_from_elo:
-            result.append({
-                'player': player,
-                'rankingNow': stats['rankingNow'],
-                'wins': stats['wins'],
-                'losses': stats['losses'],
-                'totalGames': stats['totalGames'],
-            })
+            new_games = games_query
+        new_games = new_games.order_by(Game.gm_date.asc(), Game.gm_timeStart.asc(), Game.gm_id.asc()).all()
+        total_games = games_query.count()
+        if total_games != state.cs_games_applied + len(new_games):
+            rebuild = True
+        elif not new_games:
+            return
 
-    result.sort(key=lambda x: x['rankingNow'], reverse=True)
-    return result
+    try:
+        if rebuild:
+            games = games_query.order_by(Game.gm_date.asc(), Game.gm_timeStart.asc(), Game.gm_id.asc()).all()
+            elo = {}
+        else:
+            games = new_games
+            player_ids = {pid for game in games for pid in game[3:7]}
+            rows = ClubELOranking.query.filter(
+                ClubELOranking.ce_club_id == club_id,
+                ClubELOranking.ce_pl_id.in_(player_ids)
+            ).all()
+            elo = {row.ce_pl_id: [row.ce_rankingNow, row.ce_wins, row.ce_losses, row.ce_totalGames, row.ce_last_gm_id] for row in rows}
+
+        for game in games:
+            _apply_club_ELO_game(elo, game)
+
+        values = [
+            {
+                'ce_club_id': club_id,
+                'ce_pl_id': pid,
+                'ce_rankingNow': stats[0],
+                'ce_wins': stats[1],
+                'ce_losses': stats[2],
+                'ce_totalGames': stats[3],
+                'ce_last_gm_id': stats[4],
+            }
+            for pid, stats in elo.items()
+        ]
+        if rebuild:
+            ClubELOranking.query.filter_by(ce_club_id=club_id).delete()
+        else:
+            ClubELOranking.query.filter(
+                ClubELOranking.ce_club_id == club_id,
+                ClubELOranking.ce_pl_id.in_(list(elo.keys()))
+            ).delete(synchronize_session=False)
+        if values:
+            db.session.execute(ClubELOranking.__table__.insert(), values)
+
+        if state is None:
+            state = ClubELOstate(cs_club_id=club_id, cs_games_applied=0)
+            db.session.add(state)
+        if rebuild:
+            state.cs_games_applied = 0
+            state.cs_last_gm_id = state.cs_last_date = state.cs_last_time = None
+        if games:
+            last_game = games[-1]
+            state.cs_last_gm_id, state.cs_last_date, state.cs_last_time = last_game[0], last_game[1], last_game[2]
+        state.cs_games_applied += len(games)
+        state.cs_needs_rebuild = False
+        # Standings of Mexicano events with Ranking pairing break ties by club ELO (see _event_standings);
+        # those of ended events are final, so their cached standings and TV fragments are kept
+        bump_events(db.session, [ev_id for (ev_id,) in db.session.query(Event.ev_id).join(EventType).filter(
+            Event.ev_club_id == club_id, EventType.et_name == 'Mexicano', Event.ev_pairing_type == 'Ranking',
+            Event.ev_status != 'event_ended')])
+        db.session.commit()
+
+    except Exception as e:
+        print(f"Error: {e}")
+        db.session.rollback()
+
+
+def func_invalidate_club_ELO(club_id):
+    """Flag a club's materialized ELO ranking for a full replay on next use.
+    Call it when an already-scored game is edited or removed, or when the set of rated
+    games changes retroactively. The caller commits."""
+    if club_id:
+        ClubELOstate.query.filter_by(cs_club_id=club_id).update({ClubELOstate.cs_needs_rebuild: True})
+
+
+def func_calculate_ELO_by_club(club_id):
+    """ELO rankings for all players at a specific club, read from tb_club_ELO_ranking.
+    The ranking is (re)built first if the club has never been rated or was invalidated.
+    Returns a list of dicts sorted by rankingNow desc."""
+    state = db.session.get(ClubELOstate, club_id)
+    if state is None or state.cs_needs_rebuild:
+        func_update_club_ELO(club_id)
+
+    rows = (
+        db.session.query(ClubELOranking, Users)
+        .join(Users, ClubELOranking.ce_pl_id == Users.us_id)
+        .filter(
+            ClubELOranking.ce_club_id == club_id,
+            Users.us_is_player == True,
+            Users.us_is_active == True,
+            Users.us_hide_from_elo != True,
+        )
+        .order_by(ClubELOranking.ce_rankingNow.desc())
+        .all()
+    )
+    return [
+        {
+            'player': player,
+            'rankingNow': ranking.ce_rankingNow,
+            'wins': ranking.ce_wins,
+            'losses': ranking.ce_losses,
+            'totalGames': ranking.ce_totalGames,
+        }
+        for ranking, player in rows
+    ]
 
 
 def func_create_gameday_games(league_id, gameday_id):
@@ -1492,245 +1790,129 @@ def func_create_league_gamedays(league_id, league_name, start_date, num_days):
         func_create_gameday_games_full(league_id, new_gameday_id)
         current_date += timedelta(days=7)  # Next week
 
+@ELO_RECALCULATION.time('full')
 def func_calculate_ELO_full():
-    #print("Print from beggining of ELO calc")
-    # Delete all rows from tb_ELO_ranking
-    try:
-        db.session.execute(
-            text(f"DELETE FROM tb_ELO_ranking")
-        )
-        db.session.commit()             
-    except Exception as e:
-        print("Error1:", e)
+    """Rebuild tb_ELO_ranking and tb_ELO_ranking_hist from scratch.
+    Games of leagues with K > 0 are streamed as plain tuples in chronological order and
+    every rating is kept in memory, so the whole replay is a single pass. Ranking and
+    history rows are then written with bulk inserts inside a single transaction.
+    Returns a small report with row counts, total time and rows per second."""
+    started = perf_counter()
+
+    # Every player starts with 1000 points and 0 games
+    player_ids = [row[0] for row in db.session.query(Users.us_id).filter(Users.us_is_player == True)]
+    # player_id -> [rankingNow, wins, losses, totalGames]
+    elo = {pid: [1000.0, 0, 0, 0] for pid in player_ids}
+    history = []
+    nbr_games = 0
 
-    # Delete all rows from tb_ELO_ranking_hist
-    try:
-        db.session.execute(
-            text(f"DELETE FROM tb_ELO_ranking_hist")
+    games = (
+        db.session.query(
+            Game.gm_id, Game.gm_date, Game.gm_timeStart,
+            Game.gm_idPlayer_A1, Game.gm_idPlayer_A2, Game.gm_idPlayer_B1, Game.gm_idPlayer_B2,
+            Game.gm_result_A, Game.gm_result_B, League.lg_eloK,
         )
-        db.session.commit()
-    except Exception as e:
-        print("Error1:", e)
-
-    # Write every player with 1000 points and 0 games
-    try:
-        # Get all users who are players from Users model
-        users = Users.query.filter_by(us_is_player=True).all()
-
-        for user in users:
-            # Create new ELO ranking entry for each player with default values
-            new_elo = ELOranking(
-                pl_id=user.us_id,
-                pl_rankingNow=1000,  # Default ELO rating
-                pl_totalRankingOpo=0,
-                pl_wins=0,
-                pl_losses=0,
-                pl_totalGames=0
-            )
-            db.session.add(new_elo)
-
-        # Commit the transaction
-        db.session.commit()
-    except Exception as e:
-        print("Error2:", e)
-        db.session.rollback()
-
-    # Select every game if league has K higher than 0
-    try:
-        # Query games using SQLAlchemy ORM
-        games = db.session.query(Game).join(
-            League, Game.gm_idLeague == League.lg_id
-        ).filter(
+        .join(League, Game.gm_idLeague == League.lg_id)
+        .filter(
             League.lg_eloK > 0,
             League.lg_startDate >= datetime(2020, 1, 1),
-            Game.gm_idPlayer_A1.isnot(None)
-        ).order_by(
-            Game.gm_date.asc(), 
-            Game.gm_timeStart.asc()
-        ).all()
-        
-        for game in games:
-            # Get current ranking for A1
-            A1_ID = game.gm_idPlayer_A1
-            A1_elo = ELOranking.query.get(A1_ID)
-            A1_ranking = A1_elo.pl_rankingNow if A1_elo else 1000
-            
-            # Get current ranking for A2
-            A2_ID = game.gm_idPlayer_A2
-            A2_elo = ELOranking.query.get(A2_ID)
-            A2_ranking = A2_elo.pl_rankingNow if A2_elo else 1000
-            
-            # Get current ranking for B1
-            B1_ID = game.gm_idPlayer_B1
-            B1_elo = ELOranking.query.get(B1_ID)
-            B1_ranking = B1_elo.pl_rankingNow if B1_elo else 1000
-            
-            # Get current ranking for B2
-            B2_ID = game.gm_idPlayer_B2
-            B2_elo = ELOranking.query.get(B2_ID)
-            B2_ranking = B2_elo.pl_rankingNow if B2_elo else 1000
+            Game.gm_idPlayer_A1.isnot(None),
+            Game.gm_result_A.isnot(None),
+            Game.gm_result_B.isnot(None),
+        )
+        .order_by(Game.gm_date.asc(), Game.gm_timeStart.asc())
+        .yield_per(1000)
+    )
+
+    try:
+        for gm_id, gm_date, gm_time, A1, A2, B1, B2, result_A, result_B, ELO_K in games:
+            nbr_games += 1
+            # Players without an ELO entry (non-players) are rated at 1000 but never updated
+            A1_ranking = elo[A1][0] if A1 in elo else 1000
+            A2_ranking = elo[A2][0] if A2 in elo else 1000
+            B1_ranking = elo[B1][0] if B1 in elo else 1000
+            B2_ranking = elo[B2][0] if B2 in elo else 1000
 
             # Calculate current ELO from teamA and teamB
             ranking_TeamA = (A1_ranking + A2_ranking) / 2
             ranking_TeamB = (B1_ranking + B2_ranking) / 2
 
-            # Get league K factor
-            league = League.query.get(game.gm_idLeague)
-            ELO_K = league.lg_eloK
-
-            # Calculate new ratings
-            if game.gm_result_A > game.gm_result_B:
-                # Update ratings for team A
-                # Calculate rating changes for A1
-                delta_A1 = ELO_K * (1 - (1 / (1 + 10 ** ((ranking_TeamB - A1_ranking) / 400))))
-                if A1_elo:
-                    A1_elo.pl_rankingNow += delta_A1
-                    A1_elo.pl_wins += 1
-                    A1_elo.pl_totalGames += 1
-                
-                # Calculate rating changes for A2
-                delta_A2 = ELO_K * (1 - (1 / (1 + 10 ** ((ranking_TeamB - A2_ranking) / 400))))
-                if A2_elo:
-                    A2_elo.pl_rankingNow += delta_A2
-                    A2_elo.pl_wins += 1
-                    A2_elo.pl_totalGames += 1
-                
-                # Update ratings for team B
-                # Calculate rating changes for B1
-                delta_B1 = ELO_K * (0 - (1 / (1 + 10 ** ((ranking_TeamA - B1_ranking) / 400))))
-                if B1_elo:
-                    B1_elo.pl_rankingNow += delta_B1
-                    B1_elo.pl_losses += 1
-                    B1_elo.pl_totalGames += 1
-                
-                # Calculate rating changes for B2
-                delta_B2 = ELO_K * (0 - (1 / (1 + 10 ** ((ranking_TeamA - B2_ranking) / 400))))
-                if B2_elo:
-                    B2_elo.pl_rankingNow += delta_B2
-                    B2_elo.pl_losses += 1
-                    B2_elo.pl_totalGames += 1
-            
-            elif game.gm_result_B > game.gm_result_A:
-                # Update ratings for team A
-                # Calculate rating changes for A1
-                delta_A1 = ELO_K * (0 - (1 / (1 + 10 ** ((ranking_TeamB - A1_ranking) / 400))))
-                if A1_elo:
-                    A1_elo.pl_rankingNow += delta_A1
-                    A1_elo.pl_losses += 1
-                    A1_elo.pl_totalGames += 1
-                
-                # Calculate rating changes for A2
-                delta_A2 = ELO_K * (0 - (1 / (1 + 10 ** ((ranking_TeamB - A2_ranking) / 400))))
-                if A2_elo:
-                    A2_elo.pl_rankingNow += delta_A2
-                    A2_elo.pl_losses += 1
-                    A2_elo.pl_totalGames += 1
-                
-                # Update ratings for team B
-                # Calculate rating changes for B1
-                delta_B1 = ELO_K * (1 - (1 / (1 + 10 ** ((ranking_TeamA - B1_ranking) / 400))))
-                if B1_elo:
-                    B1_elo.pl_rankingNow += delta_B1
-                    B1_elo.pl_wins += 1
-                    B1_elo.pl_totalGames += 1
-                
-                # Calculate rating changes for B2
-                delta_B2 = ELO_K * (1 - (1 / (1 + 10 ** ((ranking_TeamA - B2_ranking) / 400))))
-                if B2_elo:
-                    B2_elo.pl_rankingNow += delta_B2
-                    B2_elo.pl_wins += 1
-                    B2_elo.pl_totalGames += 1
-
-            # Save the updated ELO values
-            db.session.commit()
+            if result_A != result_B:
+                outcome_A = 1 if result_A > result_B else 0
+                for pid, ranking, opponent_ranking, outcome in (
+                    (A1, A1_ranking, ranking_TeamB, outcome_A),
+                    (A2, A2_ranking, ranking_TeamB, outcome_A),
+                    (B1, B1_ranking, ranking_TeamA, 1 - outcome_A),
+                    (B2, B2_ranking, ranking_TeamA, 1 - outcome_A),
+                ):
+                    stats = elo.get(pid)
+                    if stats is None:
+                        continue
+                    stats[0] += ELO_K * (outcome - (1 / (1 + 10 ** ((opponent_ranking - ranking) / 400))))
+                    if outcome:
+                        stats[1] += 1
+                    else:
+                        stats[2] += 1
+                    stats[3] += 1
 
             # Skip history for games with no score (0-0)
-            if game.gm_result_A == 0 and game.gm_result_B == 0:
+            if result_A == 0 and result_B == 0:
                 continue
-            else:
-                # Define data for history records
-                history_entries = [
-                    {
-                        'game_id': game.gm_id,
-                        'player_id': A1_ID,
-                        'date': game.gm_date,
-                        'time_start': game.gm_timeStart,
-                        'teammate_id': A2_ID,
-                        'op1_id': B1_ID,
-                        'op2_id': B2_ID,
-                        'result_team': game.gm_result_A,
-                        'result_op': game.gm_result_B,
-                        'before_rank': A1_ranking
-                    },
-                    {
-                        'game_id': game.gm_id,
-                        'player_id': A2_ID,
-                        'date': game.gm_date,
-                        'time_start': game.gm_timeStart,
-                        'teammate_id': A1_ID,
-                        'op1_id': B1_ID,
-                        'op2_id': B2_ID,
-                        'result_team': game.gm_result_A,
-                        'result_op': game.gm_result_B,
-                        'before_rank': A2_ranking
-                    },
-                    {
-                        'game_id': game.gm_id,
-                        'player_id': B1_ID,
-                        'date': game.gm_date,
-                        'time_start': game.gm_timeStart,
-                        'teammate_id': B2_ID,
-                        'op1_id': A1_ID,
-                        'op2_id': A2_ID,
-                        'result_team': game.gm_result_B,
-                        'result_op': game.gm_result_A,
-                        'before_rank': B1_ranking
-                    },
-                    {
-                        'game_id': game.gm_id,
-                        'player_id': B2_ID,
-                        'date': game.gm_date,
-                        'time_start': game.gm_timeStart,
-                        'teammate_id': B1_ID,
-                        'op1_id': A1_ID,
-                        'op2_id': A2_ID,
-                        'result_team': game.gm_result_B,
-                        'result_op': game.gm_result_A,
-                        'before_rank': B2_ranking
-                    }
-                ]
-                try:
-                    for entry in history_entries:
-                        # Get player and calculate after rank
-                        player_elo = ELOranking.query.get(entry['player_id'])
-                        after_rank = player_elo.pl_rankingNow if player_elo else 1000
-                        
-                        # Create and add history entry
-                        hist_entry = ELOrankingHist(
-                            el_gm_id=entry['game_id'],
-                            el_pl_id=entry['player_id'],
-                            el_date=entry['date'],
-                            el_startTime=entry['time_start'],
-                            el_pl_id_teammate=entry['teammate_id'],
-                            el_pl_id_op1=entry['op1_id'],
-                            el_pl_id_op2=entry['op2_id'],
-                            el_result_team=entry['result_team'],
-                            el_result_op=entry['result_op'],
-                            el_beforeRank=entry['before_rank'],
-                            el_afterRank=after_rank
-                        )
-                        db.session.add(hist_entry)
-                    
-                    # Commit all history entries
-                    db.session.commit()
 
-                except Exception as e:
-                    # Rollback the transaction if an error occurs
-                    print("Error RHIST:", e)
-                    db.session.rollback()
+            for pid, before_rank, teammate, op1, op2, result_team, result_op in (
+                (A1, A1_ranking, A2, B1, B2, result_A, result_B),
+                (A2, A2_ranking, A1, B1, B2, result_A, result_B),
+                (B1, B1_ranking, B2, A1, A2, result_B, result_A),
+                (B2, B2_ranking, B1, A1, A2, result_B, result_A),
+            ):
+                history.append({
+                    'el_gm_id': gm_id,
+                    'el_pl_id': pid,
+                    'el_date': gm_date,
+                    'el_startTime': gm_time,
+                    'el_pl_id_teammate': teammate,
+                    'el_pl_id_op1': op1,
+                    'el_pl_id_op2': op2,
+                    'el_result_team': result_team,
+                    'el_result_op': result_op,
+                    'el_beforeRank': before_rank,
+                    'el_afterRank': elo[pid][0] if pid in elo else 1000,
+                })
+
+        rankings = [
+            {
+                'pl_id': pid,
+                'pl_rankingNow': stats[0],
+                'pl_totalRankingOpo': 0,
+                'pl_wins': stats[1],
+                'pl_losses': stats[2],
+                'pl_totalGames': stats[3],
+            }
+            for pid, stats in elo.items()
+        ]
+
+        # Replace both tables in one transaction
+        db.session.execute(ELOrankingHist.__table__.delete())
+        db.session.execute(ELOranking.__table__.delete())
+        if rankings:
+            db.session.execute(ELOranking.__table__.insert(), rankings)
+        if history:
+            db.session.execute(ELOrankingHist.__table__.insert(), history)
+        func_invalidate_player_stats()
+        db.session.commit()
 
     except Exception as e:
         print("Error99:", e)
         db.session.rollback()
-
-    #print("Print from end of ELO calc")
+        return {'status': 'error', 'message': str(e)}
+
+    elapsed = perf_counter() - started
+    nbr_rows = len(rankings) + len(history)
+    return {
+        'status': 'success',
+        'games': nbr_games,
+        'ranking_rows': len(rankings),
+        'history_rows': len(history),
+        'total_seconds': round(elapsed, 3),
+        'rows_per_second': round(nbr_rows / elapsed) if elapsed > 0 else nbr_rows,
+    }
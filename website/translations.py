@@ -0,0 +1,68 @@
+import json
+import os
+import threading
+from flask import g, has_request_context, request
+
+TRANSLATIONS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'translations', 'translations.json'))
+DEFAULT_LANGUAGE = 'en'
+
+
+class TranslationCatalog:
+    """translations.json parsed once per process into one {text: translation} dict per language.
+    The file is parsed again only when its mtime changes, so edits show up without a restart."""
+
+    def __init__(self, path):
+        self.path = path
+        self.loads = 0
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._entries = {}
+        self._languages = {}
+
+    def refresh(self):
+        """Reload the catalog if the file changed on disk. Returns True when it was reloaded."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        with self._lock:
+            if mtime == self._mtime:
+                return False
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            languages = {}
+            for text, values in entries.items():
+                for lang, translation in values.items():
+                    languages.setdefault(lang, {})[text] = translation
+            # Swap both dicts at once so readers never see a half-built catalog
+            self._entries, self._languages, self._mtime = entries, languages, mtime
+            self.loads += 1
+        return True
+
+    def entries(self):
+        """The raw {text: {lang: translation}} mapping, as stored in the file."""
+        self.refresh()
+        return self._entries
+
+    def language(self, lang):
+        """The {text: translation} lookup of one language (empty for unknown languages)."""
+        self.refresh()
+        return self._languages.get(lang, {})
+
+
+catalog = TranslationCatalog(TRANSLATIONS_PATH)
+
+
+def request_language():
+    return request.cookies.get('lang', DEFAULT_LANGUAGE) if has_request_context() else DEFAULT_LANGUAGE
+
+
+def translate(text):
+    """Translate text to the current request's language, falling back to the text itself.
+    Uses the lookup picked once per request by before_request when there is one."""
+    lookup = g.get('lang_translations') if has_request_context() else None
+    if lookup is None:
+        lookup = catalog.language(request_language())
+    return lookup.get(text, text)
@@ -0,0 +1,193 @@
+import logging
+import re
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from . import db
+from .models import Users
+
+# FTS5 mirror of tb_users for the player pickers of the event forms (/search_users).
+# The rowid is the name length in the high 32 bits and us_id in the low ones: FTS5 returns matches in
+# rowid order, so the first rows of a probe are the shortest names, without reading every match.
+USER_SEARCH_TABLE = 'tb_user_search'
+
+# Telephones are also indexed without separators, so '912345678' finds '912 345 678'
+_TELEPHONE_SEPARATORS = (' ', '-', '+', '(', ')', '.', '/')
+# Tokens as the unicode61 tokenizer splits them (underscores separate words too)
+_TOKEN = re.compile(r'[^\W_]+')
+
+# None until init_user_search() ran, False when this SQLite has no FTS5 (searches then fall back to LIKE)
+fts_available = None
+
+
+def _telephone(column):
+    digits = f"coalesce({column}, '')"
+    for separator in _TELEPHONE_SEPARATORS:
+        digits = f"replace({digits}, '{separator}', '')"
+    return f"coalesce({column}, '') || ' ' || {digits}"
+
+
+def _nicknames(user_id):
+    return f"(SELECT group_concat(pcn_nickname, ' ') FROM tb_player_nickname WHERE pcn_user_id = {user_id})"
+
+
+def _rowid(name, user_id):
+    return f"((coalesce(length({name}), 0) << 32) | {user_id})"
+
+
+def _user_rowid(user_id):
+    return f"(SELECT {_rowid('us_name', 'us_id')} FROM tb_users WHERE us_id = {user_id})"
+
+
+CREATE_TABLE = f"""
+CREATE VIRTUAL TABLE {USER_SEARCH_TABLE} USING fts5(
+    name, nicknames, email, telephone,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3 4'
+)"""
+
+FILL_TABLE = f"""
+INSERT INTO {USER_SEARCH_TABLE}(rowid, name, nicknames, email, telephone)
+SELECT {_rowid('us_name', 'us_id')}, us_name, {_nicknames('us_id')}, us_email, {_telephone('us_telephone')} FROM tb_users"""
+
+# Triggers keep the mirror current for every writer: the ORM, the raw SQL in gameday.py and the utility scripts
+TRIGGERS = {
+    f'{USER_SEARCH_TABLE}_user_insert': f"""
+        AFTER INSERT ON tb_users BEGIN
+            INSERT INTO {USER_SEARCH_TABLE}(rowid, name, nicknames, email, telephone)
+            VALUES ({_rowid('new.us_name', 'new.us_id')}, new.us_name, {_nicknames('new.us_id')}, new.us_email,
+                    {_telephone('new.us_telephone')});
+        END""",
+    # A new name length moves the row, so replace it
+    f'{USER_SEARCH_TABLE}_user_update': f"""
+        AFTER UPDATE OF us_name, us_email, us_telephone ON tb_users BEGIN
+            DELETE FROM {USER_SEARCH_TABLE} WHERE rowid = {_rowid('old.us_name', 'old.us_id')};
+            INSERT INTO {USER_SEARCH_TABLE}(rowid, name, nicknames, email, telephone)
+            VALUES ({_rowid('new.us_name', 'new.us_id')}, new.us_name, {_nicknames('new.us_id')}, new.us_email,
+                    {_telephone('new.us_telephone')});
+        END""",
+    f'{USER_SEARCH_TABLE}_user_delete': f"""
+        AFTER DELETE ON tb_users BEGIN
+            DELETE FROM {USER_SEARCH_TABLE} WHERE rowid = {_rowid('old.us_name', 'old.us_id')};
+        END""",
+    f'{USER_SEARCH_TABLE}_nickname_insert': f"""
+        AFTER INSERT ON tb_player_nickname BEGIN
+            UPDATE {USER_SEARCH_TABLE} SET nicknames = {_nicknames('new.pcn_user_id')}
+            WHERE rowid = {_user_rowid('new.pcn_user_id')};
+        END""",
+    f'{USER_SEARCH_TABLE}_nickname_update': f"""
+        AFTER UPDATE OF pcn_user_id, pcn_nickname ON tb_player_nickname BEGIN
+            UPDATE {USER_SEARCH_TABLE} SET nicknames = {_nicknames('old.pcn_user_id')}
+            WHERE rowid = {_user_rowid('old.pcn_user_id')};
+            UPDATE {USER_SEARCH_TABLE} SET nicknames = {_nicknames('new.pcn_user_id')}
+            WHERE rowid = {_user_rowid('new.pcn_user_id')};
+        END""",
+    f'{USER_SEARCH_TABLE}_nickname_delete': f"""
+        AFTER DELETE ON tb_player_nickname BEGIN
+            UPDATE {USER_SEARCH_TABLE} SET nicknames = {_nicknames('old.pcn_user_id')}
+            WHERE rowid = {_user_rowid('old.pcn_user_id')};
+        END""",
+}
+
+
+def _create(connection):
+    connection.execute(text(CREATE_TABLE))
+    connection.execute(text(FILL_TABLE))
+
+
+def _drop(connection):
+    for name in TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+    connection.execute(text(f"DROP TABLE IF EXISTS {USER_SEARCH_TABLE}"))
+
+
+def _create_triggers(connection):
+    for name, body in TRIGGERS.items():
+        connection.execute(text(f"CREATE TRIGGER IF NOT EXISTS {name} {body}"))
+
+
+def _is_current(connection):
+    """True when the table exists with the triggers of this version (SQLite keeps their CREATE text)."""
+    stored = dict(connection.execute(
+        text("SELECT name, sql FROM sqlite_master WHERE tbl_name IN ('tb_users', 'tb_player_nickname', :name) "
+             "AND type IN ('table', 'trigger') AND name LIKE :name || '%'"), {'name': USER_SEARCH_TABLE}
+    ).all())
+    return USER_SEARCH_TABLE in stored and all(stored.get(name) == f"CREATE TRIGGER {name} {body}"
+                                               for name, body in TRIGGERS.items())
+
+
+def init_user_search(engine):
+    """Create and fill the FTS5 table and its triggers when missing (after create_all), and rebuild
+    them when they were made by an older version of this module.
+    Leaves fts_available False when SQLite was built without FTS5."""
+    global fts_available
+    try:
+        with engine.begin() as connection:
+            if not _is_current(connection):
+                _drop(connection)
+                _create(connection)
+                _create_triggers(connection)
+        fts_available = True
+    except OperationalError as e:
+        fts_available = False
+        logging.warning(f"User search falls back to LIKE, FTS5 unavailable: {str(e)}")
+    return fts_available
+
+
+def rebuild_user_search(engine):
+    """Drop and rebuild the FTS5 table and its triggers from tb_users and tb_player_nickname.
+    Returns the number of indexed users."""
+    with engine.begin() as connection:
+        _drop(connection)
+        _create(connection)
+        _create_triggers(connection)
+        # Merge the b-tree segments of the fresh index into one
+        connection.execute(text(f"INSERT INTO {USER_SEARCH_TABLE}({USER_SEARCH_TABLE}) VALUES ('optimize')"))
+        return connection.execute(text(f"SELECT count(*) FROM {USER_SEARCH_TABLE}")).scalar()
+
+
+def match_expression(query):
+    """FTS5 query for what was typed: every word as a prefix, all required ('jo sil' finds 'João Silva')."""
+    return ' '.join(f'"{token}"*' for token in _TOKEN.findall(query))
+
+
+def _like_search(query, limit):
+    """The previous lookup, a LIKE scan of name, email and telephone."""
+    query = query.lower()
+    return Users.query.with_entities(Users.us_id, Users.us_name, Users.us_email, Users.us_telephone).filter(
+        db.or_(
+            db.func.lower(Users.us_name).like(f'%{query}%'),
+            db.func.lower(Users.us_email).like(f'%{query}%'),
+            Users.us_telephone.like(f'%{query}%')
+        )
+    ).limit(limit).all()
+
+
+def find_users(query, limit=10):
+    """Users matching what was typed, best first, as (us_id, us_name, us_email, us_telephone) rows.
+    Name and nickname matches come before email and telephone matches, shorter names (then lower ids)
+    first within a tier. Two FTS5 index probes (word prefixes) that each stop after the first `limit`
+    matches in rowid order, which are the best ones; a LIKE scan without FTS5."""
+    expression = match_expression(query)
+    if not expression:
+        return []
+    if fts_available:
+        try:
+            return db.session.execute(text(f"""
+                SELECT u.us_id, u.us_name, u.us_email, u.us_telephone
+                FROM (
+                    SELECT id, min(tier) AS tier FROM (
+                        SELECT * FROM (SELECT rowid AS id, 0 AS tier FROM {USER_SEARCH_TABLE}
+                                       WHERE {USER_SEARCH_TABLE} MATCH :names ORDER BY rowid LIMIT :limit)
+                        UNION ALL
+                        SELECT * FROM (SELECT rowid AS id, 1 AS tier FROM {USER_SEARCH_TABLE}
+                                       WHERE {USER_SEARCH_TABLE} MATCH :expression ORDER BY rowid LIMIT :limit))
+                    GROUP BY id) s
+                JOIN tb_users u ON u.us_id = s.id & 4294967295
+                ORDER BY s.tier, s.id
+                LIMIT :limit"""), {'names': f'{{name nicknames}} : ({expression})', 'expression': expression,
+                                   'limit': limit}).all()
+        except OperationalError as e:
+            # e.g. the table was dropped by hand: keep the pickers working until the next rebuild
+            db.session.rollback()
+            logging.error(f"Error searching users with FTS5: {str(e)}")
+    return _like_search(query, limit)
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, flash, jsonify, redirect, url_for, Flask, session, send_file, abort
+from flask import Blueprint, render_template, request, flash, jsonify, redirect, url_for, Flask, session, send_file, send_from_directory, abort, Response, current_app, g
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -6,7 +6,8 @@ from .models import (Users, UserRequests, Messages, League, Club, ClubAuthorizat
                     Court, GameDay, LeagueCourts, Game, GameDayPlayer, GameDayClassification,
                     LeagueClassification, ELOranking, ELOrankingHist, LeaguePlayers, GameDayRegistration,
                     Event, EventRegistration, EventClassification, EventCourts, EventPlayerNames,
-                    EventType, MexicanConfig, PlayerClubNickname, slugify)
+                    EventType, MexicanConfig, PlayerClubNickname, GameParticipation, PlayerStats, slugify,
+                    bump_player_events)
 from . import db
 import json, os, threading, hashlib
 from datetime import datetime, date, timedelta, timezone
@@ -17,21 +18,17 @@ from io import BytesIO
 from .user_info_func import ext_home, ext_userInfo
 from .tools import *
 from .gameday import *
+from .translations import translate
+from .render_cache import fragment_cache
+from .search_index import search_index
+from .user_search import find_users
+from .live_updates import broadcaster, sse_message, HEARTBEAT_SECONDS, STREAM_LIFETIME_SECONDS, RECONNECT_MILLISECONDS
+from .profiling import list_profiles, profile_dir, profile_token, PROFILE_PARAM
 import shutil
-
-def translate(text):
-    # Import translations file
-    translations_path = os.path.join(os.path.dirname(__file__), '..', 'translations', 'translations.json')
-    with open(translations_path, 'r', encoding='utf-8') as f:
-        translations = json.load(f)
-    
-    # Get current language from cookie or default to English
-    lang = request.cookies.get('lang', 'en')
-    
-    # Try to get translation, return original text if not found
-    if text in translations and lang in translations[text]:
-        return translations[text][lang]
-    return text
+import queue
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from collections import namedtuple
+from time import monotonic
 
 def _slug_to_id(slug):
     """Extract trailing numeric ID from a name-ID slug like 'Title-5' → 5."""
@@ -306,6 +303,7 @@ def managementUsersAdmin():
 @login_required
 def updateOwnUser():
     user_id = current_user.us_id
+    previous_name = current_user.us_name
     user_Name = request.form.get('user_name')
     user_Email = request.form.get('user_email')
     user_birthday = request.form.get('user_birthday')
@@ -346,6 +344,9 @@ def updateOwnUser():
         text(f"UPDATE tb_users SET us_name=:user_Name, us_email=:user_Email, us_birthday=:user_birthday, us_is_active=:user_is_active, us_is_player=:user_is_player, us_is_manager=:user_is_manager, us_is_admin=:user_is_admin, us_is_superuser=:user_is_superuser WHERE us_id=:user_id"),
             {"user_Name": user_Name, "user_Email": user_Email, "user_id": user_id, "user_birthday": user_birthday, "user_is_active": user_is_active, "user_is_player": user_is_player, "user_is_manager": user_is_manager, "user_is_admin": user_is_admin, "user_is_superuser": user_is_superuser}
         )
+        # The raw UPDATE skips the ORM events: refresh the event screens showing the old name
+        if user_Name != previous_name:
+            bump_player_events(db.session, [user_id])
         db.session.commit()
     except Exception as e:
         print("Error: " + str(e))
@@ -438,6 +439,9 @@ def updateUser(userID):
         text(f"UPDATE tb_users SET us_name=:user_Name, us_email=:user_Email, us_telephone=:user_telephone, us_birthday=:user_birthday, us_is_active=:user_is_active, us_is_player=:user_is_player, us_is_manager=:user_is_manager, us_is_admin=:user_is_admin, us_is_superuser=:user_is_superuser WHERE us_id=:user_id"),
             {"user_Name": user_Name, "user_Email": user_Email, "user_telephone": user_Telephone, "user_id": user_id, "user_birthday": user_birthday, "user_is_active": user_is_active, "user_is_player": user_is_player, "user_is_manager": user_is_manager, "user_is_admin": user_is_admin, "user_is_superuser": user_is_superuser}
         )
+        # The raw UPDATE skips the ORM events: refresh the event screens showing the old name
+        if user_Name != pass_user.us_name:
+            bump_player_events(db.session, [user_id])
         db.session.commit()
     except Exception as e:
         print("Error: " + str(e))
@@ -553,13 +557,8 @@ def deleteUser(userID):
     user_to_delete = Users.query.get_or_404(userID)
     
     # Check if user has participated in any games
-    has_games = db.session.query(Game).filter(
-        db.or_(
-            Game.gm_idPlayer_A1 == userID,
-            Game.gm_idPlayer_A2 == userID,
-            Game.gm_idPlayer_B1 == userID,
-            Game.gm_idPlayer_B2 == userID
-        )
+    has_games = db.session.query(GameParticipation.gpt_gm_id).filter(
+        GameParticipation.gpt_pl_id == userID
     ).first() is not None
     
     if has_games:
@@ -589,6 +588,7 @@ def deleteUser(userID):
         # Delete user's ELO ranking data
         ELOranking.query.filter_by(pl_id=userID).delete()
         ELOrankingHist.query.filter_by(el_pl_id=userID).delete()
+        PlayerStats.query.filter_by(ps_pl_id=userID).delete()
         
         # Delete user's gameday player records
         GameDayPlayer.query.filter_by(gp_idPlayer=userID).delete()
@@ -785,6 +785,32 @@ def respond_request(request_id):
     flash('Request has been responded to.', 'success')
     return redirect(url_for('views.manage_requests'))
 
+@views.route('/managementProfiles', methods=['GET', 'POST'])
+@login_required
+def managementProfiles():
+    """Recent request profiles, and signed links that profile one request to a page."""
+    if not current_user.us_is_superuser:
+        flash(translate('You do not have permission to access this page.'), 'error')
+        return redirect(url_for('views.home'))
+    profile_link = None
+    if request.method == 'POST':
+        target = urlsplit(request.form.get('path', '').strip())
+        if not target.path.startswith('/'):
+            flash(translate('Enter a path starting with /'), 'error')
+        else:
+            query = parse_qsl(target.query) + [(PROFILE_PARAM, profile_token(current_app, target.path, current_user.us_id))]
+            profile_link = f"{target.path}?{urlencode(query)}"
+    return render_template('managementProfiles.html', user=current_user, profiles=list_profiles(current_app),
+                           profile_link=profile_link, sample_endpoints=current_app.config.get('PROFILE_SAMPLE_ENDPOINTS') or {},
+                           token_max_age=current_app.config.get('PROFILE_TOKEN_MAX_AGE', 3600))
+
+@views.route('/managementProfiles/<name>')
+@login_required
+def download_profile(name):
+    if not current_user.us_is_superuser:
+        abort(403)
+    return send_from_directory(profile_dir(current_app), name, as_attachment=True)
+
 @views.context_processor
 def inject_unresponded_requests_count():
     if current_user.is_authenticated and current_user.us_is_superuser:
@@ -1250,164 +1276,181 @@ def public_event_detail(slug):
             ).first()
             can_edit = club_auth is not None
     
+    bundle = _load_event_bundle(event)
+
     # Check if user is registered for this event
     is_registered = False
     if current_user.is_authenticated:
-        is_registered = EventRegistration.query.filter_by(
-            er_event_id=event_id,
-            er_player_id=current_user.us_id
-        ).first() is not None
+        is_registered = any(r.er_player_id == current_user.us_id for r in bundle.registrations)
     
     # Get club info if event has a club
     club = None
     if event.ev_club_id:
         club = Club.query.get(event.ev_club_id)
     
-    # Get event games and registrations  
-    games = Game.query.filter_by(gm_idEvent=event_id).all()
-    registrations = EventRegistration.query.filter_by(er_event_id=event_id).all()
-    
     return render_template('event_detail_public.html', 
                          event=event,
                          club=club,
                          user=current_user,
                          is_registered=is_registered,
                          can_edit=can_edit,
-                         games=games,
-                         registrations=registrations,
+                         games=bundle.games,
+                         registrations=bundle.registrations,
                          access_code=provided_code if can_edit else None)
 
+def _event_standings(event):
+    """Classifications of an event in standings order: points, games difference, then (for Mexicano
+    events with Ranking pairing) club ELO, then name. The order is cached per data version, so the
+    club ELO is read once per change however many pages show the event; func_update_club_ELO bumps
+    the version of those events whenever the club ranking moves."""
+    classifications = (EventClassification.query.filter_by(ec_event_id=event.ev_id)
+                       .options(db.joinedload(EventClassification.player)).all())
+
+    def compute_order():
+        is_mexican_ranking = (
+            event.event_type and event.event_type.et_name == 'Mexicano'
+            and event.ev_pairing_type == 'Ranking'
+        )
+        if is_mexican_ranking:
+            club_elo = func_calculate_ELO_by_club(event.ev_club_id) if event.ev_club_id else []
+            elo_map = {entry['player'].us_id: entry['rankingNow'] for entry in club_elo}
+            ordered = sorted(classifications, key=lambda c: (
+                -c.ec_points, -c.ec_games_diff, -(elo_map.get(c.ec_player_id, 0)), c.player.us_name.lower()
+            ))
+        else:
+            ordered = sorted(classifications, key=lambda c: (
+                -c.ec_points, -c.ec_games_diff, c.player.us_name.lower()
+            ))
+        return [c.ec_id for c in ordered]
+
+    order = fragment_cache.get_or_compute(('event_standings', event.ev_id, event.ev_data_version), compute_order)
+    position = {ec_id: index for index, ec_id in enumerate(order)}
+    return sorted(classifications, key=lambda c: position.get(c.ec_id, len(position)))
+
+
+# Read-only view of an event: everything the templates touch is already loaded, so rendering sends no SQL
+EventBundle = namedtuple('EventBundle', ['event', 'games', 'registrations', 'regular_players',
+                                         'substitute_players', 'classifications', 'players', 'nickname_map'])
+
+
+def _load_event_bundle(event):
+    """Games (with court and players), registrations and standings (with player) and the club
+    nicknames of an event, in a fixed number of queries whatever the number of players or rounds."""
+    registrations = (EventRegistration.query.filter_by(er_event_id=event.ev_id)
+                     .options(db.joinedload(EventRegistration.player))
+                     .order_by(EventRegistration.er_id).all())
+    classifications = _event_standings(event)
+    games = (Game.query.filter_by(gm_idEvent=event.ev_id)
+             .options(db.joinedload(Game.court))
+             .order_by(Game.gm_timeStart, Game.gm_id).all())
+
+    # game.player_A1..B2 are many-to-one on the primary key, so once every player is in the session
+    # they resolve from the identity map; one IN query fetches the players not loaded above
+    players = {r.player.us_id: r.player for r in registrations if r.player}
+    players.update((c.player.us_id, c.player) for c in classifications if c.player)
+    missing = {player_id for game in games
+               for player_id in (game.gm_idPlayer_A1, game.gm_idPlayer_A2, game.gm_idPlayer_B1, game.gm_idPlayer_B2)
+               if player_id and player_id not in players}
+    if missing:
+        players.update((u.us_id, u) for u in Users.query.filter(Users.us_id.in_(missing)).all())
+
+    nickname_map = {}
+    if event.ev_club_id:
+        nicknames = (db.session.query(PlayerClubNickname.pcn_user_id, PlayerClubNickname.pcn_nickname)
+                     .filter(PlayerClubNickname.pcn_club_id == event.ev_club_id).all())
+        nickname_map = {user_id: nickname for user_id, nickname in nicknames}
+
+    return EventBundle(event=event,
+                       games=games,
+                       registrations=registrations,
+                       regular_players=[r for r in registrations if not r.er_is_substitute],
+                       substitute_players=[r for r in registrations if r.er_is_substitute],
+                       classifications=classifications,
+                       players=players,
+                       nickname_map=nickname_map)
+
+
+def _event_tv_content(event_id, version):
+    """Rendered dynamic part of the TV view (standings and rounds), shared by every screen showing the event."""
+    def render():
+        bundle = _load_event_bundle(db.session.get(Event, event_id))
+        return render_template('event_detail_tv_partial.html',
+                               event=bundle.event,
+                               event_games=bundle.games,
+                               game_player_names={},
+                               classifications=bundle.classifications,
+                               nickname_map=bundle.nickname_map)
+
+    return fragment_cache.get_or_compute(('event_tv_content', event_id, version, g.lang), render)
+
+
 @views.route('/detail_event_tv/<slug>', methods=['GET'])  
 def detail_event_tv(slug):
     """TV-optimized view for event details"""
-    from .models import EventClassification
     event_id = _slug_to_id(slug)
     event = Event.query.get_or_404(event_id)
-    
-    # Check if user is authorized to manage this event
-    user_is_authorized = False
-    if current_user.is_authenticated:
-        if current_user.us_is_superuser == 1:
-            user_is_authorized = True
-        else:
-            # Check club authorization for non-public events
-            is_public_event = event.ev_club_id == 2
-            if not is_public_event:
-                authorization = ClubAuthorization.query.filter_by(
-                    ca_user_id=current_user.us_id, 
-                    ca_club_id=event.ev_club_id
-                ).first()
-                user_is_authorized = authorization is not None
-    
-    # Get event games and player info
-    event_games = Game.query.filter_by(gm_idEvent=event_id).order_by(Game.gm_timeStart, Game.gm_id).all()
-    regular_players = EventRegistration.query.filter_by(er_event_id=event_id, er_is_substitute=False).all()
-    substitute_players = EventRegistration.query.filter_by(er_event_id=event_id, er_is_substitute=True).all()
-    
-    # Get game player names for fallback display
-    game_player_names = {}
-    player_names = EventPlayerNames.query.filter_by(epn_event_id=event_id).all()
 
-    # Build nickname map: {user_id: nickname} for the event's club
-    nickname_map = {}
-    if event.ev_club_id:
-        nicknames = PlayerClubNickname.query.filter_by(pcn_club_id=event.ev_club_id).all()
-        nickname_map = {n.pcn_user_id: n.pcn_nickname for n in nicknames}
-    
-    # Get event classifications with proper sorting (same as regular page)
-    classifications = EventClassification.query.filter_by(ec_event_id=event_id).order_by(
-        EventClassification.ec_points.desc(),
-        EventClassification.ec_games_diff.desc()
-    ).all()
-    
-    # Re-sort with tiebreaker logic
-    # For Mexicano events with Ranking pairing: use club ELO as tiebreaker, then alphabetical
-    is_mexican_ranking = (
-        event.event_type and event.event_type.et_name == 'Mexicano'
-        and event.ev_pairing_type == 'Ranking'
-    )
-    if is_mexican_ranking:
-        club_elo = func_calculate_ELO_by_club(event.ev_club_id) if event.ev_club_id else []
-        elo_map = {entry['player'].us_id: entry['rankingNow'] for entry in club_elo}
-        classifications = sorted(classifications, key=lambda c: (
-            -c.ec_points,
-            -c.ec_games_diff,
-            -(elo_map.get(c.ec_player_id, 0)),
-            c.player.us_name.lower()
-        ))
-    else:
-        classifications = sorted(classifications, key=lambda c: (
-            -c.ec_points,
-            -c.ec_games_diff,
-            c.player.us_name.lower()
-        ))
-    
     return render_template('event_detail_tv.html', 
                          event=event, 
-                         event_games=event_games,
-                         game_player_names=game_player_names,
-                         regular_players=regular_players,
-                         substitute_players=substitute_players,
-                         classifications=classifications,
-                         user_is_authorized=user_is_authorized,
-                         user=current_user,
-                         nickname_map=nickname_map)
+                         tv_content=_event_tv_content(event_id, event.ev_data_version),
+                         user=current_user)
 
 
 @views.route('/event_tv_data/<int:event_id>')
 def event_tv_data(event_id):
     """Lightweight endpoint for the TV view's silent live-update polling.
-    Returns a short fingerprint of the current data plus the rendered HTML fragment.
+    Clients send the last ev_data_version they rendered; while it is still current the answer
+    is an empty 304, otherwise the new version plus the rendered HTML fragment.
     """
-    from .models import EventClassification
-    event = Event.query.get_or_404(event_id)
-
-    event_games = Game.query.filter_by(gm_idEvent=event_id).order_by(Game.gm_timeStart, Game.gm_id).all()
-
-    game_player_names = {}
-
-    nickname_map = {}
-    if event.ev_club_id:
-        nicknames = PlayerClubNickname.query.filter_by(pcn_club_id=event.ev_club_id).all()
-        nickname_map = {n.pcn_user_id: n.pcn_nickname for n in nicknames}
-
-    classifications = EventClassification.query.filter_by(ec_event_id=event_id).order_by(
-        EventClassification.ec_points.desc(),
-        EventClassification.ec_games_diff.desc()
-    ).all()
-
-    is_mexican_ranking = (
-        event.event_type and event.event_type.et_name == 'Mexicano'
-        and event.ev_pairing_type == 'Ranking'
-    )
-    if is_mexican_ranking:
-        club_elo = func_calculate_ELO_by_club(event.ev_club_id) if event.ev_club_id else []
-        elo_map = {entry['player'].us_id: entry['rankingNow'] for entry in club_elo}
-        classifications = sorted(classifications, key=lambda c: (
-            -c.ec_points, -c.ec_games_diff, -(elo_map.get(c.ec_player_id, 0)), c.player.us_name.lower()
-        ))
-    else:
-        classifications = sorted(classifications, key=lambda c: (
-            -c.ec_points, -c.ec_games_diff, c.player.us_name.lower()
-        ))
-
-    # Build a short fingerprint from scores + classification standings
-    parts = []
-    for g in event_games:
-        parts.append(f"{g.gm_id}:{g.gm_result_A}:{g.gm_result_B}")
-    for c in classifications:
-        parts.append(f"{c.ec_player_id}:{c.ec_points}:{c.ec_games_diff}")
-    fingerprint = hashlib.md5('|'.join(parts).encode()).hexdigest()[:8]
-
-    html = render_template('event_detail_tv_partial.html',
-                           event=event,
-                           event_games=event_games,
-                           game_player_names=game_player_names,
-                           classifications=classifications,
-                           nickname_map=nickname_map)
+    version = db.session.query(Event.ev_data_version).filter(Event.ev_id == event_id).scalar()
+    if version is None:
+        abort(404)
+    if request.args.get('version') == str(version):
+        return '', 304
+    return jsonify(version=version, html=_event_tv_content(event_id, version))
 
-    return jsonify(fingerprint=fingerprint, html=html)
 
+@views.route('/event_tv_stream/<int:event_id>')
+def event_tv_stream(event_id):
+    """Server-Sent Events push channel for the TV view.
+    Sends an 'update' message with the new ev_data_version whenever the event's data is committed,
+    and a heartbeat comment in between. Answers 503 when the stream registry is full; the page then keeps polling.
+    """
+    version = db.session.query(Event.ev_data_version).filter(Event.ev_id == event_id).scalar()
+    if version is None:
+        abort(404)
+    subscriber = broadcaster.subscribe(event_id)
+    if subscriber is None:
+        return '', 503
+    # EventSource resends the id of the last message it received when it reconnects
+    last_sent = request.headers.get('Last-Event-ID') or request.args.get('version')
+    app = current_app._get_current_object()
+
+    def stream():
+        sent, current = last_sent, version
+        deadline = monotonic() + STREAM_LIFETIME_SECONDS
+        try:
+            yield f"retry: {RECONNECT_MILLISECONDS}\n\n"
+            while True:
+                if str(current) != sent:
+                    sent = str(current)
+                    yield sse_message(current, event_name='update', event_id=current)
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    subscriber.get(timeout=min(HEARTBEAT_SECONDS, remaining))
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                with app.app_context():
+                    current = db.session.query(Event.ev_data_version).filter(Event.ev_id == event_id).scalar()
+                if current is None:
+                    return
+        finally:
+            broadcaster.unsubscribe(event_id, subscriber)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @views.route('/toggle_event_elo/<int:event_id>', methods=['POST'])
 @login_required
@@ -1418,6 +1461,7 @@ def toggle_event_elo(event_id):
         flash(translate('Not authorized'), 'error')
         return redirect(url_for('views.detail_event', slug=event.ev_slug))
     event.ev_exclude_from_elo = not bool(event.ev_exclude_from_elo)
+    func_invalidate_club_ELO(event.ev_club_id)
     db.session.commit()
     state = translate('excluded from') if event.ev_exclude_from_elo else translate('included in')
     flash(translate('Event {} ELO ranking.').format(state), 'success')
@@ -1588,9 +1632,12 @@ def detail_event(slug):
                 ).first()
                 user_is_authorized = authorization is not None
     
+    # Get event games, players and standings
+    bundle = _load_event_bundle(event)
+    event_games = bundle.games
+
     # Check if event can be deleted (no games played yet)
     if user_is_authorized:
-        event_games = Game.query.filter_by(gm_idEvent=event_id).all()
         games_with_results = [g for g in event_games if g.gm_result_A is not None or g.gm_result_B is not None]
         if not games_with_results:
             can_delete = True
@@ -1601,49 +1648,13 @@ def detail_event(slug):
         if event_games and event.ev_status != 'event_ended':
             can_close_event = True
     
-    # Get event games and player info
-    event_games = Game.query.filter_by(gm_idEvent=event_id).all()
-    regular_players = EventRegistration.query.filter_by(er_event_id=event_id, er_is_substitute=False).all()
-    substitute_players = EventRegistration.query.filter_by(er_event_id=event_id, er_is_substitute=True).all()
-    
     # Get club info
     club = Club.query.get(event.ev_club_id) if event.ev_club_id else None
     
-    # Get event classifications with proper sorting
-    classifications = EventClassification.query.filter_by(ec_event_id=event_id).order_by(
-        EventClassification.ec_points.desc(),
-        EventClassification.ec_games_diff.desc()
-    ).all()
-    
-    # Re-sort with tiebreaker logic
-    # For Mexicano events with Ranking pairing: use club ELO as tiebreaker, then alphabetical
-    is_mexican_ranking = (
-        event.event_type and event.event_type.et_name == 'Mexicano'
-        and event.ev_pairing_type == 'Ranking'
-    )
-    if is_mexican_ranking:
-        club_elo = func_calculate_ELO_by_club(event.ev_club_id) if event.ev_club_id else []
-        elo_map = {entry['player'].us_id: entry['rankingNow'] for entry in club_elo}
-        classifications = sorted(classifications, key=lambda c: (
-            -c.ec_points,
-            -c.ec_games_diff,
-            -(elo_map.get(c.ec_player_id, 0)),
-            c.player.us_name.lower()
-        ))
-    else:
-        classifications = sorted(classifications, key=lambda c: (
-            -c.ec_points,
-            -c.ec_games_diff,
-            c.player.us_name.lower()
-        ))
-    
     # Check if user is registered
     user_registration = None
     if current_user.is_authenticated:
-        user_registration = EventRegistration.query.filter_by(
-            er_event_id=event_id,
-            er_player_id=current_user.us_id
-        ).first()
+        user_registration = next((r for r in bundle.registrations if r.er_player_id == current_user.us_id), None)
     
     # Check if user can register
     can_register = False
@@ -1653,13 +1664,6 @@ def detail_event(slug):
     
     # Get game player names for display (in case some games use names instead of user IDs)
     game_player_names = {}
-    player_names = EventPlayerNames.query.filter_by(epn_event_id=event_id).all()
-
-    # Build nickname map: {user_id: nickname} for the event's club
-    nickname_map = {}
-    if event.ev_club_id:
-        nicknames = PlayerClubNickname.query.filter_by(pcn_club_id=event.ev_club_id).all()
-        nickname_map = {n.pcn_user_id: n.pcn_nickname for n in nicknames}
     
     return render_template('event_detail.html', 
                          event=event,
@@ -1670,21 +1674,25 @@ def detail_event(slug):
                          delete_message=delete_message,
                          can_close_event=can_close_event,
                          event_games=event_games,
-                         regular_players=regular_players,
-                         substitute_players=substitute_players,
-                         classifications=classifications,
+                         regular_players=bundle.regular_players,
+                         substitute_players=bundle.substitute_players,
+                         classifications=bundle.classifications,
                          user_registration=user_registration,
                          can_register=can_register,
                          game_player_names=game_player_names,
-                         nickname_map=nickname_map)
+                         nickname_map=bundle.nickname_map)
 
 # Events public page
 @views.route('/Events', methods=['GET'])
 @views.route('/events', methods=['GET'])
 def events():
     """Public page to display all events"""
+    # The cards show the club, type and registration count of every event: loaded with the events, not per card
+    card_data = (db.joinedload(Event.club), db.joinedload(Event.event_type), db.selectinload(Event.registrations))
+
     # Get active events (exclude canceled and ended events)
     active_events = Event.query\
+        .options(*card_data)\
         .outerjoin(Club, Event.ev_club_id == Club.cl_id)\
         .filter(Event.ev_status.notin_(['canceled', 'event_ended']))\
         .filter(or_(Event.ev_club_id.is_(None), Club.cl_active == True))\
@@ -1693,6 +1701,7 @@ def events():
     
     # Get past events (ended events)
     past_events = Event.query\
+        .options(*card_data)\
         .outerjoin(Club, Event.ev_club_id == Club.cl_id)\
         .filter(Event.ev_status == 'event_ended')\
         .filter(or_(Event.ev_club_id.is_(None), Club.cl_active == True))\
@@ -2704,6 +2713,9 @@ def edit_event(event_id):
                 event.ev_title = request.form['title']
                 event.ev_description = request.form.get('description', '')
                 event.ev_location = request.form['location']
+                if str(event.ev_club_id) != request.form['club_id']:
+                    func_invalidate_club_ELO(event.ev_club_id)
+                    func_invalidate_club_ELO(request.form['club_id'])
                 event.ev_club_id = request.form['club_id']
                 
                 # Parse dates and times
@@ -2997,6 +3009,9 @@ def edit_event_step1(event_id):
             event.ev_title = request.form['title']
             event.ev_description = request.form.get('description', '')
             event.ev_location = request.form['location']
+            if str(event.ev_club_id) != request.form['club_id']:
+                func_invalidate_club_ELO(event.ev_club_id)
+                func_invalidate_club_ELO(request.form['club_id'])
             event.ev_club_id = request.form['club_id']
             
             # Parse dates and times
@@ -3069,6 +3084,8 @@ def delete_event(event_id):
             ELOrankingHist.query.filter_by(el_gm_id=game.gm_id).delete()
         
         # 2. Delete games related to this event
+        if any(game.gm_result_A is not None for game in event_games):
+            func_invalidate_club_ELO(event.ev_club_id)
         Game.query.filter_by(gm_idEvent=event_id).delete()
         
         # 3. Delete event classifications
@@ -3868,30 +3885,23 @@ def create_games_for_event(event_id):
 @login_or_access_code_required
 def clear_event_round(event_id, start_time):
     """Clear an entire round of games - behavior depends on event type"""
-    print(f"DEBUG clear_event_round: Called with event_id={event_id}, start_time={start_time}")
-    
     try:
         event = Event.query.get_or_404(event_id)
-        print(f"DEBUG clear_event_round: Found event {event.ev_id}")
     
         # Check authorization (superuser, club authorization, or public event with access code)
         is_public_event = event.ev_club_id == 2  # Public Events club ID
-        print(f"DEBUG clear_event_round: is_public_event={is_public_event}")
     
         if current_user.is_authenticated and not is_public_event and current_user.us_is_superuser != 1:
-            print(f"DEBUG clear_event_round: Checking authorization for user {current_user.us_id}")
             authorization = ClubAuthorization.query.filter_by(
                 ca_user_id=current_user.us_id, 
                 ca_club_id=event.ev_club_id
             ).first()
             
             if not authorization:
-                print(f"DEBUG clear_event_round: Not authorized")
                 flash(translate('You are not authorized to delete rounds for this event'), 'error')
                 access_code = session.get(f'event_{event_id}_access_code', '')
                 return redirect(url_for('views.detail_event', slug=event.ev_slug, code=access_code) if access_code else url_for('views.detail_event', slug=event.ev_slug))
 
-        print(f"DEBUG clear_event_round: Authorization passed, parsing time")
         from datetime import datetime, time
         
         # Parse the start_time from URL parameter (format: HH:MM)
@@ -3900,7 +3910,6 @@ def clear_event_round(event_id, start_time):
         
         # Check if this is a NonStop event
         is_nonstop = event.event_type and event.event_type.et_name == 'NonStop'
-        print(f"DEBUG: Event type: {event.event_type.et_name if event.event_type else 'None'}, is_nonstop: {is_nonstop}")
         
         # Get all games for this event
         all_games = Game.query.filter_by(gm_idEvent=event_id).order_by(Game.gm_timeStart).all()
@@ -3940,8 +3949,6 @@ def clear_event_round(event_id, start_time):
         target_round_games = []
         games_to_delete = []
         
-        print(f"DEBUG: Searching for games with hour={target_time.hour} and minute={target_time.minute}")
-        
         for game in all_games:
             # Handle both datetime and time objects  
             if hasattr(game.gm_timeStart, 'time'):
@@ -3949,26 +3956,22 @@ def clear_event_round(event_id, start_time):
             else:
                 game_time = game.gm_timeStart  # It's already a time object
             
-            print(f"DEBUG: Checking game {game.gm_id}: {game_time} -> hour={game_time.hour}, minute={game_time.minute}")
-            
             # If this is the target round, reset scores to None (match hour and minute only)
             if game_time.hour == target_time.hour and game_time.minute == target_time.minute:
-                print(f"DEBUG: Match found! Adding game {game.gm_id} to target_round_games")
                 target_round_games.append(game)
             # If this game starts after the target round, mark for deletion (except for NonStop)
             elif not is_nonstop and (game_time.hour > target_time.hour or 
                   (game_time.hour == target_time.hour and game_time.minute > target_time.minute)):
-                print(f"DEBUG: Game {game.gm_id} is after target round, marking for deletion")
                 games_to_delete.append(game)
         
-        print(f"DEBUG: Found {len(target_round_games)} games in target round, {len(games_to_delete)} games to delete")
-        
         if not target_round_games:
             flash(translate('No games found for the specified round time'), 'warning')
             access_code = session.get(f'event_{event_id}_access_code', '')
             return redirect(url_for('views.detail_event', slug=event.ev_slug, code=access_code) if access_code else url_for('views.detail_event', slug=event.ev_slug))
         
         # Reset scores for the target round
+        if any(game.gm_result_A is not None for game in target_round_games + games_to_delete):
+            func_invalidate_club_ELO(event.ev_club_id)
         for game in target_round_games:
             game.gm_result_A = None
             game.gm_result_B = None
@@ -3996,7 +3999,7 @@ def clear_event_round(event_id, start_time):
     except ValueError:
         flash(translate('Invalid time format provided'), 'error')
     except Exception as e:
-        print(f"DEBUG clear_event_round: Exception occurred: {str(e)}")
+        print(f"Error: {str(e)}")
         db.session.rollback()
         flash(translate('Error clearing round: {}').format(str(e)), 'error')
     
@@ -4193,11 +4196,17 @@ def update_all_game_scores(event_id):
         
         # Update games with scores
         games_updated = 0
+        past_game_edited = False
+        all_event_games = Game.query.filter_by(gm_idEvent=event_id).all()
+        event_games_by_id = {g.gm_id: g for g in all_event_games}
+        scored_before = {g.gm_id for g in all_event_games if g.gm_result_A is not None and g.gm_result_B is not None}
         
         for game_id, game_scores in scores_data.items():
-            game = Game.query.get(game_id)
-            if game and game.gm_idEvent == event_id:
+            game = event_games_by_id.get(game_id)
+            if game:
                 if 'A' in game_scores and 'B' in game_scores:
+                    if game.gm_result_A is not None and (game.gm_result_A, game.gm_result_B) != (game_scores['A'], game_scores['B']):
+                        past_game_edited = True
                     game.gm_result_A = game_scores['A']
                     game.gm_result_B = game_scores['B']
                     games_updated += 1
@@ -4207,6 +4216,10 @@ def update_all_game_scores(event_id):
             access_code = session.get(f'event_{event_id}_access_code', '')
             return redirect(url_for('views.detail_event', slug=event.ev_slug, code=access_code) if access_code else url_for('views.detail_event', slug=event.ev_slug))
 
+        # Editing a game that was already rated invalidates the club ELO from that game onwards
+        if past_game_edited:
+            func_invalidate_club_ELO(event.ev_club_id)
+
         # Flush so the updates are visible in queries below
         db.session.flush()
 
@@ -4215,7 +4228,6 @@ def update_all_game_scores(event_id):
         # A "round" = all games sharing the same gm_timeStart.
         # We work with the LATEST round that has at least one result.
         # ------------------------------------------------------------------
-        all_event_games = Game.query.filter_by(gm_idEvent=event_id).all()
 
         # Group games by start time
         rounds_by_time = {}
@@ -4250,8 +4262,16 @@ def update_all_game_scores(event_id):
             access_code = session.get(f'event_{event_id}_access_code', '')
             return redirect(url_for('views.detail_event', slug=event.ev_slug, code=access_code) if access_code else url_for('views.detail_event', slug=event.ev_slug))
 
-        # Round is fully complete — recalculate classifications
-        calculate_event_classifications(event_id)
+        # Round is fully complete — recalculate classifications.
+        # When every other game was already scored and classified and this round was scored
+        # entirely by this submission, only its games need to be added to the standings.
+        current_round_ids = {g.gm_id for g in current_round_games}
+        round_is_new = (
+            not past_game_edited
+            and not (current_round_ids & scored_before)
+            and all(g.gm_id in scored_before for g in all_event_games if g.gm_id not in current_round_ids)
+        )
+        calculate_event_classifications(event_id, round_games=current_round_games if round_is_new else None)
 
         # Check if next round should be created (no incomplete games left anywhere)
         incomplete_games = [g for g in all_event_games if g.gm_result_A is None or g.gm_result_B is None]
@@ -4288,6 +4308,11 @@ def update_all_game_scores(event_id):
             flash(translate('{} game scores updated successfully!').format(games_updated), 'success')
         
         db.session.commit()
+
+        # Apply the games of the completed round to the club ELO ranking
+        if event.ev_club_id:
+            func_update_club_ELO(event.ev_club_id)
+        func_refresh_game_players_stats(Game.gm_idEvent == event_id)
         
     except Exception as e:
         db.session.rollback()
@@ -4314,6 +4339,8 @@ def handle_zero_scores_case(event_id):
         latest_round_games = [g for g in all_games if g.gm_timeStart == latest_start_time]
         
         # Delete the latest round games
+        if any(game.gm_result_A for game in latest_round_games) or any(game.gm_result_B for game in latest_round_games):
+            func_invalidate_club_ELO(Event.query.get(event_id).ev_club_id)
         for game in latest_round_games:
             db.session.delete(game)
         
@@ -4344,73 +4371,71 @@ def handle_zero_scores_case(event_id):
     access_code = session.get(f'event_{event_id}_access_code', '')
     return redirect(url_for('views.detail_event', slug=event.ev_slug, code=access_code) if access_code else url_for('views.detail_event', slug=event.ev_slug))
 
-def calculate_event_classifications(event_id):
-    """Calculate classifications for all players in an event"""
-    from .models import EventPlayerNames
-    
+def calculate_event_classifications(event_id, round_games=None):
+    """Calculate classifications for all players in an event.
+    All players' stats are accumulated in one scan over the event's scored games and the
+    classification rows are upserted in bulk. When round_games is given (the games of a
+    just-completed round, not counted yet), only those games are added to the existing rows."""
     # Get all players in the event
-    registrations = EventRegistration.query.filter_by(er_event_id=event_id, er_is_substitute=False).all()
-    
-    # Clear existing classifications
-    EventClassification.query.filter_by(ec_event_id=event_id).delete()
-    
-    # Calculate stats for each player
-    for registration in registrations:
-        player_id = registration.er_player_id
-        
-        # Get all games involving this player
-        games = Game.query.filter(
-            Game.gm_idEvent == event_id,
-            (Game.gm_idPlayer_A1 == player_id) | 
-            (Game.gm_idPlayer_A2 == player_id) |
-            (Game.gm_idPlayer_B1 == player_id) | 
-            (Game.gm_idPlayer_B2 == player_id)
+    player_ids = [row[0] for row in db.session.query(EventRegistration.er_player_id).filter_by(er_event_id=event_id, er_is_substitute=False)]
+    existing = {c.ec_player_id: c for c in EventClassification.query.filter_by(ec_event_id=event_id).all()}
+
+    # player_id -> [wins, losses, games_favor, games_against]
+    if round_games is not None and existing and set(existing) == set(player_ids):
+        games = [
+            (g.gm_idPlayer_A1, g.gm_idPlayer_A2, g.gm_idPlayer_B1, g.gm_idPlayer_B2, g.gm_result_A, g.gm_result_B)
+            for g in round_games
+            if g.gm_result_A is not None and g.gm_result_B is not None
+        ]
+        stats = {pid: [c.ec_wins or 0, c.ec_losses or 0, c.ec_games_favor or 0, c.ec_games_against or 0] for pid, c in existing.items()}
+    else:
+        games = db.session.query(
+            Game.gm_idPlayer_A1, Game.gm_idPlayer_A2, Game.gm_idPlayer_B1, Game.gm_idPlayer_B2,
+            Game.gm_result_A, Game.gm_result_B
         ).filter(
+            Game.gm_idEvent == event_id,
             Game.gm_result_A.isnot(None),
             Game.gm_result_B.isnot(None)
         ).all()
-        
-        wins = 0
-        losses = 0
-        games_favor = 0
-        games_against = 0
-        
-        for game in games:
-            # Determine if player is on team A or B
-            if player_id in [game.gm_idPlayer_A1, game.gm_idPlayer_A2]:
-                # Player is on team A
-                games_favor += game.gm_result_A
-                games_against += game.gm_result_B
-                if game.gm_result_A > game.gm_result_B:
-                    wins += 1
-                else:
-                    losses += 1
+        stats = {pid: [0, 0, 0, 0] for pid in player_ids}
+
+    for A1, A2, B1, B2, result_A, result_B in games:
+        # A draw counts as a loss for both teams
+        for pid, favor, against in ((A1, result_A, result_B), (A2, result_A, result_B),
+                                    (B1, result_B, result_A), (B2, result_B, result_A)):
+            player_stats = stats.get(pid)
+            if player_stats is None:
+                continue
+            if favor > against:
+                player_stats[0] += 1
             else:
-                # Player is on team B
-                games_favor += game.gm_result_B
-                games_against += game.gm_result_A
-                if game.gm_result_B > game.gm_result_A:
-                    wins += 1
-                else:
-                    losses += 1
-        
-        # Calculate points (3 points per win)
-        points = wins * 3
-        games_diff = games_favor - games_against
-        
-        # Create classification record
-        classification = EventClassification(
-            ec_event_id=event_id,
-            ec_player_id=player_id,
-            ec_points=points,
-            ec_wins=wins,
-            ec_losses=losses,
-            ec_games_favor=games_favor,
-            ec_games_against=games_against,
-            ec_games_diff=games_diff,
-            ec_ranking=0.0  # Will be calculated after all players are processed
-        )
-        db.session.add(classification)
+                player_stats[1] += 1
+            player_stats[2] += favor
+            player_stats[3] += against
+
+    new_rows = []
+    for player_id in player_ids:
+        wins, losses, games_favor, games_against = stats[player_id]
+        values = {
+            'ec_points': wins * 3,  # 3 points per win
+            'ec_wins': wins,
+            'ec_losses': losses,
+            'ec_games_favor': games_favor,
+            'ec_games_against': games_against,
+            'ec_games_diff': games_favor - games_against,
+            'ec_ranking': 0.0,
+        }
+        classification = existing.pop(player_id, None)
+        if classification:
+            for attr, value in values.items():
+                setattr(classification, attr, value)
+        else:
+            new_rows.append(EventClassification(ec_event_id=event_id, ec_player_id=player_id, **values))
+    db.session.add_all(new_rows)
+
+    # Players no longer registered lose their classification
+    for classification in existing.values():
+        db.session.delete(classification)
 
 def create_next_round_games(event_id, classifications, round_number):
     """Create games for the next round based on current classifications"""
@@ -5450,110 +5475,89 @@ def remove_league_player(league_id, user_id):
     return redirect(url_for('views.edit_league', slug=league.lg_slug))
 
 # Other routes
+def send_derived_image(file_path, nophoto):
+    """Serve the cached square variant picked by ?size= (avatar, card or full) with a strong ETag, so browsers revalidate with a 304."""
+    if not os.path.isfile(file_path):
+        return redirect(url_for('static', filename=nophoto), code=301)
+    variant = request.args.get('size', 'full')
+    if variant not in IMAGE_VARIANTS:
+        variant = 'full'
+    for attempt in range(3):
+        cached_path, etag = func_derived_image(file_path, variant)
+        try:
+            response = send_file(cached_path, mimetype='image/jpeg', etag=etag, conditional=True, max_age=0)
+            break
+        except FileNotFoundError:
+            # The photo was replaced meanwhile and another request dropped this variant: derive it again
+            if attempt == 2:
+                raise
+    response.cache_control.no_cache = True
+    return response
+
 @views.route('/display_user_image/<userID>')
 def display_user_image(userID):
     photos_dir = os.path.join(os.path.dirname(__file__), 'static', 'photos', 'users', str(userID))
     file_path = os.path.join(photos_dir, 'main.jpg')
-    
-    if os.path.isfile(file_path):
-        img = func_crop_image_in_memory(file_path)
-        img_io = BytesIO()
-        img.save(img_io, 'JPEG')
-        img_io.seek(0)
-        return send_file(img_io, mimetype='image/jpeg')
-    else:
-        return redirect(url_for('static', filename='photos/users/nophoto.jpg'), code=301)
+    return send_derived_image(file_path, 'photos/users/nophoto.jpg')
 
 @views.route('/display_club_main_image/<clubID>')
 def display_club_main_image(clubID):
     photos_dir = os.path.join(os.path.dirname(__file__), 'static', 'photos', 'clubs', str(clubID))
     file_path = os.path.join(photos_dir, 'main.jpg')
-    
-    if os.path.isfile(file_path):
-        img = func_crop_image_in_memory(file_path)
-        img_io = BytesIO()
-        img.save(img_io, 'JPEG')
-        img_io.seek(0)
-        return send_file(img_io, mimetype='image/jpeg')
-    else:
-        return redirect(url_for('static', filename='photos/clubs/nophoto.jpg'), code=301)
+    return send_derived_image(file_path, 'photos/clubs/nophoto.jpg')
     
 @views.route('/display_club_second_image/<clubID>')
 def display_club_second_image(clubID):
     photos_dir = os.path.join(os.path.dirname(__file__), 'static', 'photos', 'clubs', str(clubID), 'secondary')
     file_path = os.path.join(photos_dir, '1.jpg')
-    
-    if os.path.isfile(file_path):
-        img = func_crop_image_in_memory(file_path)
-        img_io = BytesIO()
-        img.save(img_io, 'JPEG')
-        img_io.seek(0)
-        return send_file(img_io, mimetype='image/jpeg')
-    else:
-        return redirect(url_for('static', filename='photos/clubs/nophoto.jpg'), code=301)
+    return send_derived_image(file_path, 'photos/clubs/nophoto.jpg')
 
 @views.route('/display_package_main_image/<int:eventID>/<int:packageID>')
 def display_package_main_image(eventID, packageID):
     filePath = str(os.path.abspath(os.path.dirname(__file__)))+'/static/photos/clubs/'+str(eventID)+'/packages/'+str(packageID)+'/main.jpg'
-    if os.path.isfile(filePath):
-        img = func_crop_image_in_memory(filePath)
-        img_io = BytesIO()
-        img.save(img_io, 'JPEG')
-        img_io.seek(0)
-        return send_file(img_io, mimetype='image/jpeg')
-    else:
-        return redirect(url_for('static', filename='photos/clubs/nophoto.jpg'), code=301)
+    return send_derived_image(filePath, 'photos/clubs/nophoto.jpg')
 
 @views.route('/display_league_main_image/<leagueID>')
 def display_league_main_image(leagueID):
     photos_dir = os.path.join(os.path.dirname(__file__), 'static', 'photos', 'leagues', str(leagueID))
     file_path = os.path.join(photos_dir, 'main.jpg')
-    
-    if os.path.isfile(file_path):
-        img = func_crop_image_in_memory(file_path)
-        img_io = BytesIO()
-        img.save(img_io, 'JPEG')
-        img_io.seek(0)
-        return send_file(img_io, mimetype='image/jpeg')
-    else:
-        return redirect(url_for('static', filename='photos/leagues/nophoto.jpg'), code=301)
+    return send_derived_image(file_path, 'photos/leagues/nophoto.jpg')
     
 @views.route('/display_league_second_image/<leagueID>')
 def display_league_second_image(leagueID):
     photos_dir = os.path.join(os.path.dirname(__file__), 'static', 'photos', 'leagues', str(leagueID), 'secondary')
     file_path = os.path.join(photos_dir, '1.jpg')
-    
-    if os.path.isfile(file_path):
-        img = func_crop_image_in_memory(file_path)
-        img_io = BytesIO()
-        img.save(img_io, 'JPEG')
-        img_io.seek(0)
-        return send_file(img_io, mimetype='image/jpeg')
-    else:
-        return redirect(url_for('static', filename='photos/leagues/nophoto.jpg'), code=301)
+    return send_derived_image(file_path, 'photos/leagues/nophoto.jpg')
 
 @views.route('/league/<int:league_id>', methods=['GET'])
 def detail_league(league_id):
-    # Get the league with registered players loaded
-    league = League.query.options(db.joinedload(League.registered_players)).get_or_404(league_id)
+    league = League.query.get_or_404(league_id)
     
     # Get the club information
     club = Club.query.get_or_404(league.lg_club_id)
     
-    # Get gamedays for this league
-    gamedays = GameDay.query.filter_by(gd_idLeague=league_id).order_by(GameDay.gd_date).all()
+    # Get gamedays for this league, with their winners
+    gamedays = (GameDay.query.filter_by(gd_idLeague=league_id)
+                .options(db.joinedload(GameDay.winner1), db.joinedload(GameDay.winner2))
+                .order_by(GameDay.gd_date).all())
+    
+    # Registered players with their name and league classification, in one query
+    rows = db.session.query(Users.us_id, Users.us_name, LeagueClassification)\
+        .select_from(LeaguePlayers)\
+        .join(Users, Users.us_id == LeaguePlayers.lp_player_id)\
+        .outerjoin(LeagueClassification, and_(LeagueClassification.lc_idLeague == LeaguePlayers.lp_league_id,
+                                              LeagueClassification.lc_idPlayer == LeaguePlayers.lp_player_id))\
+        .filter(LeaguePlayers.lp_league_id == league_id)\
+        .order_by(LeaguePlayers.lp_id, LeagueClassification.lc_id)\
+        .all()
     
     # Calculate player statistics from league classification
     players_stats = []
-    for player in league.registered_players:
-        # Get player info
-        user = Users.query.get(player.lp_player_id)
-        
-        # Get player's league classification
-        league_class = LeagueClassification.query.filter_by(
-            lc_idLeague=league_id,
-            lc_idPlayer=player.lp_player_id
-        ).first()
+    seen = set()
+    for us_id, us_name, league_class in rows:
+        if us_id in seen:
+            continue  # a player with several classification rows keeps the first one
+        seen.add(us_id)
         
         if league_class:
             wins = league_class.lc_wins
@@ -5578,8 +5582,8 @@ def detail_league(league_id):
             points = 0
 
         players_stats.append({
-            'us_id': user.us_id,
-            'us_name': user.us_name,
+            'us_id': us_id,
+            'us_name': us_name,
             'games_played': games_played,
             'wins': wins,
             'losses': losses,
@@ -5594,12 +5598,15 @@ def detail_league(league_id):
     # Sort players by points and win rate
     players_stats.sort(key=lambda x: (-x['points'], -x['win_rate']))
     
+    is_registered = current_user.is_authenticated and current_user.us_id in seen
+    
     return render_template('league_detail.html', 
                            user=current_user, 
                            league=league,
                            club=club,
                            gamedays=gamedays,
-                           players=players_stats)
+                           players=players_stats,
+                           is_registered=is_registered)
 
 @views.route('/gameday/<int:gameday_id>', methods=['GET'])
 def gameday_detail(gameday_id):
@@ -5663,18 +5670,12 @@ def gameday_detail(gameday_id):
 @views.route('/search_users', methods=['GET'])
 def search_users():
     try:
-        query = request.args.get('query', '').lower()
+        query = request.args.get('query', '')
         
         if len(query) < 3:
             return jsonify([])
             
-        users = Users.query.filter(
-            db.or_(
-                db.func.lower(Users.us_name).like(f'%{query}%'),
-                db.func.lower(Users.us_email).like(f'%{query}%'),
-                Users.us_telephone.like(f'%{query}%')
-            )
-        ).limit(10).all()
+        users = find_users(query, limit=10)
         
         results = [{
             'id': user.us_id,
@@ -5687,79 +5688,52 @@ def search_users():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _search_result_url(kind, obj_id, slug):
+    """Page a search result leads to; superusers land on the edit pages of users and clubs."""
+    is_superuser = current_user.is_authenticated and current_user.us_is_superuser
+    if kind == 'event':
+        return url_for('views.detail_event', slug=slug)
+    if kind == 'user':
+        if is_superuser:
+            return url_for('views.editUser', user_id=obj_id)
+        return url_for('views.player_profile', user_id=obj_id)
+    if is_superuser:
+        return url_for('views.edit_club', club_slug=slug)
+    return url_for('views.club_detail', club_slug=slug)
+
+# Matches scoring below this are not shown
+SEARCH_MIN_SCORE = 0.35
+
 @views.route('/search', methods=['GET'])
 def search():
-    """Global search across users, events and clubs with fuzzy matching."""
-    import difflib
-
+    """Global search across users (and their club nicknames), events and clubs with fuzzy matching."""
     query = request.args.get('query', '').strip()
     referrer = request.referrer or url_for('views.home')
 
     if not query:
         return redirect(referrer)
 
-    query_lower = query.lower()
-
-    def score(name):
-        """Return a match score: 1.0 for substring, difflib ratio otherwise."""
-        name_lower = name.lower()
-        if query_lower in name_lower:
-            # Prefer shorter names (closer to query length) for substring matches
-            return 1.0 - (len(name_lower) - len(query_lower)) * 0.001
-        return difflib.SequenceMatcher(None, query_lower, name_lower).ratio()
-
-    MIN_SCORE = 0.35
-    best_score = 0
-    best_type = None
-    best_obj = None
-
-    # --- Search events (available to all users) ---
-    events = Event.query.filter(Event.ev_status != 'canceled').all()
-    for ev in events:
-        s = score(ev.ev_title)
-        if s > best_score:
-            best_score = s
-            best_type = 'event'
-            best_obj = ev
-
-    # --- Search users/players (available to all users including anonymous) ---
-    users = Users.query.filter(Users.us_is_active == True).all()
-    for u in users:
-        s = score(u.us_name)
-        if s > best_score:
-            best_score = s
-            best_type = 'user'
-            best_obj = u
-
-    # --- Search clubs (available to all users including anonymous) ---
-    clubs = Club.query.filter(Club.cl_active == True).all()
-    for cl in clubs:
-        s = score(cl.cl_name)
-        if s > best_score:
-            best_score = s
-            best_type = 'club'
-            best_obj = cl
-
-    if best_score < MIN_SCORE or best_obj is None:
+    results = search_index.search(query, limit=1)
+    if not results or results[0][0] < SEARCH_MIN_SCORE:
         flash(translate('No results found for "{}".').format(query), 'warning')
         return redirect(referrer)
 
-    is_superuser = current_user.is_authenticated and current_user.us_is_superuser
-
-    if best_type == 'event':
-        return redirect(url_for('views.detail_event', slug=best_obj.ev_slug))
-
-    if best_type == 'user':
-        if is_superuser:
-            return redirect(url_for('views.editUser', user_id=best_obj.us_id))
-        return redirect(url_for('views.player_profile', user_id=best_obj.us_id))
+    score, kind, obj_id, name, slug = results[0]
+    return redirect(_search_result_url(kind, obj_id, slug))
 
-    if best_type == 'club':
-        if is_superuser:
-            return redirect(url_for('views.edit_club', club_slug=best_obj.cl_slug))
-        return redirect(url_for('views.club_detail', club_slug=best_obj.cl_slug))
 
-    return redirect(referrer)
+@views.route('/search_suggestions', methods=['GET'])
+def search_suggestions():
+    """Top matches of the search box for autocompletion: [{type, id, name, url}], best first."""
+    query = request.args.get('query', '').strip()
+    limit = min(max(request.args.get('limit', 8, type=int), 1), 20)
+    if len(query) < 2:
+        return jsonify([])
+    return jsonify([
+        {'type': kind, 'id': obj_id, 'name': name, 'url': _search_result_url(kind, obj_id, slug)}
+        for score, kind, obj_id, name, slug in search_index.search(query, limit=limit)
+        if score >= SEARCH_MIN_SCORE
+    ])
 
 
 @views.route('/club_detail/<club_slug>', methods=['GET'])
@@ -5781,66 +5755,27 @@ def club_detail(club_slug):
                            courts=courts)
 
 
+# Games listed per page (and per infinite-scroll fetch) on player_profile
+PLAYER_PROFILE_GAMES_PER_PAGE = 30
+
+def _history_cursor_arg():
+    """Keyset of the 'before' query argument of the game history pages (None for the first page)."""
+    cursor = request.args.get('before')
+    if not cursor:
+        return None
+    try:
+        return func_parse_history_cursor(cursor)
+    except ValueError:
+        abort(400)
+
 @views.route('/player_profile/<int:user_id>', methods=['GET'])
 def player_profile(user_id):
     """Public read-only player profile with basic info and game history."""
     p_user = Users.query.get_or_404(user_id)
 
-    # Fetch all games involving this player with results, newest first
-    games_raw = Game.query.filter(
-        db.or_(
-            Game.gm_idPlayer_A1 == user_id,
-            Game.gm_idPlayer_A2 == user_id,
-            Game.gm_idPlayer_B1 == user_id,
-            Game.gm_idPlayer_B2 == user_id,
-        ),
-        Game.gm_result_A != None,
-        Game.gm_result_B != None,
-    ).order_by(Game.gm_date.desc(), Game.gm_timeStart.desc()).all()
-
-    def pname(u):
-        return u.us_name if u else '?'
-
-    def pid(u):
-        return u.us_id if u else None
-
-    games = []
-    total = 0
-    wins = 0
-    for g in games_raw:
-        on_team_a = g.gm_idPlayer_A1 == user_id or g.gm_idPlayer_A2 == user_id
-        won = (g.gm_result_A > g.gm_result_B) if on_team_a else (g.gm_result_B > g.gm_result_A)
-        draw = g.gm_result_A == g.gm_result_B
-        total += 1
-        if won:
-            wins += 1
-
-        games.append({
-            'date': g.gm_date,
-            'time_start': g.gm_timeStart,
-            'time_end': g.gm_timeEnd,
-            'event_id': g.gm_idEvent,
-            'event_slug': g.event.ev_slug if g.event else None,
-            'court': g.court.ct_name if g.court else None,
-            'won': won,
-            'draw': draw,
-            'team_a': {
-                'players': [
-                    {'id': pid(g.player_A1), 'name': pname(g.player_A1)},
-                    {'id': pid(g.player_A2), 'name': pname(g.player_A2)},
-                ],
-                'score': g.gm_result_A,
-                'is_mine': on_team_a,
-            },
-            'team_b': {
-                'players': [
-                    {'id': pid(g.player_B1), 'name': pname(g.player_B1)},
-                    {'id': pid(g.player_B2), 'name': pname(g.player_B2)},
-                ],
-                'score': g.gm_result_B,
-                'is_mine': not on_team_a,
-            },
-        })
+    # Totals from one aggregate, the history one keyset page at a time, newest first
+    total, wins = func_get_player_game_totals(user_id)
+    games, next_cursor = func_get_player_game_history(user_id, _history_cursor_arg(), PLAYER_PROFILE_GAMES_PER_PAGE)
 
     losses = total - wins
     win_rate = round(wins * 100 / total) if total else 0
@@ -5849,36 +5784,37 @@ def player_profile(user_id):
                            user=current_user,
                            p_user=p_user,
                            games=games,
+                           next_cursor=next_cursor,
                            total=total,
                            wins=wins,
                            losses=losses,
                            win_rate=win_rate)
 
 
+@views.route('/player_profile/<int:user_id>/games', methods=['GET'])
+def player_profile_games(user_id):
+    """Next page of the profile's game history for infinite scrolling: the rendered game cards
+    and the cursor of the page after it (null on the last page)."""
+    games, next_cursor = func_get_player_game_history(user_id, _history_cursor_arg(), PLAYER_PROFILE_GAMES_PER_PAGE)
+    return jsonify(html=render_template('player_profile_games.html', games=games), next_cursor=next_cursor)
+
+
+# Games listed per page on player_info
+PLAYER_INFO_GAMES_PER_PAGE = 50
+
 @views.route('/player_info/<int:user_id>', methods=['GET'])
 def player_info(user_id):
     p_user = Users.query.get_or_404(user_id)
-    
-    # Define the cutoff date for statistics
-    cutoff_date = datetime.strptime('2024-01-01', '%Y-%m-%d').date()
-    
-    # Count won game days
-    num_game_day_won = db.session.query(func.count()).filter(
-        ((GameDay.gd_idWinner1 == user_id) | (GameDay.gd_idWinner2 == user_id)) &
-        (GameDay.gd_date > cutoff_date)
-    ).scalar()
-    num_game_day_won_text = f"Winner of {num_game_day_won} events!" if num_game_day_won > 0 else "Has not won any events yet!"
+    page = max(request.args.get('page', 1, type=int), 1)
 
-    # Get last game date
-    last_game_date = db.session.query(Game.gm_date).filter(
-        ((Game.gm_idPlayer_A1 == user_id) |
-        (Game.gm_idPlayer_A2 == user_id) |
-        (Game.gm_idPlayer_B1 == user_id) |
-        (Game.gm_idPlayer_B2 == user_id)) & (Game.gm_date > cutoff_date)
-    ).order_by(Game.gm_date.desc()).first()
-    last_game_date_string = last_game_date[0].strftime('%Y-%m-%d') if last_game_date else "No games registered yet!"
+    # Totals, teammates, opponents and ELO extremes are precomputed in tb_player_stats
+    stats, names = func_get_player_stats(user_id)
 
-    # Get all games with ELO changes
+    num_game_day_won = stats.ps_gamedays_won if stats else 0
+    num_game_day_won_text = f"Winner of {num_game_day_won} events!" if num_game_day_won > 0 else "Has not won any events yet!"
+    last_game_date_string = stats.ps_last_game_date.strftime('%Y-%m-%d') if stats and stats.ps_last_game_date else "No games registered yet!"
+
+    # One page of games with ELO changes
     try:
         games_query = db.session.execute(
             text("SELECT g.gm_date, g.gm_timeStart, g.gm_timeEnd, c.ct_name as gm_court, "
@@ -5887,270 +5823,33 @@ def player_info(user_id):
                 "u3.us_name as gm_namePlayer_B1, u4.us_name as gm_namePlayer_B2, "
                 "g.gm_id, g.gm_idPlayer_A1, g.gm_idPlayer_A2, g.gm_idPlayer_B1, g.gm_idPlayer_B2, "
                 "(eh.el_afterRank - eh.el_beforeRank) AS gm_points_var "
-                "FROM tb_game g "
+                "FROM tb_game_participation p "
+                "JOIN tb_game g ON g.gm_id = p.gpt_gm_id "
                 "JOIN tb_court c ON c.ct_id = g.gm_court "
                 "JOIN tb_users u1 ON u1.us_id = g.gm_idPlayer_A1 "
                 "JOIN tb_users u2 ON u2.us_id = g.gm_idPlayer_A2 "
                 "JOIN tb_users u3 ON u3.us_id = g.gm_idPlayer_B1 "
                 "JOIN tb_users u4 ON u4.us_id = g.gm_idPlayer_B2 "
                 "LEFT JOIN tb_ELO_ranking_hist eh ON eh.el_gm_id = g.gm_id AND eh.el_pl_id = :userID "
-                "WHERE (g.gm_idPlayer_A1 = :userID OR g.gm_idPlayer_A2 = :userID OR "
-                "g.gm_idPlayer_B1 = :userID OR g.gm_idPlayer_B2 = :userID) "
+                "WHERE p.gpt_pl_id = :userID "
                 "AND (g.gm_result_A > 0 OR g.gm_result_B > 0) "
-                "ORDER BY g.gm_date DESC, g.gm_timeStart DESC"),
-            {"userID": user_id}
+                "ORDER BY p.gpt_date DESC, p.gpt_timeStart DESC "
+                "LIMIT :limit OFFSET :offset"),
+            {"userID": user_id, "limit": PLAYER_INFO_GAMES_PER_PAGE + 1, "offset": (page - 1) * PLAYER_INFO_GAMES_PER_PAGE}
         ).fetchall()
     except Exception as e:
         print(f"Error getting games: {str(e)}")
         games_query = []
+    has_next_page = len(games_query) > PLAYER_INFO_GAMES_PER_PAGE
+    games_query = games_query[:PLAYER_INFO_GAMES_PER_PAGE]
 
-    # Get worst nightmare
-    try:
-        worst_nightmare = db.session.execute(
-            text("""
-                WITH OpponentGames AS (
-                    SELECT 
-                        CASE 
-                            WHEN gm_idPlayer_A1 = :userID OR gm_idPlayer_A2 = :userID THEN 
-                                CASE 
-                                    WHEN gm_result_B > gm_result_A THEN 
-                                        CASE 
-                                            WHEN gm_idPlayer_B1 != :userID THEN gm_idPlayer_B1 
-                                            ELSE gm_idPlayer_B2 
-                                        END 
-                                END
-                            WHEN gm_idPlayer_B1 = :userID OR gm_idPlayer_B2 = :userID THEN
-                                CASE 
-                                    WHEN gm_result_A > gm_result_B THEN 
-                                        CASE 
-                                            WHEN gm_idPlayer_A1 != :userID THEN gm_idPlayer_A1 
-                                            ELSE gm_idPlayer_A2 
-                                        END 
-                                END
-                        END AS winning_opponent
-                    FROM tb_game
-                    WHERE (gm_idPlayer_A1 = :userID OR gm_idPlayer_A2 = :userID OR 
-                          gm_idPlayer_B1 = :userID OR gm_idPlayer_B2 = :userID)
-                    AND gm_date > :cutoff_date
-                )
-                SELECT 
-                    u.us_id as oponent,
-                    u.us_name as playerName,
-                    COUNT(*) as losses,
-                    (
-                        SELECT COUNT(*) 
-                        FROM tb_game g
-                        WHERE (
-                            (g.gm_idPlayer_A1 = :userID OR g.gm_idPlayer_A2 = :userID) AND 
-                            (g.gm_idPlayer_B1 = u.us_id OR g.gm_idPlayer_B2 = u.us_id)
-                        ) OR (
-                            (g.gm_idPlayer_B1 = :userID OR g.gm_idPlayer_B2 = :userID) AND 
-                            (g.gm_idPlayer_A1 = u.us_id OR g.gm_idPlayer_A2 = u.us_id)
-                        )
-                        AND g.gm_date > :cutoff_date
-                    ) as games,
-                    CAST(COUNT(*) AS FLOAT) * 100 / (
-                        SELECT COUNT(*) 
-                        FROM tb_game g
-                        WHERE (
-                            (g.gm_idPlayer_A1 = :userID OR g.gm_idPlayer_A2 = :userID) AND 
-                            (g.gm_idPlayer_B1 = u.us_id OR g.gm_idPlayer_B2 = u.us_id)
-                        ) OR (
-                            (g.gm_idPlayer_B1 = :userID OR g.gm_idPlayer_B2 = :userID) AND 
-                            (g.gm_idPlayer_A1 = u.us_id OR g.gm_idPlayer_A2 = u.us_id)
-                        )
-                        AND g.gm_date > :cutoff_date
-                    ) as lostPerc
-                FROM OpponentGames og
-                JOIN tb_users u ON og.winning_opponent = u.us_id
-                GROUP BY u.us_id, u.us_name
-                ORDER BY lostPerc DESC, losses DESC
-                LIMIT 1
-            """),
-            {"userID": user_id, "cutoff_date": cutoff_date}
-        ).fetchone() or ['', '', 0, 0, 0]
-    except Exception as e:
-        print(f"Error getting worst nightmare: {str(e)}")
-        worst_nightmare = ['', '', 0, 0, 0]
+    def share(count, games):
+        return count * 100.0 / games if games else 0
 
-    # Get best opponent (opponent you beat the most)
-    try:
-        best_opponent = db.session.execute(
-            text("""
-                WITH OpponentGames AS (
-                    SELECT 
-                        CASE 
-                            WHEN gm_idPlayer_A1 = :userID OR gm_idPlayer_A2 = :userID THEN 
-                                CASE 
-                                    WHEN gm_result_A > gm_result_B THEN 
-                                        CASE 
-                                            WHEN gm_idPlayer_B1 != :userID THEN gm_idPlayer_B1 
-                                            ELSE gm_idPlayer_B2 
-                                        END 
-                                END
-                            WHEN gm_idPlayer_B1 = :userID OR gm_idPlayer_B2 = :userID THEN
-                                CASE 
-                                    WHEN gm_result_B > gm_result_A THEN 
-                                        CASE 
-                                            WHEN gm_idPlayer_A1 != :userID THEN gm_idPlayer_A1 
-                                            ELSE gm_idPlayer_A2 
-                                        END 
-                                END
-                        END AS losing_opponent
-                    FROM tb_game
-                    WHERE (gm_idPlayer_A1 = :userID OR gm_idPlayer_A2 = :userID OR 
-                          gm_idPlayer_B1 = :userID OR gm_idPlayer_B2 = :userID)
-                    AND gm_date > :cutoff_date
-                )
-                SELECT 
-                    u.us_id as oponent,
-                    u.us_name as playerName,
-                    COUNT(*) as victories,
-                    (
-                        SELECT COUNT(*) 
-                        FROM tb_game g
-                        WHERE (
-                            (g.gm_idPlayer_A1 = :userID OR g.gm_idPlayer_A2 = :userID) AND 
-                            (g.gm_idPlayer_B1 = u.us_id OR g.gm_idPlayer_B2 = u.us_id)
-                        ) OR (
-                            (g.gm_idPlayer_B1 = :userID OR g.gm_idPlayer_B2 = :userID) AND 
-                            (g.gm_idPlayer_A1 = u.us_id OR g.gm_idPlayer_A2 = u.us_id)
-                        )
-                        AND g.gm_date > :cutoff_date
-                    ) as games,
-                    CAST(COUNT(*) AS FLOAT) * 100 / (
-                        SELECT COUNT(*) 
-                        FROM tb_game g
-                        WHERE (
-                            (g.gm_idPlayer_A1 = :userID OR g.gm_idPlayer_A2 = :userID) AND 
-                            (g.gm_idPlayer_B1 = u.us_id OR g.gm_idPlayer_B2 = u.us_id)
-                        ) OR (
-                            (g.gm_idPlayer_B1 = :userID OR g.gm_idPlayer_B2 = :userID) AND 
-                            (g.gm_idPlayer_A1 = u.us_id OR g.gm_idPlayer_A2 = u.us_id)
-                        )
-                        AND g.gm_date > :cutoff_date
-                    ) as victPerc
-                FROM OpponentGames og
-                JOIN tb_users u ON og.losing_opponent = u.us_id
-                GROUP BY u.us_id, u.us_name
-                ORDER BY victPerc DESC, victories DESC
-                LIMIT 1
-            """),
-            {"userID": user_id, "cutoff_date": cutoff_date}
-        ).fetchone() or ['', '', 0, 0, 0]
-    except Exception as e:
-        print(f"Error getting best opponent: {str(e)}")
-        best_opponent = ['', '', 0, 0, 0]
-
-    # Get best teammate using SQLAlchemy ORM
-    try:
-        subquery = db.session.query(
-            case(
-                (and_(Game.gm_idPlayer_A1 == user_id, Game.gm_idPlayer_A2), Game.gm_idPlayer_A2),
-                (and_(Game.gm_idPlayer_A2 == user_id, Game.gm_idPlayer_A1), Game.gm_idPlayer_A1),
-                (and_(Game.gm_idPlayer_B1 == user_id, Game.gm_idPlayer_B2), Game.gm_idPlayer_B2),
-                (and_(Game.gm_idPlayer_B2 == user_id, Game.gm_idPlayer_B1), Game.gm_idPlayer_B1)
-            ).label('teamMate'),
-            case(
-                (and_(or_(Game.gm_idPlayer_A1 == user_id, Game.gm_idPlayer_A2 == user_id),
-                      Game.gm_result_A > Game.gm_result_B), 1),
-                (and_(or_(Game.gm_idPlayer_B1 == user_id, Game.gm_idPlayer_B2 == user_id),
-                      Game.gm_result_B > Game.gm_result_A), 1),
-                else_=0
-            ).label('won')
-        ).filter(
-            or_(Game.gm_idPlayer_A1 == user_id, Game.gm_idPlayer_A2 == user_id,
-                Game.gm_idPlayer_B1 == user_id, Game.gm_idPlayer_B2 == user_id),
-            or_(Game.gm_result_A > 0, Game.gm_result_B > 0),
-            Game.gm_date > cutoff_date
-        ).subquery()
-
-        best_teammate = db.session.query(
-            Users.us_name,
-            (func.sum(subquery.c.won) * 100.0 / func.count(subquery.c.teamMate)).label('winPerc'),
-            func.sum(subquery.c.won).label('won'),
-            func.count(subquery.c.teamMate).label('totalgames')
-        ).join(
-            subquery, subquery.c.teamMate == Users.us_id
-        ).group_by(
-            subquery.c.teamMate
-        ).order_by(
-            desc('winPerc'),
-            desc('won')
-        ).first() or ['', 0, 0, 0]
-    except Exception as e:
-        print(f"Error getting best teammate: {str(e)}")
-        best_teammate = ['', 0, 0, 0]
-
-    # Get worst teammate using SQL query for better performance
-    try:
-        worst_teammate = db.session.execute(
-            text("""
-                WITH PlayerGames AS (
-                    SELECT 
-                        CASE 
-                            WHEN gm_idPlayer_A1 = :userID THEN gm_idPlayer_A2
-                            WHEN gm_idPlayer_A2 = :userID THEN gm_idPlayer_A1
-                            WHEN gm_idPlayer_B1 = :userID THEN gm_idPlayer_B2
-                            WHEN gm_idPlayer_B2 = :userID THEN gm_idPlayer_B1
-                        END AS teamMate,
-                        CASE
-                            WHEN ((gm_idPlayer_A1 = :userID OR gm_idPlayer_A2 = :userID) AND gm_result_B > gm_result_A)
-                                OR ((gm_idPlayer_B1 = :userID OR gm_idPlayer_B2 = :userID) AND gm_result_A > gm_result_B)
-                            THEN 1
-                            ELSE 0
-                        END AS lost
-                    FROM tb_game
-                    WHERE (gm_idPlayer_A1 = :userID OR gm_idPlayer_A2 = :userID OR 
-                          gm_idPlayer_B1 = :userID OR gm_idPlayer_B2 = :userID)
-                    AND gm_date > :cutoff_date
-                )
-                SELECT 
-                    u.us_name as pl_name,
-                    ((SUM(lost)*100.0) / COUNT(*)) as lostPerc,
-                    SUM(lost) as lost,
-                    COUNT(*) as totalgames
-                FROM PlayerGames pg
-                JOIN tb_users u ON u.us_id = pg.teamMate
-                GROUP BY teamMate, u.us_name
-                ORDER BY lostPerc DESC, lost DESC
-                LIMIT 1
-            """),
-            {"userID": user_id, "cutoff_date": cutoff_date}
-        ).fetchone() or ['', 0, 0, 0]
-    except Exception as e:
-        print(f"Error getting worst teammate: {str(e)}")
-        worst_teammate = ['', 0, 0, 0]
-
-    # Get player stats (wins/losses)
-    try:
-        player_stats = db.session.query(
-            func.sum(case(
-                (and_(or_(Game.gm_idPlayer_A1 == user_id, Game.gm_idPlayer_A2 == user_id),
-                      Game.gm_result_A > Game.gm_result_B), 1),
-                (and_(or_(Game.gm_idPlayer_B1 == user_id, Game.gm_idPlayer_B2 == user_id),
-                      Game.gm_result_B > Game.gm_result_A), 1),
-                else_=0
-            )).label('games_won'),
-            func.count(Game.gm_id).label('total_games')
-        ).filter(
-            or_(Game.gm_idPlayer_A1 == user_id, Game.gm_idPlayer_A2 == user_id,
-                Game.gm_idPlayer_B1 == user_id, Game.gm_idPlayer_B2 == user_id),
-            or_(Game.gm_result_A > 0, Game.gm_result_B > 0),
-            Game.gm_date > cutoff_date
-        ).first() or (0, 0)
-
-        # Get best and worst ELO ratings from history
-        rankingELO_bestWorst = db.session.execute(
-            text("""
-                SELECT max(el_afterRank) as best, min(el_afterRank) as worst, (SELECT el_afterRank from `tb_ELO_ranking_hist` where el_pl_id=:userID order by el_date desc, el_startTime desc limit 1) as rankNow FROM `tb_ELO_ranking_hist` where el_pl_id=:userID
-            """),
-            {"userID": user_id}
-        ).fetchone() or [1000, 1000, 1000]
-
-    except Exception as e:
-        print(f"Error getting player stats: {str(e)}")
-        player_stats = (0, 0)
+    player_stats = (stats.ps_games_won, stats.ps_total_games) if stats else (0, 0)
+    if stats and stats.ps_elo_best is not None:
+        rankingELO_bestWorst = [stats.ps_elo_best, stats.ps_elo_worst, stats.ps_elo_now]
+    else:
         rankingELO_bestWorst = [1000, 1000, 1000]
 
     # rankingELO_hist
@@ -6167,19 +5866,7 @@ def player_info(user_id):
     else:
         rankingELO_hist=[0,0,0,0,0,0,0,0,0]
 
-    # rankingELO_histShort
-    try:
-        rankingELO_histShort = db.session.execute(
-            text(f"SELECT el_gm_id, el_date, el_startTime, el_result_team, el_result_op, el_beforeRank, el_afterRank FROM tb_ELO_ranking_hist where el_pl_id=:playerID order by el_date desc, el_startTime desc LIMIT 10"),
-            {"playerID": user_id},
-        ).fetchall()
-    except Exception as e:
-        print(f"Error: {str(e)}")
-
-    if rankingELO_histShort:
-        pass
-    else:
-        rankingELO_histShort=[0,0,0,0,0,0,0,0,0]
+    rankingELO_histShort = rankingELO_hist[:10]
 
     player_data = {
         "player_id": p_user.us_id,
@@ -6188,20 +5875,20 @@ def player_info(user_id):
         "player_birthday": p_user.us_birthday,
         "numGameDayWins": num_game_day_won_text,
         "lastGamePlayed": last_game_date_string,
-        "games_won": player_stats[0] if player_stats[0] else 0,
-        "total_games": player_stats[1] if player_stats[1] else 0,
-        "best_teammate_name": str(best_teammate[0]),
-        "best_teammate_win_percentage": "{:.2f}".format(best_teammate[1]),
-        "best_teammate_total_games": best_teammate[3],
-        "worst_teammate_name": str(worst_teammate[0]),
-        "worst_teammate_lost_percentage": "{:.2f}".format(worst_teammate[1]),
-        "worst_teammate_total_games": worst_teammate[3],
-        "worst_nightmare_name": str(worst_nightmare[1]),
-        "worst_nightmare_lost_percentage": "{:.2f}".format(worst_nightmare[4]),
-        "worst_nightmare_games": worst_nightmare[3],
-        "best_opponent_name": str(best_opponent[1]),
-        "best_opponent_victory_percentage": "{:.2f}".format(best_opponent[4]),
-        "best_opponent_games": best_opponent[3],
+        "games_won": player_stats[0],
+        "total_games": player_stats[1],
+        "best_teammate_name": names.get('best_teammate', ''),
+        "best_teammate_win_percentage": "{:.2f}".format(share(stats.ps_best_teammate_wins, stats.ps_best_teammate_games) if stats else 0),
+        "best_teammate_total_games": stats.ps_best_teammate_games if stats else 0,
+        "worst_teammate_name": names.get('worst_teammate', ''),
+        "worst_teammate_lost_percentage": "{:.2f}".format(share(stats.ps_worst_teammate_losses, stats.ps_worst_teammate_games) if stats else 0),
+        "worst_teammate_total_games": stats.ps_worst_teammate_games if stats else 0,
+        "worst_nightmare_name": names.get('nemesis', ''),
+        "worst_nightmare_lost_percentage": "{:.2f}".format(share(stats.ps_nemesis_losses, stats.ps_nemesis_games) if stats else 0),
+        "worst_nightmare_games": stats.ps_nemesis_games if stats else 0,
+        "best_opponent_name": names.get('fav_opponent', ''),
+        "best_opponent_victory_percentage": "{:.2f}".format(share(stats.ps_fav_opponent_wins, stats.ps_fav_opponent_games) if stats else 0),
+        "best_opponent_games": stats.ps_fav_opponent_games if stats else 0,
     }
 
     return render_template("player_info.html", 
@@ -6212,8 +5899,26 @@ def player_info(user_id):
                          player_stats=player_stats,
                          rankingELO_bestWorst=rankingELO_bestWorst, 
                          rankingELO_hist=rankingELO_hist, 
-                         rankingELO_histShort=rankingELO_histShort)
+                         rankingELO_histShort=rankingELO_histShort,
+                         page=page,
+                         has_next_page=has_next_page)
+
+
+
+@views.route('/compare_players/<int:player_a>/<int:player_b>', methods=['GET'])
+def compare_players(player_a, player_b):
+    """Head-to-head of two players as JSON: their games together and against each other, from player_a's side."""
+    users = {u.us_id: u for u in Users.query.filter(Users.us_id.in_((player_a, player_b)))}
+    if player_a not in users or player_b not in users:
+        abort(404)
 
+    comparison = func_compare_players(player_a, player_b)
+    return jsonify({
+        'player_a': {'id': player_a, 'name': users[player_a].us_name},
+        'player_b': {'id': player_b, 'name': users[player_b].us_name},
+        'together': comparison['partner'],
+        'against': comparison['opponent'],
+    })
 
 @views.route('/elo_ranking', methods=['GET'])
 def elo_ranking():